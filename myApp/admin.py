@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
-    Course, Module, Lesson, UserProgress, CourseEnrollment, Exam, ExamAttempt, Certification,
-    Cohort, CohortMember, Bundle, BundlePurchase, CourseAccess, LearningPath, LearningPathCourse
+    Course, Module, Lesson, UserProgress, CourseEnrollment, Exam, ExamQuestion, ExamAttempt, ExamSummary, Certification,
+    Cohort, CohortMember, Bundle, BundlePurchase, CourseAccess, LearningPath, LearningPathCourse,
+    ActivityEvent, PDFImportJob, PDFImportFile
 )
 
 
@@ -61,23 +62,33 @@ class CourseEnrollmentAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'course__name']
 
 
+class ExamQuestionInline(admin.TabularInline):
+    model = ExamQuestion
+    extra = 1
+
+
 @admin.register(Exam)
 class ExamAdmin(admin.ModelAdmin):
-    list_display = ['course', 'title', 'passing_score', 'max_attempts', 'is_active']
+    list_display = ['course', 'title', 'passing_score', 'max_attempts', 'time_limit_minutes', 'is_active']
     list_filter = ['is_active']
     search_fields = ['course__name', 'title']
+    inlines = [ExamQuestionInline]
 
 
 @admin.register(ExamAttempt)
 class ExamAttemptAdmin(admin.ModelAdmin):
-    list_display = ['user', 'exam', 'score', 'passed', 'started_at', 'completed_at', 'attempt_number']
+    list_display = ['user', 'exam', 'score', 'passed', 'started_at', 'deadline_at', 'completed_at', 'attempt_number']
     list_filter = ['passed', 'started_at', 'exam']
     search_fields = ['user__username', 'exam__course__name']
     readonly_fields = ['started_at', 'attempt_number']
-    
-    def attempt_number(self, obj):
-        return obj.attempt_number()
-    attempt_number.short_description = 'Attempt #'
+
+
+@admin.register(ExamSummary)
+class ExamSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'exam', 'attempts_used', 'best_score', 'passed', 'last_attempt_at']
+    list_filter = ['passed', 'exam']
+    search_fields = ['user__username', 'exam__course__name']
+    readonly_fields = ['user', 'exam', 'attempts_used', 'best_score', 'passed', 'last_attempt', 'last_attempt_at']
 
 
 @admin.register(Certification)
@@ -170,3 +181,31 @@ class LearningPathCourseAdmin(admin.ModelAdmin):
     list_filter = ['learning_path', 'is_required']
     search_fields = ['learning_path__name', 'course__name']
     ordering = ['learning_path', 'order']
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ['user', 'event_type', 'course', 'lesson', 'created_at']
+    list_filter = ['event_type', 'created_at']
+    search_fields = ['user__username', 'course__name']
+    raw_id_fields = ['user', 'course', 'lesson']
+    
+    # The activity log is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class PDFImportFileInline(admin.TabularInline):
+    model = PDFImportFile
+    extra = 0
+    fields = ['name', 'status', 'pages', 'images', 'lessons_done', 'lessons_total', 'lessons_created', 'lessons_updated', 'error']
+    readonly_fields = fields
+
+
+@admin.register(PDFImportJob)
+class PDFImportJobAdmin(admin.ModelAdmin):
+    list_display = ['course', 'module', 'status', 'use_ai', 'split_by_pages', 'created_by', 'created_at', 'heartbeat_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['course__name', 'module__name', 'files__name']
+    raw_id_fields = ['course', 'module', 'created_by']
+    inlines = [PDFImportFileInline]
@@ -0,0 +1,52 @@
+"""
+WebSocket consumers
+Staff dashboards subscribe to the live activity stream here.
+"""
+import asyncio
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .utils.activity import STAFF_ACTIVITY_GROUP, LIVE_BATCH_WINDOW_SECONDS, LiveActivityBuffer
+
+
+class StaffActivityConsumer(AsyncJsonWebsocketConsumer):
+    """Push batched activity events to a connected staff dashboard"""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated or not user.is_staff:
+            await self.close(code=4403)
+            return
+
+        self.buffer = LiveActivityBuffer()
+        self.sending = None
+        await self.channel_layer.group_add(STAFF_ACTIVITY_GROUP, self.channel_name)
+        await self.accept()
+        self.flusher = asyncio.create_task(self._flush_periodically())
+
+    async def disconnect(self, code):
+        for task in (getattr(self, 'flusher', None), getattr(self, 'sending', None)):
+            if task:
+                task.cancel()
+        await self.channel_layer.group_discard(STAFF_ACTIVITY_GROUP, self.channel_name)
+
+    async def activity_event(self, message):
+        """Group message handler: buffer until the next flush"""
+        self.buffer.add(message['event'])
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(LIVE_BATCH_WINDOW_SECONDS)
+            self.flush()
+
+    def flush(self):
+        """
+        Start sending the buffered batch. While the previous batch is still
+        being sent nothing is started: events keep collecting in the bounded
+        buffer and go out together once the client has caught up.
+        """
+        if self.sending and not self.sending.done():
+            return False
+        batch = self.buffer.drain()
+        self.sending = asyncio.create_task(self.send_json(batch)) if batch else None
+        return True
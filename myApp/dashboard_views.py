@@ -1,10 +1,12 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db.models import Count, Q
 from django.core.files.uploadedfile import InMemoryUploadedFile
+import asyncio
 import json
 import re
 import requests
@@ -30,6 +32,7 @@ from .models import (
     Exam,
     CourseAccess,
     ExamAttempt,
+    ExamSummary,
     Certification,
     LessonQuiz,
     LessonQuizAttempt,
@@ -39,11 +42,47 @@ from .models import (
     Cohort,
     CohortMember,
 )
+from django.conf import settings
 from django.contrib import messages
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models import Avg, Count, Q, Sum
+from django.db.models import Case, F, Func, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Lower
+from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, timezone as dt_timezone
+from .utils.analytics import get_course_type_stats, get_trophy_distribution
+from .utils.progress import get_course_progress_matrix
+from .utils.funnel import (
+    RETENTION_WEEKS,
+    course_completion_times,
+    get_progress_frame,
+    lesson_completion_times,
+    lesson_funnel,
+    weekly_retention,
+)
+from .utils.perf import registry as perf_registry
+from .utils.exports import EXPORTS, PARQUET_AVAILABLE, export_queryset, iterate_async, stream_csv, stream_parquet
+from .utils.quiz_grading import get_answer_key, regrade_attempts
+from .utils.item_analysis import get_item_statistics
+from .utils.quiz_import import add_questions, import_quizzes, parse_csv_questions, parse_pdf_questions
+from .utils.quiz_generation import (
+    QuizGenerationError, generate_questions, generation_hash, get_quiz_backend, lesson_quiz_content,
+)
+from .utils.activity import (
+    get_activity_feed,
+    get_latest_feed,
+    LATEST_FEED_SIZE,
+    serialize_event,
+    LiveActivityBuffer,
+    CHANNELS_AVAILABLE,
+    STAFF_ACTIVITY_GROUP,
+    LIVE_BATCH_WINDOW_SECONDS,
+)
+if CHANNELS_AVAILABLE:
+    from channels.layers import get_channel_layer
 
 
 @staff_member_required
@@ -93,27 +132,26 @@ def dashboard_home(request):
         issued_at__gte=timezone.now() - timedelta(days=30)
     ).count() if Certification.objects.filter(issued_at__isnull=False).exists() else 0
     
-    # Course Performance Analytics
+    # Course Performance Analytics (one query: every count is a subquery)
+    course = OuterRef('pk')
+    top_courses = Course.objects.annotate(
+        enrollment_count=_subquery_count(CourseEnrollment.objects.filter(course=course)),
+        access_count=_subquery_count(CourseAccess.objects.filter(course=course, status='unlocked')),
+        lesson_total=_subquery_count(Lesson.objects.filter(course=course)),
+        completed_count=_subquery_count(UserProgress.objects.filter(lesson__course=course, completed=True)),
+        certification_count=_subquery_count(Certification.objects.filter(course=course, status='passed')),
+    )[:10]
     course_performance = []
-    for course in Course.objects.all()[:10]:
-        enrollments = CourseEnrollment.objects.filter(course=course).count()
-        accesses = CourseAccess.objects.filter(course=course, status='unlocked').count()
-        total_students_course = enrollments + accesses
-        
-        total_lessons_course = course.lessons.count()
-        completed = UserProgress.objects.filter(
-            lesson__course=course,
-            completed=True
-        ).count()
-        course_completion_rate = (completed / (total_lessons_course * total_students_course * 100)) if total_students_course > 0 and total_lessons_course > 0 else 0
-        
-        certifications_course = Certification.objects.filter(course=course, status='passed').count()
+    for course in top_courses:
+        total_students_course = course.enrollment_count + course.access_count
+        total_lessons_course = course.lesson_total
+        course_completion_rate = (course.completed_count / (total_lessons_course * total_students_course * 100)) if total_students_course > 0 and total_lessons_course > 0 else 0
         
         course_performance.append({
             'course': course,
             'total_students': total_students_course,
             'completion_rate': min(course_completion_rate * 100, 100),
-            'certifications': certifications_course,
+            'certifications': course.certification_count,
             'lessons': total_lessons_course,
         })
     
@@ -169,6 +207,118 @@ def dashboard_home(request):
     })
 
 
+ACTIVITY_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+STUDENTS_PER_PAGE = 50
+
+# Comment line sent on idle SSE connections so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+# Streams end after this long and EventSource reconnects, so no connection is held forever
+SSE_MAX_SECONDS = 5 * 60
+
+
+def _student_course_filter(user_ref, course_field, course_id=None):
+    """
+    Q restricting ``course_field`` to the courses a student can see:
+    legacy enrollments plus unlocked CourseAccess records.
+    """
+    enrolled = CourseEnrollment.objects.filter(user=user_ref).values('course_id')
+    accessed = CourseAccess.objects.filter(user=user_ref, status='unlocked').values('course_id')
+    scope = Q(**{f'{course_field}__in': enrolled}) | Q(**{f'{course_field}__in': accessed})
+    if course_id:
+        scope &= Q(**{course_field: course_id})
+    return scope
+
+
+def _subquery_count(queryset):
+    """Scalar COUNT(*) subquery without a GROUP BY on the outer query"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().annotate(n=Func(F('pk'), function='COUNT')).values('n')[:1],
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
+
+
+def annotate_student_stats(students_query, course_id=None):
+    """
+    Annotate a User queryset with everything the student list shows.
+    Every figure is a correlated subquery, so the whole page is one query
+    regardless of how many students or courses there are.
+    """
+    user = OuterRef('pk')
+    nested_user = OuterRef(OuterRef('pk'))
+
+    students_query = students_query.annotate(
+        course_count=_subquery_count(
+            Course.objects.filter(_student_course_filter(nested_user, 'id', course_id))
+        ),
+        total_lessons=_subquery_count(
+            Lesson.objects.filter(_student_course_filter(nested_user, 'course_id', course_id))
+        ),
+        completed_lessons=_subquery_count(
+            UserProgress.objects.filter(user=user, completed=True).filter(
+                _student_course_filter(nested_user, 'lesson__course_id', course_id)
+            )
+        ),
+        certifications_count=_subquery_count(
+            Certification.objects.filter(user=user, status='passed').filter(
+                _student_course_filter(nested_user, 'course_id', course_id)
+            )
+        ),
+        last_progress_at=Subquery(
+            UserProgress.objects.filter(user=user).order_by('-last_accessed').values('last_accessed')[:1]
+        ),
+        last_exam_at=Subquery(
+            ExamAttempt.objects.filter(user=user).order_by('-started_at').values('started_at')[:1]
+        ),
+        last_cert_at=Subquery(
+            Certification.objects.filter(user=user, issued_at__isnull=False)
+            .order_by('-issued_at').values('issued_at')[:1]
+        ),
+    )
+
+    epoch = Value(ACTIVITY_EPOCH, output_field=models.DateTimeField())
+    return students_query.annotate(
+        overall_progress=Case(
+            When(total_lessons__gt=0, then=F('completed_lessons') * 100 / F('total_lessons')),
+            default=Value(0),
+            output_field=models.IntegerField(),
+        ),
+        # GREATEST returns NULL on SQLite if any argument is NULL
+        last_activity_at=Greatest(
+            Coalesce('last_progress_at', epoch),
+            Coalesce('last_exam_at', epoch),
+            Coalesce('last_cert_at', epoch),
+        ),
+    ).annotate(
+        student_status=Case(
+            When(certifications_count__gt=0, then=Value('certified')),
+            When(overall_progress__gte=100, then=Value('completed')),
+            When(overall_progress__gt=0, then=Value('active')),
+            default=Value('inactive'),
+            output_field=models.CharField(),
+        ),
+    )
+
+
+def _recent_activity(student):
+    """Most recent (kind, timestamp) from the annotated last_* columns"""
+    activities = [
+        (kind, timestamp)
+        for kind, timestamp in (
+            ('progress', student.last_progress_at),
+            ('exam', student.last_exam_at),
+            ('cert', student.last_cert_at),
+        )
+        if timestamp
+    ]
+    if not activities:
+        return None
+    return max(activities, key=lambda activity: activity[1])
+
+
 @staff_member_required
 def dashboard_students(request):
     """Smart student list with activity updates and filtering"""
@@ -179,21 +329,9 @@ def dashboard_students(request):
     sort_by = request.GET.get('sort', 'recent')  # recent, progress, name, enrolled
     
     # Get all users including admin/staff
-    # Show all users who have activity OR all users if none have activity
+    # Staff enrollments are managed by the enroll_staff management command
     students_query = User.objects.all()
     
-    # Auto-enroll admin/staff users in all active courses if they don't have enrollments
-    admin_users = students_query.filter(Q(is_staff=True) | Q(is_superuser=True))
-    active_courses = Course.objects.filter(status='active')
-    
-    for admin_user in admin_users:
-        for course in active_courses:
-            CourseEnrollment.objects.get_or_create(
-                user=admin_user,
-                course=course,
-                defaults={'payment_type': 'full'}
-            )
-    
     # Apply search filter
     if search_query:
         students_query = students_query.filter(
@@ -203,115 +341,41 @@ def dashboard_students(request):
             Q(last_name__icontains=search_query)
         )
     
-    # Get student data with activity
-    students_data = []
-    for student in students_query:
-        # Get enrollments (legacy system)
-        enrollments = CourseEnrollment.objects.filter(user=student).select_related('course')
-        
-        # Get course access records (new access control system)
-        course_accesses = CourseAccess.objects.filter(
-            user=student,
-            status='unlocked'
-        ).select_related('course')
-        
-        # Combine both - get unique courses from enrollments and accesses
-        enrollment_courses = set(enrollments.values_list('course_id', flat=True))
-        access_courses = set(course_accesses.values_list('course_id', flat=True))
-        all_course_ids = enrollment_courses | access_courses
-        
-        # Apply course filter
-        if course_filter:
-            if int(course_filter) not in all_course_ids:
-                continue
-            all_course_ids = {int(course_filter)}
-        
-        # Get all courses for this student (even if empty, we still show the student)
-        student_courses = Course.objects.filter(id__in=all_course_ids) if all_course_ids else Course.objects.none()
-        
-        # Calculate overall stats
-        total_courses = len(all_course_ids)
-        total_lessons_all = 0
-        completed_lessons_all = 0
-        certifications_count = 0
-        recent_activity = None
-        
-        for course in student_courses:
-            total_lessons = course.lessons.count()
-            completed_lessons = UserProgress.objects.filter(
-                user=student,
-                lesson__course=course,
-                completed=True
-            ).count()
-            total_lessons_all += total_lessons
-            completed_lessons_all += completed_lessons
-            
-            # Check for certification
-            if Certification.objects.filter(user=student, course=course, status='passed').exists():
-                certifications_count += 1
-        
-        overall_progress = int((completed_lessons_all / total_lessons_all * 100)) if total_lessons_all > 0 else 0
-        
-        # Get most recent activity
-        recent_progress = UserProgress.objects.filter(user=student).order_by('-last_accessed').first()
-        recent_exam = ExamAttempt.objects.filter(user=student).order_by('-started_at').first()
-        recent_cert = Certification.objects.filter(user=student).order_by('-issued_at', '-created_at').first()
-        
-        # Determine most recent activity
-        activities = []
-        if recent_progress:
-            activities.append(('progress', recent_progress.last_accessed, recent_progress))
-        if recent_exam:
-            activities.append(('exam', recent_exam.started_at, recent_exam))
-        if recent_cert and recent_cert.issued_at:
-            activities.append(('cert', recent_cert.issued_at, recent_cert))
-        
-        if activities:
-            activities.sort(key=lambda x: x[1], reverse=True)
-            recent_activity = activities[0]
-        
-        # Determine status
-        if certifications_count > 0:
-            student_status = 'certified'
-        elif overall_progress == 100:
-            student_status = 'completed'
-        elif overall_progress > 0:
-            student_status = 'active'
-        else:
-            student_status = 'inactive'
-        
-        # Apply status filter
-        if status_filter != 'all':
-            if status_filter == 'active' and student_status != 'active':
-                continue
-            elif status_filter == 'completed' and student_status != 'completed':
-                continue
-            elif status_filter == 'certified' and student_status != 'certified':
-                continue
-        
-        students_data.append({
-            'student': student,
-            'total_courses': total_courses,
-            'total_lessons': total_lessons_all,
-            'completed_lessons': completed_lessons_all,
-            'overall_progress': overall_progress,
-            'certifications_count': certifications_count,
-            'recent_activity': recent_activity,
-            'status': student_status,
-            'enrollments': enrollments,
-            'course_accesses': course_accesses,
-            'courses': student_courses,
-        })
+    course_id = int(course_filter) if course_filter.isdigit() else None
+    students_query = annotate_student_stats(students_query, course_id=course_id)
+    
+    # Apply course filter
+    if course_id:
+        students_query = students_query.filter(course_count__gt=0)
+    
+    # Apply status filter
+    if status_filter in ('active', 'completed', 'certified'):
+        students_query = students_query.filter(student_status=status_filter)
     
     # Sort students
-    if sort_by == 'recent':
-        students_data.sort(key=lambda x: x['recent_activity'][1] if x['recent_activity'] else (timezone.now() - timezone.timedelta(days=365)), reverse=True)
-    elif sort_by == 'progress':
-        students_data.sort(key=lambda x: x['overall_progress'], reverse=True)
+    if sort_by == 'progress':
+        students_query = students_query.order_by('-overall_progress', 'id')
     elif sort_by == 'name':
-        students_data.sort(key=lambda x: x['student'].username.lower())
+        students_query = students_query.order_by(Lower('username'), 'id')
     elif sort_by == 'enrolled':
-        students_data.sort(key=lambda x: x['student'].date_joined, reverse=True)
+        students_query = students_query.order_by('-date_joined', 'id')
+    else:
+        students_query = students_query.order_by('-last_activity_at', 'id')
+    
+    page_obj = Paginator(students_query, STUDENTS_PER_PAGE).get_page(request.GET.get('page'))
+    
+    students_data = []
+    for student in page_obj:
+        students_data.append({
+            'student': student,
+            'total_courses': student.course_count,
+            'total_lessons': student.total_lessons,
+            'completed_lessons': student.completed_lessons,
+            'overall_progress': student.overall_progress,
+            'certifications_count': student.certifications_count,
+            'recent_activity': _recent_activity(student),
+            'status': student.student_status,
+        })
     
     # Get activity feed
     activity_feed = get_student_activity_feed(limit=50)
@@ -320,6 +384,7 @@ def dashboard_students(request):
     
     return render(request, 'dashboard/students.html', {
         'students_data': students_data,
+        'page_obj': page_obj,
         'activity_feed': activity_feed,
         'courses': courses,
         'course_filter': course_filter,
@@ -329,85 +394,89 @@ def dashboard_students(request):
     })
 
 
-def get_student_activity_feed(limit=20):
-    """Get a comprehensive activity feed of all student activities"""
-    activities = []
-    
-    # Recent lesson completions
-    recent_completions = UserProgress.objects.filter(
-        completed=True,
-        completed_at__isnull=False
-    ).select_related('user', 'lesson', 'lesson__course').order_by('-completed_at')[:limit]
-    
-    for progress in recent_completions:
-        activities.append({
-            'type': 'lesson_completed',
-            'timestamp': progress.completed_at,
-            'user': progress.user,
-            'course': progress.lesson.course,
-            'lesson': progress.lesson,
-            'data': {
-                'watch_percentage': progress.video_watch_percentage,
-            }
-        })
-    
-    # Recent exam attempts
-    recent_exams = ExamAttempt.objects.select_related('user', 'exam', 'exam__course').order_by('-started_at')[:limit]
-    
-    for attempt in recent_exams:
-        activities.append({
-            'type': 'exam_attempt',
-            'timestamp': attempt.started_at,
-            'user': attempt.user,
-            'course': attempt.exam.course,
-            'data': {
-                'score': attempt.score,
-                'passed': attempt.passed,
-                'attempt_number': attempt.attempt_number(),
-            }
-        })
-    
-    # Recent certifications
-    recent_certs = Certification.objects.filter(
-        issued_at__isnull=False
-    ).select_related('user', 'course').order_by('-issued_at')[:limit]
-    
-    for cert in recent_certs:
-        activities.append({
-            'type': 'certification_issued',
-            'timestamp': cert.issued_at,
-            'user': cert.user,
-            'course': cert.course,
-            'data': {
-                'certificate_id': cert.accredible_certificate_id,
-            }
-        })
-    
-    # Recent progress updates (video watch)
-    recent_progress = UserProgress.objects.filter(
-        video_watch_percentage__gt=0,
-        last_accessed__isnull=False
-    ).select_related('user', 'lesson', 'lesson__course').order_by('-last_accessed')[:limit]
-    
-    for progress in recent_progress:
-        # Only add if significant progress (avoid spam)
-        if progress.video_watch_percentage >= 50 or progress.completed:
-            activities.append({
-                'type': 'progress_update',
-                'timestamp': progress.last_accessed,
-                'user': progress.user,
-                'course': progress.lesson.course,
-                'lesson': progress.lesson,
-                'data': {
-                    'watch_percentage': progress.video_watch_percentage,
-                    'status': progress.status,
-                }
-            })
-    
-    # Sort by timestamp (most recent first)
-    activities.sort(key=lambda x: x['timestamp'], reverse=True)
+def get_student_activity_feed(limit=20, **filters):
+    """Latest activity events, newest first (single index range scan)"""
+    events, _ = get_activity_feed(limit=limit, **filters)
+    return events
+
+
+@staff_member_required
+def dashboard_activity_feed(request):
+    """
+    JSON activity feed with keyset pagination and user/course/type filters.
+    The unfiltered first page, which dashboards without a live stream poll,
+    is shared between viewers through get_latest_feed.
+    """
+    filters = ('user', 'course', 'type', 'cursor')
+    try:
+        limit = min(int(request.GET.get('limit', 50)), 200)
+        if limit <= LATEST_FEED_SIZE and not any(request.GET.get(name) for name in filters):
+            events, next_cursor = get_latest_feed(limit)
+            return JsonResponse({'success': True, 'events': events, 'next_cursor': next_cursor})
+        events, next_cursor = get_activity_feed(
+            limit=limit,
+            user=request.GET.get('user') or None,
+            course=request.GET.get('course') or None,
+            event_types=request.GET.getlist('type') or None,
+            cursor=request.GET.get('cursor') or None,
+        )
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid filter or cursor'}, status=400)
     
-    return activities[:limit]
+    return JsonResponse({
+        'success': True,
+        'events': [serialize_event(event) for event in events],
+        'next_cursor': next_cursor,
+    })
+
+
+@staff_member_required
+async def dashboard_activity_stream(request):
+    """
+    Server-Sent Events fallback for the live activity stream, for clients
+    that cannot open a WebSocket. Requires the ASGI server (daphne): under
+    WSGI each stream would hold a sync worker, so it answers 204, which
+    stops EventSource and makes the page poll dashboard_activity_feed.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    channel_layer = get_channel_layer() if CHANNELS_AVAILABLE else None
+    if channel_layer is None:
+        return JsonResponse({'success': False, 'error': 'Live activity stream is not configured'}, status=503)
+    
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(STAFF_ACTIVITY_GROUP, channel)
+        buffer = LiveActivityBuffer()
+        last_sent = loop.time()
+        closes_at = loop.time() + SSE_MAX_SECONDS
+        try:
+            yield 'retry: 5000\n\n'
+            while loop.time() < closes_at:
+                # Collect group messages for one batch window, then flush
+                deadline = loop.time() + LIVE_BATCH_WINDOW_SECONDS
+                while (remaining := deadline - loop.time()) > 0:
+                    try:
+                        message = await asyncio.wait_for(channel_layer.receive(channel), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    buffer.add(message['event'])
+                batch = buffer.drain()
+                if batch:
+                    yield f'data: {json.dumps(batch)}\n\n'
+                    last_sent = loop.time()
+                elif loop.time() - last_sent > SSE_KEEPALIVE_SECONDS:
+                    yield ': keepalive\n\n'
+                    last_sent = loop.time()
+        finally:
+            await channel_layer.group_discard(STAFF_ACTIVITY_GROUP, channel)
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @staff_member_required
@@ -510,9 +579,14 @@ def dashboard_lesson_quiz(request, lesson_id):
                     question.option_b = request.POST.get('q_option_b', '').strip()
                     question.option_c = request.POST.get('q_option_c', '').strip()
                     question.option_d = request.POST.get('q_option_d', '').strip()
+                    previous_option = question.correct_option
                     question.correct_option = request.POST.get('q_correct_option', 'A') or 'A'
                     question.save()
                     messages.success(request, 'Question updated.')
+                    if question.correct_option != previous_option:
+                        regraded = regrade_attempts(quiz)
+                        if regraded:
+                            messages.info(request, f'Answer key corrected: re-graded {regraded} attempt(s).')
                 except LessonQuizQuestion.DoesNotExist:
                     messages.error(request, 'Question not found.')
         elif action == 'delete_question':
@@ -523,11 +597,16 @@ def dashboard_lesson_quiz(request, lesson_id):
 
         return redirect('dashboard_lesson_quiz', lesson_id=lesson.id)
 
-    questions = LessonQuizQuestion.objects.filter(quiz=quiz).order_by('order', 'id')
+    questions = list(LessonQuizQuestion.objects.filter(quiz=quiz).order_by('order', 'id'))
+    item_analysis = get_item_statistics(quiz).summary()
+    items = dict(zip(get_answer_key(quiz.id).question_ids, item_analysis['items']))
+    for question in questions:
+        question.item = items.get(question.id)
     return render(request, 'dashboard/lesson_quiz.html', {
         'lesson': lesson,
         'quiz': quiz,
         'questions': questions,
+        'item_analysis': item_analysis,
     })
 
 
@@ -764,265 +843,70 @@ def dashboard_upload_quiz(request):
     })
 
 
-def parse_csv_quiz(uploaded_file, quiz):
-    """Parse CSV file and create quiz questions"""
-    # Read the file
-    file_content = uploaded_file.read().decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(file_content))
-    
-    questions_created = 0
-    max_order = quiz.questions.aggregate(models.Max('order'))['order__max'] or 0
+@staff_member_required
+def dashboard_import_quizzes(request):
+    """Import quizzes for many lessons of a course from a zip or several CSV/PDF files"""
+    courses = Course.objects.order_by('name')
+    report = None
+    selected_course_id = request.POST.get('course_id', '')
     
-    for row_num, row in enumerate(csv_reader, start=1):
-        try:
-            # Expected CSV format: question, option_a, option_b, option_c, option_d, correct_answer
-            question_text = row.get('question', '').strip()
-            if not question_text:
-                continue
-            
-            option_a = row.get('option_a', '').strip()
-            option_b = row.get('option_b', '').strip()
-            option_c = row.get('option_c', '').strip()
-            option_d = row.get('option_d', '').strip()
-            correct_answer = row.get('correct_answer', 'A').strip().upper()
-            
-            if not option_a or not option_b:
-                continue
-            
-            # Validate correct_answer
-            if correct_answer not in ['A', 'B', 'C', 'D']:
-                correct_answer = 'A'
-            
-            # Create question
-            LessonQuizQuestion.objects.create(
-                quiz=quiz,
-                text=question_text,
-                option_a=option_a,
-                option_b=option_b,
-                option_c=option_c if option_c else '',
-                option_d=option_d if option_d else '',
-                correct_option=correct_answer,
-                order=max_order + row_num,
-            )
-            questions_created += 1
-        except Exception as e:
-            # Skip rows with errors but continue processing
-            continue
+    if request.method == 'POST':
+        course = Course.objects.filter(id=selected_course_id).first() if selected_course_id.isdigit() else None
+        uploads = request.FILES.getlist('quiz_files')
+        dry_run = bool(request.POST.get('dry_run'))
+        if course is None:
+            messages.error(request, 'Please select a course.')
+        elif not uploads:
+            messages.error(request, 'Please select a zip archive or quiz files to upload.')
+        else:
+            report = import_quizzes(course, uploads, dry_run=dry_run, replace=bool(request.POST.get('replace')))
+            lesson_count = sum(1 for result in report['files'] if not result['errors'])
+            if report['imported']:
+                messages.success(request, f"Imported {report['questions']} question(s) into {lesson_count} lesson quiz(zes).")
+            elif any(result['errors'] for result in report['files']):
+                messages.error(request, 'Nothing was imported. Fix the files marked below and upload again.')
+            else:
+                messages.info(request, f"Dry run: {report['questions']} question(s) for {lesson_count} lesson(s) are ready to import.")
     
-    return questions_created
+    return render(request, 'dashboard/import_quizzes.html', {
+        'courses': courses,
+        'selected_course_id': selected_course_id,
+        'report': report,
+    })
+
+
+def parse_csv_quiz(uploaded_file, quiz):
+    """Parse CSV file and create quiz questions"""
+    # Rows without a valid answer default to A; invalid rows are skipped
+    questions = [question for _, question, _ in parse_csv_questions(uploaded_file, default_answer='A') if question]
+    return add_questions(quiz, questions)
 
 
 def generate_ai_quiz(lesson, quiz, num_questions=5):
     """Generate quiz questions using AI based on lesson content"""
-    if not OPENAI_AVAILABLE:
-        raise Exception('OpenAI is not available. Please install the openai package.')
-    
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        raise Exception('OPENAI_API_KEY not found in environment variables.')
-    
+    content_text = lesson_quiz_content(lesson)
+    if not content_text:
+        raise Exception('Lesson does not have enough content for AI generation. Please add a description or transcription.')
+
     try:
-        client = OpenAI(api_key=api_key)
-        
-        # Gather lesson content for AI context
-        lesson_content = []
-        if lesson.title:
-            lesson_content.append(f"Lesson Title: {lesson.title}")
-        if lesson.description:
-            lesson_content.append(f"Description: {lesson.description}")
-        if lesson.transcription:
-            lesson_content.append(f"Transcription: {lesson.transcription[:2000]}")  # Limit transcription length
-        if lesson.ai_full_description:
-            lesson_content.append(f"Full Description: {lesson.ai_full_description}")
-        
-        if not lesson_content:
-            raise Exception('Lesson does not have enough content for AI generation. Please add a description or transcription.')
-        
-        content_text = "\n\n".join(lesson_content)
-        
-        # Create prompt for AI
-        prompt = f"""Based on the following lesson content, generate {num_questions} multiple-choice quiz questions.
-
-Lesson Content:
-{content_text}
-
-Generate {num_questions} quiz questions with the following format:
-- Each question should test understanding of key concepts from the lesson
-- Each question should have 4 options (A, B, C, D)
-- One option should be clearly correct
-- The other options should be plausible but incorrect
-- Questions should vary in difficulty
-
-Return the questions in JSON format:
-{{
-  "questions": [
-    {{
-      "question": "Question text here",
-      "option_a": "Option A text",
-      "option_b": "Option B text",
-      "option_c": "Option C text",
-      "option_d": "Option D text",
-      "correct_answer": "A"
-    }}
-  ]
-}}
-
-Only return valid JSON, no additional text."""
-        
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that creates educational quiz questions. Always return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        # Parse response
-        response_text = response.choices[0].message.content.strip()
-        
-        # Clean up response (remove markdown code blocks if present)
-        if response_text.startswith('```'):
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-        if response_text.endswith('```'):
-            response_text = response_text.rsplit('```', 1)[0].strip()
-        
-        # Parse JSON
-        try:
-            quiz_data = json.loads(response_text)
-        except json.JSONDecodeError:
-            # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                quiz_data = json.loads(json_match.group())
-            else:
-                raise Exception('Failed to parse AI response as JSON.')
-        
-        # Create quiz questions
-        questions_created = 0
-        max_order = quiz.questions.aggregate(models.Max('order'))['order__max'] or 0
-        
-        for idx, q_data in enumerate(quiz_data.get('questions', []), start=1):
-            try:
-                question_text = q_data.get('question', '').strip()
-                option_a = q_data.get('option_a', '').strip()
-                option_b = q_data.get('option_b', '').strip()
-                option_c = q_data.get('option_c', '').strip()
-                option_d = q_data.get('option_d', '').strip()
-                correct_answer = q_data.get('correct_answer', 'A').strip().upper()
-                
-                if not question_text or not option_a or not option_b:
-                    continue
-                
-                if correct_answer not in ['A', 'B', 'C', 'D']:
-                    correct_answer = 'A'
-                
-                LessonQuizQuestion.objects.create(
-                    quiz=quiz,
-                    text=question_text,
-                    option_a=option_a,
-                    option_b=option_b,
-                    option_c=option_c if option_c else '',
-                    option_d=option_d if option_d else '',
-                    correct_option=correct_answer,
-                    order=max_order + idx,
-                )
-                questions_created += 1
-            except Exception as e:
-                continue
-        
-        return questions_created
-    
-    except Exception as e:
-        raise Exception(f'AI generation failed: {str(e)}')
+        # Asking for a lesson's quiz again means new questions, not the cached ones
+        questions, _ = generate_questions(get_quiz_backend(), content_text, num_questions, use_cache=False)
+    except QuizGenerationError as e:
+        raise Exception(str(e))
+    # Stamp the quiz like generate_course_quizzes does, unless it holds hand-written questions
+    hand_written = not quiz.generation_hash and quiz.questions.exists()
+    created = add_questions(quiz, questions)
+    if not hand_written:
+        quiz.generation_hash = generation_hash(content_text, num_questions)
+        quiz.save(update_fields=['generation_hash'])
+    return created
 
 
 def parse_pdf_quiz(uploaded_file, quiz):
     """Parse PDF file and create quiz questions"""
-    # Read PDF content
-    pdf_bytes = uploaded_file.read()
-    pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    
-    text_content = ""
-    for page in pdf_doc:
-        text_content += page.get_text()
-    
-    pdf_doc.close()
-    
-    # Try to parse questions from PDF text
-    # Expected format: Questions should be numbered (1., 2., etc.) with options A, B, C, D
-    questions_created = 0
-    max_order = quiz.questions.aggregate(models.Max('order'))['order__max'] or 0
-    
-    # Split by question numbers (1., 2., etc.)
-    question_pattern = r'(\d+\.\s+.*?)(?=\d+\.|$)'
-    questions_text = re.findall(question_pattern, text_content, re.DOTALL | re.IGNORECASE)
-    
-    for idx, question_block in enumerate(questions_text, start=1):
-        try:
-            lines = [line.strip() for line in question_block.split('\n') if line.strip()]
-            if len(lines) < 3:  # Need at least question + 2 options
-                continue
-            
-            question_text = lines[0].lstrip('0123456789. ').strip()
-            if not question_text:
-                continue
-            
-            # Extract options (looking for A., B., C., D. patterns)
-            options = {}
-            current_option = None
-            option_text = []
-            
-            for line in lines[1:]:
-                # Check if line starts with option letter
-                option_match = re.match(r'^([A-D])[\.\)]\s*(.*)$', line, re.IGNORECASE)
-                if option_match:
-                    # Save previous option if exists
-                    if current_option:
-                        options[current_option] = ' '.join(option_text).strip()
-                    current_option = option_match.group(1).upper()
-                    option_text = [option_match.group(2)]
-                elif current_option:
-                    option_text.append(line)
-            
-            # Save last option
-            if current_option:
-                options[current_option] = ' '.join(option_text).strip()
-            
-            # Need at least A and B options
-            if 'A' not in options or 'B' not in options:
-                continue
-            
-            # Determine correct answer (look for "Answer:" or "Correct:" patterns)
-            correct_answer = 'A'  # Default
-            for line in lines:
-                answer_match = re.search(r'(?:answer|correct)[:\s]+([A-D])', line, re.IGNORECASE)
-                if answer_match:
-                    correct_answer = answer_match.group(1).upper()
-                    break
-            
-            # Create question
-            LessonQuizQuestion.objects.create(
-                quiz=quiz,
-                text=question_text,
-                option_a=options.get('A', ''),
-                option_b=options.get('B', ''),
-                option_c=options.get('C', ''),
-                option_d=options.get('D', ''),
-                correct_option=correct_answer if correct_answer in ['A', 'B', 'C', 'D'] else 'A',
-                order=max_order + idx,
-            )
-            questions_created += 1
-        except Exception as e:
-            # Skip questions with errors
-            continue
-    
-    return questions_created
+    # Expected format: numbered questions (1., 2., etc.) with options A-D and an "Answer: X" line
+    parsed = parse_pdf_questions(uploaded_file.read(), default_answer='A')
+    return add_questions(quiz, [question for _, question, _ in parsed if question])
 
 
 @staff_member_required
@@ -1114,18 +998,25 @@ def dashboard_student_detail(request, user_id, course_slug=None):
         courses = [course]
     else:
         # Get all courses the user is enrolled in
-        courses = Course.objects.filter(enrollments__user=user).distinct()
+        courses = list(Course.objects.filter(enrollments__user=user).distinct())
+    
+    # One query each for lessons and progress across every course shown
+    lessons_by_course = {}
+    for lesson in Lesson.objects.filter(course__in=courses).order_by('order', 'id'):
+        lessons_by_course.setdefault(lesson.course_id, []).append(lesson)
+    progress_by_lesson = {
+        progress.lesson_id: progress
+        for progress in UserProgress.objects.filter(user=user, lesson__course__in=courses)
+    }
     
     course_data = []
     for course in courses:
         enrollment = CourseEnrollment.objects.filter(user=user, course=course).first()
         
         # Get all lessons with progress
-        lessons = course.lessons.order_by('order', 'id')
         lesson_progress = []
-        
-        for lesson in lessons:
-            progress = UserProgress.objects.filter(user=user, lesson=lesson).first()
+        for lesson in lessons_by_course.get(course.id, []):
+            progress = progress_by_lesson.get(lesson.id)
             lesson_progress.append({
                 'lesson': lesson,
                 'progress': progress,
@@ -1178,67 +1069,168 @@ def dashboard_student_detail(request, user_id, course_slug=None):
 
 @staff_member_required
 def dashboard_course_progress(request, course_slug):
-    """View all student progress for a specific course"""
+    """Students x lessons progress heatmap for a specific course"""
     course = get_object_or_404(Course, slug=course_slug)
+    lessons = list(course.lessons.order_by('order', 'id'))
+    matrix = get_course_progress_matrix(course, lessons)
     
-    # Get all enrollments for this course
-    enrollments = CourseEnrollment.objects.filter(course=course).select_related('user')
+    total_lessons = len(lessons)
+    completed_counts = matrix.completed_counts()
+    average_watch = matrix.average_watch()
+    
+    # Exam attempts and certifications for the whole roster, grouped in SQL
+    exam_stats = {
+        row['user_id']: row
+        for row in ExamSummary.objects.filter(exam__course=course).values('user_id', 'attempts_used', 'passed')
+    }
+    certifications = {cert.user_id: cert for cert in Certification.objects.filter(course=course)}
+    
+    # Sort by progress percentage (descending), then paginate the rows
+    order = sorted(range(len(matrix.user_ids)), key=lambda i: -int(completed_counts[i]))
+    paginator = Paginator(order, STUDENTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    users = User.objects.in_bulk([int(matrix.user_ids[i]) for i in page_obj.object_list])
     
-    # Calculate progress for each student
     student_progress = []
-    for enrollment in enrollments:
-        total_lessons = course.lessons.count()
-        completed_lessons = UserProgress.objects.filter(
-            user=enrollment.user,
-            lesson__course=course,
-            completed=True
-        ).count()
-        
-        # Get average video watch percentage
-        avg_watch = UserProgress.objects.filter(
-            user=enrollment.user,
-            lesson__course=course
-        ).aggregate(avg=Avg('video_watch_percentage'))['avg'] or 0
-        
-        # Get exam attempts
-        exam_attempts_count = 0
-        passed_exam = False
-        try:
-            exam = Exam.objects.get(course=course)
-            exam_attempts = ExamAttempt.objects.filter(user=enrollment.user, exam=exam)
-            exam_attempts_count = exam_attempts.count()
-            passed_exam = exam_attempts.filter(passed=True).exists()
-        except Exam.DoesNotExist:
-            pass
-        
-        # Get certification status
-        try:
-            cert = Certification.objects.get(user=enrollment.user, course=course)
+    for i in page_obj.object_list:
+        user_id = int(matrix.user_ids[i])
+        completed_lessons = int(completed_counts[i])
+        exams = exam_stats.get(user_id, {})
+        cert = certifications.get(user_id)
+        if cert:
             cert_status = cert.get_status_display()
-        except Certification.DoesNotExist:
+        else:
             cert_status = 'Not Eligible' if completed_lessons < total_lessons else 'Eligible'
         
         student_progress.append({
-            'user': enrollment.user,
-            'enrollment': enrollment,
+            'user': users[user_id],
             'total_lessons': total_lessons,
             'completed_lessons': completed_lessons,
-            'progress_percentage': int((completed_lessons / total_lessons * 100)) if total_lessons > 0 else 0,
-            'avg_watch_percentage': round(avg_watch, 1),
-            'exam_attempts': exam_attempts_count,
-            'passed_exam': passed_exam,
+            'progress_percentage': int(completed_lessons / total_lessons * 100) if total_lessons > 0 else 0,
+            'avg_watch_percentage': round(float(average_watch[i]), 1),
+            'exam_attempts': exams.get('attempts_used', 0),
+            'passed_exam': exams.get('passed', False),
             'cert_status': cert_status,
+            'cells': [
+                # In-progress cells shade from light to full teal with watch percentage
+                {'status': int(status), 'watch': round(float(watch)), 'shade': 0.2 + 0.8 * float(watch) / 100}
+                for status, watch in zip(matrix.status[i], matrix.watch[i])
+            ],
         })
     
-    # Sort by progress percentage (descending)
-    student_progress.sort(key=lambda x: x['progress_percentage'], reverse=True)
+    lesson_stats = [
+        dict(stats, lesson=lesson) for lesson, stats in zip(lessons, matrix.lesson_stats())
+    ]
     
     return render(request, 'dashboard/course_progress.html', {
         'course': course,
         'student_progress': student_progress,
+        'lesson_stats': lesson_stats,
+        'page_obj': page_obj,
+    })
+
+
+@staff_member_required
+def dashboard_course_funnel(request, course_slug):
+    """Per-lesson funnel, time-to-complete and weekly cohort retention for a course"""
+    course = get_object_or_404(Course, slug=course_slug)
+    lessons = list(course.lessons.order_by('order', 'id'))
+    frame = get_progress_frame(course)
+    
+    completion_buckets, median_completion_days = course_completion_times(frame, lessons)
+    
+    return render(request, 'dashboard/course_funnel.html', {
+        'course': course,
+        'learners': frame['user_id'].nunique(),
+        'funnel': lesson_funnel(frame, lessons),
+        'lesson_times': lesson_completion_times(frame, lessons),
+        'completion_buckets': completion_buckets,
+        'median_completion_days': median_completion_days,
+        'retention': weekly_retention(frame),
+        'retention_weeks': range(RETENTION_WEEKS),
     })
 
 
+# ========== PERFORMANCE ==========
+
+@staff_member_required
+def dashboard_perf(request):
+    """Per-view latency and query aggregates recorded by PerformanceMiddleware"""
+    if request.method == 'POST':
+        perf_registry.reset()
+        messages.success(request, 'Performance counters reset.')
+        return redirect('dashboard_perf')
+    
+    return render(request, 'dashboard/perf.html', {
+        'views': perf_registry.snapshot(),
+        'since': datetime.fromtimestamp(perf_registry.started_at, tz=dt_timezone.utc),
+        'query_budget': settings.PERF_QUERY_BUDGET,
+        'monitoring_enabled': settings.PERF_MONITORING,
+    })
+
+
+# ========== DATA EXPORTS ==========
+
+@staff_member_required
+def dashboard_exports(request):
+    """Pick a dataset, format and filters to download"""
+    return render(request, 'dashboard/exports.html', {
+        'exports': [(name, spec['label']) for name, spec in EXPORTS.items()],
+        'courses': Course.objects.order_by('name'),
+        'cohorts': Cohort.objects.order_by('name'),
+        'parquet_available': PARQUET_AVAILABLE,
+    })
+
+
+def _parse_export_date(value):
+    """YYYY-MM-DD query value to a date; None if blank, ValueError if malformed"""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date: {value}')
+    return parsed
+
+
+@staff_member_required
+def dashboard_export(request, export_name):
+    """Stream an export as CSV or Parquet, filtered by course, date range and cohort"""
+    if export_name not in EXPORTS:
+        raise Http404('Unknown export')
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'parquet'):
+        return JsonResponse({'success': False, 'error': 'Format must be csv or parquet'}, status=400)
+    if export_format == 'parquet' and not PARQUET_AVAILABLE:
+        return JsonResponse({'success': False, 'error': 'Parquet export requires pyarrow'}, status=400)
+    
+    try:
+        course_id = int(request.GET['course']) if request.GET.get('course') else None
+        cohort_id = int(request.GET['cohort']) if request.GET.get('cohort') else None
+        date_from = _parse_export_date(request.GET.get('from'))
+        date_to = _parse_export_date(request.GET.get('to'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid filter'}, status=400)
+    
+    columns, rows = export_queryset(
+        export_name, course_id=course_id, date_from=date_from, date_to=date_to, cohort_id=cohort_id,
+    )
+    if export_format == 'parquet':
+        content = stream_parquet(export_name, columns, rows)
+        content_type = 'application/vnd.apache.parquet'
+    else:
+        content = stream_csv(columns, rows)
+        content_type = 'text/csv'
+    if isinstance(request, ASGIRequest):
+        content = iterate_async(content)
+    
+    filename = f"{export_name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ========== ACCESS MANAGEMENT VIEWS ==========
 
 @staff_member_required
@@ -1613,25 +1605,7 @@ def dashboard_analytics(request):
     avg_lessons_per_student = round(total_lessons_completed / total_students, 1) if total_students > 0 else 0
     
     # Course completion rates by course type
-    course_type_stats = {}
-    for course_type, _ in Course.COURSE_TYPES:
-        courses_of_type = Course.objects.filter(course_type=course_type)
-        total_enrollments_type = CourseEnrollment.objects.filter(course__in=courses_of_type).count()
-        total_accesses_type = CourseAccess.objects.filter(course__in=courses_of_type, status='unlocked').count()
-        total_students_type = total_enrollments_type + total_accesses_type
-        
-        total_lessons_type = sum(c.lessons.count() for c in courses_of_type)
-        completed_lessons_type = UserProgress.objects.filter(
-            lesson__course__in=courses_of_type,
-            completed=True
-        ).count()
-        completion_rate_type = (completed_lessons_type / (total_lessons_type * total_students_type * 100)) if total_students_type > 0 and total_lessons_type > 0 else 0
-        
-        course_type_stats[course_type] = {
-            'total_courses': courses_of_type.count(),
-            'total_students': total_students_type,
-            'completion_rate': min(completion_rate_type * 100, 100),
-        }
+    course_type_stats = get_course_type_stats()
     
     # Certification rate (certifications / eligible students)
     students_with_all_lessons = []
@@ -1661,28 +1635,7 @@ def dashboard_analytics(request):
     certification_rate = (total_certifications / eligible_students_count * 100) if eligible_students_count > 0 else 0
     
     # Trophy distribution
-    trophy_distribution = {
-        'bronze': 0,  # 1 certification
-        'silver': 0,  # 3 certifications
-        'gold': 0,    # 5 certifications
-        'platinum': 0, # 8 certifications
-        'diamond': 0,  # 12 certifications
-        'ultimate': 0  # 20 certifications
-    }
-    for user in User.objects.filter(is_staff=False, is_superuser=False):
-        cert_count = Certification.objects.filter(user=user, status='passed').count()
-        if cert_count >= 20:
-            trophy_distribution['ultimate'] += 1
-        elif cert_count >= 12:
-            trophy_distribution['diamond'] += 1
-        elif cert_count >= 8:
-            trophy_distribution['platinum'] += 1
-        elif cert_count >= 5:
-            trophy_distribution['gold'] += 1
-        elif cert_count >= 3:
-            trophy_distribution['silver'] += 1
-        elif cert_count >= 1:
-            trophy_distribution['bronze'] += 1
+    trophy_distribution = get_trophy_distribution()
     
     # Exam & Quiz Analytics
     total_exam_attempts = ExamAttempt.objects.count()
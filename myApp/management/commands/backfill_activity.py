@@ -0,0 +1,131 @@
+"""
+Management command to backfill the activity log from existing records
+Usage: python manage.py backfill_activity [--force]
+
+Run once after deploying ActivityEvent so the staff feeds include history
+from before events were recorded at the source.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from myApp.models import (
+    ActivityEvent,
+    UserProgress,
+    LessonQuizAttempt,
+    ExamAttempt,
+    Certification,
+    CourseAccess,
+)
+from myApp.utils.activity import PROGRESS_MILESTONE
+
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Populate ActivityEvent from progress, quiz/exam attempts, certifications and access grants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Backfill even if the activity log already has events (may create duplicates)',
+        )
+
+    def handle(self, *args, **options):
+        if ActivityEvent.objects.exists() and not options['force']:
+            raise CommandError('Activity log is not empty. Use --force to backfill anyway.')
+
+        total = 0
+        with transaction.atomic():
+            for label, events in [
+                ('lesson progress', self._progress_events()),
+                ('quiz attempts', self._quiz_events()),
+                ('exam attempts', self._exam_events()),
+                ('certifications', self._certification_events()),
+                ('access grants', self._access_events()),
+            ]:
+                created = self._bulk_create(events)
+                total += created
+                self.stdout.write(f'  {label}: {created} event(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} activity event(s).'))
+
+    def _bulk_create(self, events):
+        created = 0
+        batch = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= BATCH_SIZE:
+                ActivityEvent.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            ActivityEvent.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+    def _progress_events(self):
+        rows = UserProgress.objects.filter(
+            Q(video_watch_percentage__gte=PROGRESS_MILESTONE) | Q(completed=True, completed_at__isnull=False)
+        ).values_list(
+            'user_id', 'lesson_id', 'lesson__course_id', 'completed', 'completed_at',
+            'video_watch_percentage', 'status', 'last_accessed',
+        )
+        for user_id, lesson_id, course_id, completed, completed_at, watch, status, last_accessed in rows.iterator(chunk_size=BATCH_SIZE):
+            if completed and completed_at:
+                yield ActivityEvent(
+                    user_id=user_id, course_id=course_id, lesson_id=lesson_id,
+                    event_type='lesson_completed', created_at=completed_at,
+                    data={'watch_percentage': watch},
+                )
+            elif not completed:
+                yield ActivityEvent(
+                    user_id=user_id, course_id=course_id, lesson_id=lesson_id,
+                    event_type='progress_update', created_at=last_accessed,
+                    data={'watch_percentage': watch, 'status': status},
+                )
+
+    def _quiz_events(self):
+        rows = LessonQuizAttempt.objects.values_list(
+            'user_id', 'quiz__lesson_id', 'quiz__lesson__course_id', 'score', 'passed', 'completed_at',
+        )
+        for user_id, lesson_id, course_id, score, passed, completed_at in rows.iterator(chunk_size=BATCH_SIZE):
+            yield ActivityEvent(
+                user_id=user_id, course_id=course_id, lesson_id=lesson_id,
+                event_type='quiz_attempt', created_at=completed_at,
+                data={'score': score, 'passed': passed},
+            )
+
+    def _exam_events(self):
+        rows = ExamAttempt.objects.order_by('started_at', 'id').values_list(
+            'user_id', 'exam__course_id', 'attempt_number', 'score', 'passed', 'started_at',
+        )
+        for user_id, course_id, attempt_number, score, passed, started_at in rows.iterator(chunk_size=BATCH_SIZE):
+            yield ActivityEvent(
+                user_id=user_id, course_id=course_id,
+                event_type='exam_attempt', created_at=started_at,
+                data={'score': score, 'passed': passed, 'attempt_number': attempt_number},
+            )
+
+    def _certification_events(self):
+        rows = Certification.objects.filter(issued_at__isnull=False).values_list(
+            'user_id', 'course_id', 'accredible_certificate_id', 'issued_at',
+        )
+        for user_id, course_id, certificate_id, issued_at in rows.iterator(chunk_size=BATCH_SIZE):
+            yield ActivityEvent(
+                user_id=user_id, course_id=course_id,
+                event_type='certification_issued', created_at=issued_at,
+                data={'certificate_id': certificate_id},
+            )
+
+    def _access_events(self):
+        rows = CourseAccess.objects.values_list('user_id', 'course_id', 'access_type', 'granted_at')
+        for user_id, course_id, access_type, granted_at in rows.iterator(chunk_size=BATCH_SIZE):
+            yield ActivityEvent(
+                user_id=user_id, course_id=course_id,
+                event_type='access_granted', created_at=granted_at,
+                data={'access_type': access_type},
+            )
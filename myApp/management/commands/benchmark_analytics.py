@@ -0,0 +1,112 @@
+"""
+Management command to benchmark the dashboard analytics aggregates
+Usage: python manage.py benchmark_analytics --users 50000
+
+Seeds synthetic students and certifications inside a transaction that is
+rolled back afterwards, so it is safe to run against a dev database.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from myApp.models import Course, Certification
+from myApp.utils.analytics import get_course_type_stats, get_trophy_distribution
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark trophy distribution and course-type stats against synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50000, help='Number of synthetic students')
+        parser.add_argument('--courses', type=int, default=24, help='Number of synthetic courses')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Also time the old one-query-per-user trophy loop (slow at 50k users)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options['users'], options['courses'], options['seed'])
+                self._run(options['legacy'])
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('Synthetic data rolled back.')
+
+    def _seed(self, n_users, n_courses, seed):
+        rng = random.Random(seed)
+        self.stdout.write(f'Seeding {n_users} students and {n_courses} courses...')
+        types = [course_type for course_type, _ in Course.COURSE_TYPES]
+        courses = Course.objects.bulk_create([
+            Course(
+                name=f'Bench Course {i}',
+                slug=f'bench-course-{i}',
+                course_type=types[i % len(types)],
+                description='',
+                short_description='',
+            )
+            for i in range(n_courses)
+        ])
+        User.objects.bulk_create(
+            [User(username=f'bench_student_{i}') for i in range(n_users)],
+            batch_size=5000,
+        )
+        user_ids = User.objects.filter(username__startswith='bench_student_').values_list('id', flat=True)
+        certs = []
+        for user_id in user_ids:
+            # Skewed distribution: most students hold zero or one certificate
+            for course in rng.sample(courses, min(int(rng.expovariate(0.4)), n_courses)):
+                certs.append(Certification(user_id=user_id, course=course, status='passed'))
+        Certification.objects.bulk_create(certs, batch_size=5000)
+        self.stdout.write(f'  {len(certs)} certifications')
+
+    def _time(self, label, func):
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label:<28} {elapsed * 1000:>10.1f} ms  {len(queries):>6} queries')
+        return result
+
+    def _run(self, legacy):
+        distribution = self._time('trophy_distribution', get_trophy_distribution)
+        self._time('course_type_stats', get_course_type_stats)
+        if legacy:
+            legacy_distribution = self._time('trophy_distribution (legacy)', self._legacy_trophies)
+            if legacy_distribution != distribution:
+                self.stdout.write(self.style.ERROR('Legacy and grouped trophy distributions differ!'))
+                return
+        self.stdout.write(self.style.SUCCESS(f'Trophy distribution: {distribution}'))
+
+    def _legacy_trophies(self):
+        distribution = {'bronze': 0, 'silver': 0, 'gold': 0, 'platinum': 0, 'diamond': 0, 'ultimate': 0}
+        for user in User.objects.filter(is_staff=False, is_superuser=False):
+            cert_count = Certification.objects.filter(user=user, status='passed').count()
+            if cert_count >= 20:
+                distribution['ultimate'] += 1
+            elif cert_count >= 12:
+                distribution['diamond'] += 1
+            elif cert_count >= 8:
+                distribution['platinum'] += 1
+            elif cert_count >= 5:
+                distribution['gold'] += 1
+            elif cert_count >= 3:
+                distribution['silver'] += 1
+            elif cert_count >= 1:
+                distribution['bronze'] += 1
+        return distribution
@@ -0,0 +1,190 @@
+"""
+Management command to benchmark the hot views against a stored baseline
+Usage: python manage.py benchmark_views [--users 200] [--courses 10] [--lessons-per-course 20]
+                                        [--progress-density 0.3] [--repeat 5]
+                                        [--save-baseline] [--baseline PATH] [--threshold 0.25]
+
+Seeds synthetic data with the same generator as seed_data --synthetic,
+drives each view through the Django test client and records median wall
+time and query count. The data is rolled back afterwards, so it is safe
+to run against a dev database (SQLite or whatever DATABASE_URL points to).
+
+Exits non-zero when a view runs more queries than the baseline, or its
+median time exceeds the baseline by more than --threshold.
+"""
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from myApp.models import CourseEnrollment, UserProgress
+from myApp.utils.synthetic import seed_synthetic
+
+
+# Time regressions smaller than this are treated as noise
+MIN_REGRESSION_MS = 5.0
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark wall time and query counts of the hot views against a JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Synthetic students')
+        parser.add_argument('--courses', type=int, default=10, help='Synthetic courses')
+        parser.add_argument('--lessons-per-course', type=int, default=20, help='Lessons per course')
+        parser.add_argument('--progress-density', type=float, default=0.3, help='Share of student/lesson pairs with progress')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per view (after one warm-up)')
+        parser.add_argument(
+            '--baseline',
+            help='Baseline JSON path (default: benchmarks/views-<database vendor>.json)',
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Allowed relative slowdown of the median before failing (default 0.25 = 25%%)',
+        )
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options['baseline'] or settings.BASE_DIR / 'benchmarks' / f'views-{connection.vendor}.json')
+        scale = {
+            key: options[key]
+            for key in ('users', 'courses', 'lessons_per_course', 'progress_density', 'seed')
+        }
+
+        setup_test_environment()
+        cache.clear()
+        try:
+            with transaction.atomic():
+                self.stdout.write(f'Seeding {scale} on {connection.vendor}...')
+                seed_synthetic(
+                    users=scale['users'],
+                    courses=scale['courses'],
+                    lessons_per_course=scale['lessons_per_course'],
+                    progress_density=scale['progress_density'],
+                    seed=scale['seed'],
+                    prefix='bench',
+                )
+                results = self._run(options['repeat'])
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('Synthetic data rolled back.')
+
+        report = {'vendor': connection.vendor, 'scale': scale, 'results': results}
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; run with --save-baseline first.'))
+            return
+        self._compare(json.loads(baseline_path.read_text()), report, options['threshold'])
+
+    def _scenarios(self):
+        """(name, method, url, payload) for each hot view, against seeded data"""
+        enrollment = (
+            CourseEnrollment.objects.filter(user__username__startswith='bench_student_')
+            .select_related('user', 'course')
+            .order_by('id')
+            .first()
+        )
+        student, course = enrollment.user, enrollment.course
+        lessons = list(course.lessons.order_by('order'))
+        untouched = next(
+            (lesson for lesson in lessons if not UserProgress.objects.filter(user=student, lesson=lesson).exists()),
+            lessons[-1],
+        )
+        return student, [
+            ('home', 'get', reverse('home'), None),
+            ('courses', 'get', reverse('courses'), None),
+            ('lesson_detail', 'get', reverse('lesson_detail', args=[course.slug, lessons[0].slug]), None),
+            ('student_dashboard', 'get', reverse('student_dashboard'), None),
+            ('dashboard_home', 'get', reverse('dashboard_home'), None),
+            ('dashboard_students', 'get', reverse('dashboard_students'), None),
+            ('dashboard_analytics', 'get', reverse('dashboard_analytics'), None),
+            ('update_video_progress', 'post', reverse('update_video_progress', args=[lessons[0].id]),
+             {'watch_percentage': 42, 'timestamp': 30}),
+            ('complete_lesson', 'post', reverse('complete_lesson', args=[untouched.id]), None),
+        ]
+
+    def _run(self, repeat):
+        student, scenarios = self._scenarios()
+        staff = User.objects.create_superuser('bench_admin', 'bench_admin@example.com', None)
+        student_client, staff_client = Client(), Client()
+        student_client.force_login(student)
+        staff_client.force_login(staff)
+
+        results = {}
+        self.stdout.write(f"{'view':<24} {'median ms':>10} {'min ms':>10} {'queries':>8}")
+        for name, method, url, payload in scenarios:
+            client = staff_client if name.startswith('dashboard_') else student_client
+            timings, queries = [], 0
+            for i in range(repeat + 1):
+                counted = []
+
+                def count_query(execute, sql, params, many, context):
+                    counted.append(sql)
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(count_query):
+                    start = time.perf_counter()
+                    if method == 'post':
+                        response = client.post(url, payload or {}, content_type='application/json')
+                    else:
+                        response = client.get(url)
+                    elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code >= 400:
+                    raise CommandError(f'{name} returned {response.status_code}')
+                if i:
+                    # First request warms caches and is not timed
+                    timings.append(elapsed)
+                    queries = max(queries, len(counted))
+
+            results[name] = {
+                'median_ms': round(statistics.median(timings), 2),
+                'min_ms': round(min(timings), 2),
+                'queries': queries,
+            }
+            self.stdout.write(f"{name:<24} {results[name]['median_ms']:>10.1f} {results[name]['min_ms']:>10.1f} {queries:>8}")
+        return results
+
+    def _compare(self, baseline, report, threshold):
+        if baseline.get('scale') != report['scale'] or baseline.get('vendor') != report['vendor']:
+            raise CommandError(
+                f"Baseline was recorded with {baseline.get('scale')} on {baseline.get('vendor')}; "
+                f"re-run with matching options or --save-baseline."
+            )
+
+        regressions = []
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if before is None:
+                continue
+            if result['queries'] > before['queries']:
+                regressions.append(f"{name}: {before['queries']} -> {result['queries']} queries")
+            slowdown = result['median_ms'] - before['median_ms']
+            if slowdown > MIN_REGRESSION_MS and result['median_ms'] > before['median_ms'] * (1 + threshold):
+                regressions.append(f"{name}: median {before['median_ms']} -> {result['median_ms']} ms")
+
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f'  {line}'))
+            raise CommandError(f'{len(regressions)} regression(s) against baseline')
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
@@ -0,0 +1,52 @@
+"""
+Management command to enroll staff/superusers in every active course
+Usage: python manage.py enroll_staff [--dry-run]
+
+Replaces the auto-enrollment that used to run on every dashboard_students load.
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from myApp.models import Course, CourseEnrollment
+
+
+class Command(BaseCommand):
+    help = 'Enroll all staff and superusers in every active course'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report missing enrollments without creating them',
+        )
+
+    def handle(self, *args, **options):
+        staff_ids = list(
+            User.objects.filter(Q(is_staff=True) | Q(is_superuser=True)).values_list('id', flat=True)
+        )
+        course_ids = list(Course.objects.filter(status='active').values_list('id', flat=True))
+        existing = set(
+            CourseEnrollment.objects.filter(user_id__in=staff_ids, course_id__in=course_ids)
+            .values_list('user_id', 'course_id')
+        )
+
+        missing = [
+            CourseEnrollment(user_id=user_id, course_id=course_id, payment_type='full')
+            for user_id in staff_ids
+            for course_id in course_ids
+            if (user_id, course_id) not in existing
+        ]
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{len(missing)} enrollment(s) missing for {len(staff_ids)} staff user(s) '
+                f'across {len(course_ids)} active course(s).'
+            )
+            return
+
+        CourseEnrollment.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(missing)} enrollment(s) for {len(staff_ids)} staff user(s) '
+            f'across {len(course_ids)} active course(s).'
+        ))
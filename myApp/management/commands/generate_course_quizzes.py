@@ -0,0 +1,62 @@
+"""
+Management command to generate AI quizzes for every lesson of a course
+Usage: python manage.py generate_course_quizzes <course_slug> [--questions 5] [--workers 4]
+                                               [--rpm 60] [--backend openai|fake] [--force]
+
+Lessons whose content has not changed since their quiz was generated are
+skipped, so re-running after editing a few lessons only regenerates those.
+Quizzes whose questions were written or imported by hand are kept as they
+are. --force regenerates every lesson with content, replacing those too.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.models import Course
+from myApp.utils.quiz_generation import QuizGenerationError, generate_course_quizzes, get_quiz_backend
+
+
+class Command(BaseCommand):
+    help = 'Generate AI quiz questions for all lessons of a course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_slug', help='Slug of the course')
+        parser.add_argument('--questions', type=int, default=5, help='Questions per lesson')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent model requests')
+        parser.add_argument('--rpm', type=int, default=60, help='Model requests per minute across all workers')
+        parser.add_argument('--backend', help='Generation backend (default: settings.QUIZ_GENERATION_BACKEND)')
+        parser.add_argument('--force', action='store_true', help='Regenerate lessons whose content is unchanged and replace hand-written quiz questions')
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(slug=options['course_slug'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course '{options['course_slug']}' not found")
+        if options['questions'] < 1:
+            raise CommandError('--questions must be at least 1')
+
+        try:
+            backend = get_quiz_backend(options['backend'])
+        except QuizGenerationError as e:
+            raise CommandError(str(e))
+
+        results = generate_course_quizzes(
+            course,
+            num_questions=options['questions'],
+            workers=options['workers'],
+            requests_per_minute=options['rpm'],
+            backend=backend,
+            force=options['force'],
+        )
+
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            line = f"{result['lesson'].title}: {result['status']}"
+            if result['questions']:
+                line += f" ({result['questions']} questions)"
+            if result['error']:
+                self.stdout.write(self.style.ERROR(f"{line} - {result['error']}"))
+            else:
+                self.stdout.write(line)
+
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(f'{course.name}: {summary}'))
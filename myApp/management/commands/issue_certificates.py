@@ -0,0 +1,75 @@
+"""
+Management command to (re)issue certificate PDFs in bulk
+Usage: python manage.py issue_certificates [course_slug ...] [--workers 4] [--upload-workers 8]
+                                           [--batch-size 500] [--storage local|cloudinary]
+                                           [--force] [--dry-run]
+
+Covers every passed certification of the given courses (all courses if none
+are given) whose PDF is missing or out of date, e.g. after turning on
+certificates for an existing course or fixing a typo in its name. Safe to
+interrupt: a re-run skips certificates that are already up to date.
+--force re-renders every certificate.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.models import Course
+from myApp.utils.certificate_issuance import issue_certificates, pending_certificates
+from myApp.utils.certificate_storage import CERTIFICATE_STORAGES, CertificateStorageError, get_certificate_storage
+
+
+class Command(BaseCommand):
+    help = 'Render and store certificate PDFs for passed certifications in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_slugs', nargs='*', help='Slugs of the courses (default: all)')
+        parser.add_argument('--workers', type=int, default=4, help='Rendering processes (0 renders in this process)')
+        parser.add_argument('--upload-workers', type=int, default=8, help='Concurrent uploads')
+        parser.add_argument('--batch-size', type=int, default=500, help='Certificates saved per batch')
+        parser.add_argument('--storage', choices=sorted(CERTIFICATE_STORAGES), help='Where PDFs are stored (default: settings.CERTIFICATE_STORAGE)')
+        parser.add_argument('--force', action='store_true', help='Re-render certificates that are up to date')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many certificates would be issued')
+
+    def handle(self, *args, **options):
+        courses = None
+        if options['course_slugs']:
+            courses = list(Course.objects.filter(slug__in=options['course_slugs']))
+            missing = set(options['course_slugs']) - {course.slug for course in courses}
+            if missing:
+                raise CommandError(f"Course(s) not found: {', '.join(sorted(missing))}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        try:
+            storage = get_certificate_storage(options['storage'])
+        except CertificateStorageError as e:
+            raise CommandError(str(e))
+
+        jobs = pending_certificates(courses, force=options['force'])
+        self.stdout.write(f'{len(jobs)} certificate(s) to issue')
+        if options['dry_run'] or not jobs:
+            return
+
+        def progress(stats):
+            done = stats['issued'] + stats['failed']
+            self.stdout.write(
+                f"  {done}/{len(jobs)} done, {stats['failed']} failed, "
+                f"{done / stats['seconds'] if stats['seconds'] else 0:.0f} certificates/s"
+            )
+
+        stats = issue_certificates(
+            jobs,
+            storage=storage,
+            workers=options['workers'],
+            upload_workers=options['upload_workers'],
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+
+        if stats['failures']:
+            self.stdout.write(self.style.ERROR(
+                f"Failed certifications (re-run to retry): {', '.join(map(str, stats['failures']))}"
+            ))
+        rate = stats['issued'] / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Issued {stats['issued']} certificate(s) in {stats['seconds']:.1f}s ({rate:.0f}/s)"
+        ))
@@ -0,0 +1,260 @@
+"""
+Management command to load test a running server with simulated learners
+Usage: python manage.py loadtest [--base-url http://127.0.0.1:8000] [--users 50] [--rate 2]
+                                 [--duration 60] [--heartbeat-interval 10] [--heartbeats 6]
+                                 [--prefix synthetic] [--password PASSWORD] [--json PATH]
+
+Logs in synthetic students (create them with
+`seed_data --synthetic --password PASSWORD`) and starts learner sessions at
+--rate per second for --duration seconds. Each session opens a lesson,
+sends video heartbeats every --heartbeat-interval seconds, takes the
+lesson quiz when there is one and completes the lesson.
+
+Point it at a local server using the same database, e.g.
+`gunicorn myProject.wsgi -w 4`, and compare runs at increasing --rate to
+find where update_video_progress and lesson_detail saturate.
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from myApp.models import CourseEnrollment, Lesson, LessonQuizQuestion, UserProgress
+
+
+# Share of quiz answers the simulated learner gets wrong
+QUIZ_MISTAKE_RATE = 0.2
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Replay learner sessions against a running server and report latency per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to load')
+        parser.add_argument('--users', type=int, default=50, help='Synthetic students to log in')
+        parser.add_argument('--prefix', default='synthetic', help='Username prefix used by seed_data --synthetic')
+        parser.add_argument('--password', required=True, help='Password given to seed_data --synthetic')
+        parser.add_argument('--rate', type=float, default=2.0, help='New learner sessions per second')
+        parser.add_argument('--duration', type=float, default=60.0, help='Seconds to keep starting sessions')
+        parser.add_argument('--heartbeat-interval', type=float, default=10.0, help='Seconds between video heartbeats')
+        parser.add_argument('--heartbeats', type=int, default=6, help='Heartbeats per lesson before completing it')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed')
+        parser.add_argument('--json', help='Also write the report to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['rate'] <= 0 or options['duration'] <= 0:
+            raise CommandError('--rate and --duration must be positive')
+
+        self.rng = random.Random(options['seed'])
+        plans = self._session_plans(options['prefix'], options['users'])
+        if not plans:
+            raise CommandError(
+                f"No enrolled students named {options['prefix']}_student_*. "
+                f"Run seed_data --synthetic --password ... first."
+            )
+
+        self.stdout.write(
+            f"{len(plans)} students, {options['rate']} sessions/s for {options['duration']}s "
+            f"against {options['base_url']}"
+        )
+        samples, wall_seconds = asyncio.run(self._run(plans, options))
+        report = self._report(samples, wall_seconds)
+        self._print_report(report)
+        if options['json']:
+            with open(options['json'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Report written to {options['json']}")
+
+    def _session_plans(self, prefix, limit):
+        """Per student: credentials and the lessons of one enrolled course, with quiz answers"""
+        enrollments = (
+            CourseEnrollment.objects.filter(user__username__startswith=f'{prefix}_student_')
+            .select_related('user', 'course')
+            .order_by('user_id', 'id')
+        )
+        by_user = {}
+        for enrollment in enrollments:
+            if enrollment.user_id not in by_user and len(by_user) < limit:
+                by_user[enrollment.user_id] = enrollment
+        if not by_user:
+            return []
+
+        course_ids = {enrollment.course_id for enrollment in by_user.values()}
+        lessons_by_course = defaultdict(list)
+        for lesson in Lesson.objects.filter(course_id__in=course_ids).order_by('order', 'id'):
+            lessons_by_course[lesson.course_id].append(lesson)
+
+        answers = defaultdict(dict)
+        for question_id, lesson_id, correct in LessonQuizQuestion.objects.filter(
+            quiz__lesson__course_id__in=course_ids
+        ).values_list('id', 'quiz__lesson_id', 'correct_option'):
+            answers[lesson_id][f'q_{question_id}'] = correct
+
+        completed = set(
+            UserProgress.objects.filter(user_id__in=by_user, completed=True, lesson__course_id__in=course_ids)
+            .values_list('user_id', 'lesson_id')
+        )
+
+        plans = []
+        for user_id, enrollment in by_user.items():
+            lessons = [
+                {
+                    'id': lesson.id,
+                    'url': reverse('lesson_detail', args=[enrollment.course.slug, lesson.slug]),
+                    'quiz_url': reverse('lesson_quiz', args=[enrollment.course.slug, lesson.slug]),
+                    'answers': answers.get(lesson.id, {}),
+                    'completed': (user_id, lesson.id) in completed,
+                }
+                for lesson in lessons_by_course[enrollment.course_id]
+            ]
+            if lessons:
+                plans.append({'username': enrollment.user.username, 'lessons': lessons})
+        return plans
+
+    async def _run(self, plans, options):
+        """Log everyone in, then start sessions at the target rate until --duration elapses"""
+        samples = defaultdict(list)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        clients = [
+            httpx.AsyncClient(base_url=options['base_url'], timeout=options['timeout'], limits=limits)
+            for _ in plans
+        ]
+        try:
+            logins = await asyncio.gather(*(
+                self._login(client, plan['username'], options['password'], samples)
+                for client, plan in zip(clients, plans)
+            ))
+            learners = [(client, plan) for client, plan, ok in zip(clients, plans, logins) if ok]
+            if not learners:
+                raise CommandError('No student could log in; check --password and --base-url')
+            self.stdout.write(f'{len(learners)}/{len(plans)} students logged in, starting sessions...')
+
+            # Login is a one-off cost; report it but keep it out of the session throughput
+            login_samples = samples.pop('login', []) + samples.pop('login_page', [])
+            sessions = []
+            start = time.perf_counter()
+            while time.perf_counter() - start < options['duration']:
+                client, plan = self.rng.choice(learners)
+                sessions.append(asyncio.create_task(self._session(client, plan, options, samples)))
+                # Poisson arrivals at the target rate
+                await asyncio.sleep(self.rng.expovariate(options['rate']))
+            await asyncio.gather(*sessions)
+            wall_seconds = time.perf_counter() - start
+            samples['login'] = login_samples
+        finally:
+            await asyncio.gather(*(client.aclose() for client in clients))
+        return samples, wall_seconds
+
+    async def _request(self, client, endpoint, samples, method, url, **kwargs):
+        """Time one request; record (latency ms, ok) under the endpoint name"""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        samples[endpoint].append(((time.perf_counter() - start) * 1000, ok))
+        return response
+
+    def _csrf_headers(self, client):
+        return {'X-CSRFToken': client.cookies.get('csrftoken', '')}
+
+    async def _login(self, client, username, password, samples):
+        login_url = reverse('login') + '?force=true'
+        await self._request(client, 'login_page', samples, 'GET', login_url)
+        response = await self._request(
+            client, 'login', samples, 'POST', login_url,
+            data={'username': username, 'password': password,
+                  'csrfmiddlewaretoken': client.cookies.get('csrftoken', '')},
+            headers=self._csrf_headers(client),
+        )
+        # A successful login redirects; a failed one re-renders the form
+        return response is not None and response.status_code == 302
+
+    async def _session(self, client, plan, options, samples):
+        """Open a lesson, send heartbeats, take its quiz if any, complete it"""
+        pending = [lesson for lesson in plan['lessons'] if not lesson['completed']]
+        lesson = pending[0] if pending else self.rng.choice(plan['lessons'])
+        await self._request(client, 'lesson_detail', samples, 'GET', lesson['url'])
+
+        progress_url = reverse('update_video_progress', args=[lesson['id']])
+        for beat in range(1, options['heartbeats'] + 1):
+            await asyncio.sleep(options['heartbeat_interval'])
+            watched = min(100.0, beat / options['heartbeats'] * 100)
+            await self._request(
+                client, 'update_video_progress', samples, 'POST', progress_url,
+                json={'watch_percentage': watched, 'timestamp': beat * options['heartbeat_interval']},
+                headers=self._csrf_headers(client),
+            )
+
+        if lesson['answers']:
+            await self._request(client, 'lesson_quiz', samples, 'GET', lesson['quiz_url'])
+            answers = {
+                field: correct if self.rng.random() >= QUIZ_MISTAKE_RATE else 'Z'
+                for field, correct in lesson['answers'].items()
+            }
+            answers['csrfmiddlewaretoken'] = client.cookies.get('csrftoken', '')
+            await self._request(
+                client, 'lesson_quiz_submit', samples, 'POST', lesson['quiz_url'],
+                data=answers, headers=self._csrf_headers(client),
+            )
+
+        response = await self._request(
+            client, 'complete_lesson', samples, 'POST', reverse('complete_lesson', args=[lesson['id']]),
+            headers=self._csrf_headers(client),
+        )
+        if response is not None and response.status_code < 400:
+            lesson['completed'] = True
+
+    def _report(self, samples, wall_seconds):
+        endpoints = {}
+        for endpoint, rows in sorted(samples.items()):
+            latencies = sorted(ms for ms, _ in rows)
+            errors = sum(1 for _, ok in rows if not ok)
+            endpoints[endpoint] = {
+                'requests': len(rows),
+                'errors': errors,
+                'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+                'throughput_rps': None if endpoint == 'login' else round(len(rows) / wall_seconds, 2),
+                'mean_ms': round(statistics.fmean(latencies), 1) if latencies else 0.0,
+                'p50_ms': round(percentile(latencies, 50), 1),
+                'p95_ms': round(percentile(latencies, 95), 1),
+                'p99_ms': round(percentile(latencies, 99), 1),
+            }
+        total = sum(row['requests'] for name, row in endpoints.items() if name != 'login')
+        return {
+            'wall_seconds': round(wall_seconds, 1),
+            'throughput_rps': round(total / wall_seconds, 2) if wall_seconds else 0.0,
+            'endpoints': endpoints,
+        }
+
+    def _print_report(self, report):
+        self.stdout.write(
+            f"\n{'endpoint':<24} {'requests':>9} {'err %':>7} {'req/s':>8} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for endpoint, row in report['endpoints'].items():
+            rps = '-' if row['throughput_rps'] is None else f"{row['throughput_rps']:.2f}"
+            line = (
+                f"{endpoint:<24} {row['requests']:>9} {row['error_rate'] * 100:>6.1f}% {rps:>8} "
+                f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+        self.stdout.write(
+            f"\n{report['throughput_rps']} req/s over {report['wall_seconds']}s (login excluded)"
+        )
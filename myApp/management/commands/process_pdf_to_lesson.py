@@ -147,12 +147,12 @@ class Command(BaseCommand):
             try:
                 if split_by_pages:
                     # Split PDF into multiple lessons
-                    chunks = pdf_extractor.extract_by_pages(pdf_file, split_by_pages)
-                    self.stdout.write(f'  Split into {len(chunks)} lesson(s)')
+                    chunks = pdf_extractor.iter_chunks(pdf_file, split_by_pages)
                     
                     for i, chunk in enumerate(chunks, 1):
                         lesson_num = i
                         suggested_title = f"{lesson_title or 'Lesson'} {lesson_num}" if lesson_title else f"Lesson {lesson_num}"
+                        self.stdout.write(f"  Lesson {lesson_num}: pages {chunk['start_page']}-{chunk['end_page']}")
                         
                         created, updated = self._process_pdf_chunk(
                             course, module, chunk['text'], suggested_title,
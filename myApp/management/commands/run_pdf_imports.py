@@ -0,0 +1,48 @@
+"""
+Management command to run PDF lesson imports left unfinished
+Usage: python manage.py run_pdf_imports [job_id ...] [--stale-after 300] [--workers 2] [--io-workers 8]
+
+Imports normally run in a background thread of the web process started by
+upload_pdf_lessons; a restart or deploy stops them mid-way. This finishes
+the given jobs, or every job no process is working on: running jobs whose
+heartbeat is older than --stale-after seconds and queued jobs never
+started within it. Files that were already imported are skipped.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.models import PDFImportJob
+from myApp.utils.pdf_import import HEARTBEAT_STALE, interrupted_pdf_imports, run_pdf_import
+
+
+class Command(BaseCommand):
+    help = 'Finish background PDF lesson imports interrupted by a restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job_ids', nargs='*', type=int, help='Import jobs to run (default: all interrupted)')
+        parser.add_argument('--stale-after', type=int, default=HEARTBEAT_STALE, help='Seconds without a heartbeat before a running job counts as interrupted')
+        parser.add_argument('--workers', type=int, default=settings.PDF_IMPORT_WORKERS, help='Extraction processes (0 extracts in this process)')
+        parser.add_argument('--io-workers', type=int, default=settings.PDF_IMPORT_IO_WORKERS, help='Concurrent uploads and AI calls')
+
+    def handle(self, *args, **options):
+        jobs = PDFImportJob.objects.select_related('course', 'module').order_by('created_at', 'id')
+        if options['job_ids']:
+            jobs = list(jobs.filter(pk__in=options['job_ids']))
+            missing = set(options['job_ids']) - {job.pk for job in jobs}
+            if missing:
+                raise CommandError(f"Import job(s) not found: {', '.join(map(str, sorted(missing)))}")
+        else:
+            jobs = list(jobs.filter(pk__in=interrupted_pdf_imports(options['stale_after']).values('pk')))
+
+        self.stdout.write(f'{len(jobs)} import job(s) to run')
+        for job in jobs:
+            self.stdout.write(f'Importing {job.files.count()} PDF(s) into {job.course.name} / {job.module.name}')
+            run_pdf_import(job.pk, workers=options['workers'], io_workers=options['io_workers'])
+            job.refresh_from_db()
+            for import_file in job.files.all():
+                style = self.style.ERROR if import_file.status == 'failed' else self.style.SUCCESS
+                self.stdout.write(style(
+                    f'  {import_file.name}: {import_file.get_status_display()}, '
+                    f'{import_file.lessons_created} created, {import_file.lessons_updated} updated'
+                    + (f' ({import_file.error})' if import_file.error else '')
+                ))
@@ -1,10 +1,13 @@
 """
 Management command to seed initial data
 Usage: python manage.py seed_data
+       python manage.py seed_data --synthetic --users 1000 --courses 20 --lessons-per-course 30 --progress-density 0.4
 """
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
+from django.db import transaction
 from myApp.models import Course, Lesson, Module
+from myApp.utils.synthetic import seed_synthetic
 import re
 import json
 import uuid
@@ -20,6 +23,24 @@ class Command(BaseCommand):
             type=str,
             help='Slug of the course to add lessons to (if not provided, will use or create default course)',
         )
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Generate synthetic students, courses and progress instead of the demo course',
+        )
+        parser.add_argument('--users', type=int, default=100, help='Synthetic students (with --synthetic)')
+        parser.add_argument('--courses', type=int, default=5, help='Synthetic courses (with --synthetic)')
+        parser.add_argument('--lessons-per-course', type=int, default=10, help='Lessons per synthetic course')
+        parser.add_argument(
+            '--progress-density',
+            type=float,
+            default=0.3,
+            help='Share of enrolled student/lesson pairs with progress, 0-1 (with --synthetic)',
+        )
+        parser.add_argument('--courses-per-student', type=int, default=2, help='Enrollments per synthetic student')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for synthetic data')
+        parser.add_argument('--prefix', default='synthetic', help='Username/slug prefix for synthetic data')
+        parser.add_argument('--password', help='Login password for synthetic students (default: unusable)')
 
     def generate_slug(self, title):
         """Generate a URL-friendly slug from a title"""
@@ -68,6 +89,30 @@ class Command(BaseCommand):
             "version": "2.28.2"
         }
 
+    def create_synthetic_data(self, options):
+        """Bulk-create synthetic data at the requested scale"""
+        if not 0 <= options['progress_density'] <= 1:
+            raise CommandError('--progress-density must be between 0 and 1')
+        if Course.objects.filter(slug__startswith=f"{options['prefix']}-course-").exists():
+            raise CommandError(f"Synthetic courses with prefix '{options['prefix']}' already exist. Use --prefix.")
+        
+        with transaction.atomic():
+            summary = seed_synthetic(
+                users=options['users'],
+                courses=options['courses'],
+                lessons_per_course=options['lessons_per_course'],
+                progress_density=options['progress_density'],
+                courses_per_student=options['courses_per_student'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                password=options['password'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(summary['student_ids'])} students, {len(summary['courses'])} courses, "
+            f"{summary['lessons']} lessons, {summary['enrollments']} enrollments, "
+            f"{summary['progress']} progress rows and {summary['certifications']} certifications"
+        ))
+
     def handle(self, *args, **options):
         self.stdout.write('Seeding data...')
         
@@ -82,6 +127,10 @@ class Command(BaseCommand):
         else:
             self.stdout.write('Admin user already exists')
         
+        if options['synthetic']:
+            self.create_synthetic_data(options)
+            return
+        
         # Get or create course
         course_slug = options.get('course_slug') or 'asset-mastery'
         
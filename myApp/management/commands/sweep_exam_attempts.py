@@ -0,0 +1,31 @@
+"""
+Management command to grade exam attempts left open past their deadline
+Usage: python manage.py sweep_exam_attempts [--loop] [--interval 30]
+
+Run it from cron every minute, or keep one process running with --loop.
+Learners who close the page before time runs out get their autosaved
+answers graded at the deadline.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from myApp.utils.exam_engine import sweep_expired_attempts
+
+
+class Command(BaseCommand):
+    help = 'Grade exam attempts whose deadline has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping until interrupted')
+        parser.add_argument('--interval', type=float, default=30.0, help='Seconds between sweeps with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            swept = sweep_expired_attempts()
+            if swept or not options['loop']:
+                self.stdout.write(f'Graded {swept} expired attempt(s) in {time.perf_counter() - started:.2f}s')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
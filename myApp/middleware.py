@@ -0,0 +1,68 @@
+"""
+Request performance instrumentation.
+Records latency, query count and time, repeated queries and template time
+per resolved view into myApp.utils.perf.registry, shown at /dashboard/perf/.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .utils.perf import (
+    QueryRecorder,
+    install_template_timer,
+    registry,
+    start_template_timer,
+    stop_template_timer,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    Always-on, low-overhead per-view metrics. Logs a warning when a request
+    runs more queries than PERF_QUERY_BUDGET. Disable with PERF_MONITORING=False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_MONITORING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        token = start_template_timer()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            template_seconds = stop_template_timer(token)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or '<unresolved>'
+        query_budget = getattr(settings, 'PERF_QUERY_BUDGET', 50)
+        over_budget = recorder.count > query_budget
+        if over_budget:
+            logger.warning(
+                f"Query budget exceeded: {view_name} ran {recorder.count} queries "
+                f"(budget {query_budget}) in {elapsed_ms:.0f} ms"
+            )
+
+        registry.record(
+            view_name,
+            elapsed_ms=elapsed_ms,
+            status_code=response.status_code,
+            queries=recorder.count,
+            db_ms=recorder.duration * 1000,
+            template_ms=template_seconds * 1000,
+            repeated=recorder.repeated(),
+            over_budget=over_budget,
+        )
+        return response
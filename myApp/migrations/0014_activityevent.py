@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0013_add_ai_chatbot_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('lesson_completed', 'Lesson Completed'), ('progress_update', 'Progress Update'), ('quiz_attempt', 'Quiz Attempt'), ('exam_attempt', 'Exam Attempt'), ('certification_issued', 'Certification Issued'), ('access_granted', 'Access Granted')], max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Event details (score, watch percentage, ...)')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to='myApp.course')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_events', to='myApp.lesson')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='myApp_activ_created_44f0d5_idx'), models.Index(fields=['course', '-created_at', '-id'], name='myApp_activ_course__cf7362_idx'), models.Index(fields=['user', '-created_at', '-id'], name='myApp_activ_user_id_7e91ff_idx'), models.Index(fields=['event_type', '-created_at', '-id'], name='myApp_activ_event_t_32c0d6_idx')],
+            },
+        ),
+    ]
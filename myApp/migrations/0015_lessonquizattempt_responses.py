@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0014_activityevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonquizattempt',
+            name='answer_key_version',
+            field=models.CharField(blank=True, default='', help_text='Question order the responses follow', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='lessonquizattempt',
+            name='responses',
+            field=models.TextField(blank=True, default='', help_text="One chosen option letter per question, '-' if unanswered"),
+        ),
+    ]
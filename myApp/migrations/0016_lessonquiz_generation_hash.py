@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0015_lessonquizattempt_responses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonquiz',
+            name='generation_hash',
+            field=models.CharField(blank=True, default='', help_text='Hash of the lesson content and prompt version the questions were generated from', max_length=64),
+        ),
+    ]
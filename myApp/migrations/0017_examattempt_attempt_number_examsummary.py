@@ -0,0 +1,68 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_attempts(apps, schema_editor):
+    """Number existing attempts in start order and build their exam summaries"""
+    ExamAttempt = apps.get_model('myApp', 'ExamAttempt')
+    ExamSummary = apps.get_model('myApp', 'ExamSummary')
+
+    summaries = {}
+    changed = []
+    for attempt in ExamAttempt.objects.order_by('started_at', 'id').only(
+        'id', 'user_id', 'exam_id', 'score', 'passed', 'started_at'
+    ).iterator(chunk_size=2000):
+        key = (attempt.user_id, attempt.exam_id)
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = ExamSummary(user_id=attempt.user_id, exam_id=attempt.exam_id)
+        summary.attempts_used += 1
+        if attempt.score is not None and (summary.best_score is None or attempt.score > summary.best_score):
+            summary.best_score = attempt.score
+        summary.passed = summary.passed or attempt.passed
+        summary.last_attempt_id = attempt.id
+        summary.last_attempt_at = attempt.started_at
+        attempt.attempt_number = summary.attempts_used
+        changed.append(attempt)
+        if len(changed) == 2000:
+            ExamAttempt.objects.bulk_update(changed, ['attempt_number'])
+            changed = []
+    ExamAttempt.objects.bulk_update(changed, ['attempt_number'])
+    ExamSummary.objects.bulk_create(summaries.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0016_lessonquiz_generation_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='attempt_number',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='1-based attempt number for this user and exam, assigned on insert'),
+        ),
+        migrations.CreateModel(
+            name='ExamSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_used', models.PositiveIntegerField(default=0)),
+                ('best_score', models.FloatField(blank=True, null=True)),
+                ('passed', models.BooleanField(default=False)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='myApp.exam')),
+                ('last_attempt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='myApp.examattempt')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Exam summaries',
+                'unique_together': {('user', 'exam')},
+            },
+        ),
+        migrations.RunPython(number_attempts, migrations.RunPython.noop),
+    ]
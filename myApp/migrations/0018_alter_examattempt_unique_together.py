@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:52
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Separate from 0017 so the unique index is built after the data migration commits"""
+
+    dependencies = [
+        ('myApp', '0017_examattempt_attempt_number_examsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='examattempt',
+            unique_together={('user', 'exam', 'attempt_number')},
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-19 06:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0018_alter_examattempt_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('option_a', models.CharField(max_length=300)),
+                ('option_b', models.CharField(max_length=300)),
+                ('option_c', models.CharField(blank=True, max_length=300)),
+                ('option_d', models.CharField(blank=True, max_length=300)),
+                ('correct_option', models.CharField(choices=[('A', 'Option A'), ('B', 'Option B'), ('C', 'Option C'), ('D', 'Option D')], max_length=1)),
+                ('order', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['order', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='answer_key_version',
+            field=models.CharField(blank=True, default='', help_text='Question order the responses were packed in', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='deadline_at',
+            field=models.DateTimeField(blank=True, help_text='Server-side submission deadline (null = no time limit)', null=True),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='responses',
+            field=models.TextField(blank=True, default='', help_text='Answers packed one option letter per question at grading time'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['deadline_at'], name='exam_attempt_open_deadline'),
+        ),
+        migrations.AddField(
+            model_name='examquestion',
+            name='exam',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='myApp.exam'),
+        ),
+    ]
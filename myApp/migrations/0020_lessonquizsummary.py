@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    """Build quiz summaries from existing attempts in completion order"""
+    LessonQuizAttempt = apps.get_model('myApp', 'LessonQuizAttempt')
+    LessonQuizSummary = apps.get_model('myApp', 'LessonQuizSummary')
+
+    summaries = {}
+    for attempt in LessonQuizAttempt.objects.order_by('completed_at', 'id').only(
+        'id', 'user_id', 'quiz_id', 'score', 'passed', 'completed_at'
+    ).iterator(chunk_size=2000):
+        key = (attempt.user_id, attempt.quiz_id)
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = LessonQuizSummary(user_id=attempt.user_id, quiz_id=attempt.quiz_id)
+        summary.attempts += 1
+        if attempt.score is not None and (summary.best_score is None or attempt.score > summary.best_score):
+            summary.best_score = attempt.score
+        summary.passed = summary.passed or attempt.passed
+        summary.last_attempt_id = attempt.id
+        summary.last_attempt_at = attempt.completed_at
+    LessonQuizSummary.objects.bulk_create(summaries.values(), batch_size=2000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0019_exam_engine'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonQuizSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('best_score', models.FloatField(blank=True, null=True)),
+                ('passed', models.BooleanField(default=False)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='myApp.lessonquizattempt')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='myApp.lessonquiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_quiz_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Lesson quiz summaries',
+                'unique_together': {('user', 'quiz')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0020_lessonquizsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certification',
+            name='certificate_hash',
+            field=models.CharField(blank=True, help_text='Fingerprint of the rendered certificate PDF; a mismatch means it needs reissuing', max_length=64),
+        ),
+    ]
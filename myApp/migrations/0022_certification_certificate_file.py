@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0021_certification_certificate_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certification',
+            name='certificate_file',
+            field=models.CharField(blank=True, help_text='Content-addressed name of the certificate PDF in certificate storage', max_length=255),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0022_certification_certificate_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='certification',
+            constraint=models.UniqueConstraint(condition=models.Q(('accredible_certificate_id', ''), _negated=True), fields=('accredible_certificate_id',), name='certification_unique_certificate_id'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-19 07:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0023_certification_unique_certificate_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PDFImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('use_ai', models.BooleanField(default=True)),
+                ('split_by_pages', models.PositiveIntegerField(blank=True, help_text='Pages per lesson; empty for one lesson per PDF', null=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_imports', to='myApp.course')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_imports', to='myApp.module')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PDFImportFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('name', models.CharField(max_length=255)),
+                ('path', models.CharField(help_text='Temporary copy of the upload, removed once imported', max_length=500)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('extracting', 'Extracting'), ('generating', 'Generating lessons'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('images', models.PositiveIntegerField(default=0)),
+                ('lessons_total', models.PositiveIntegerField(default=0)),
+                ('lessons_done', models.PositiveIntegerField(default=0)),
+                ('lessons_created', models.PositiveIntegerField(default=0)),
+                ('lessons_updated', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='myApp.pdfimportjob')),
+            ],
+            options={
+                'ordering': ['job', 'position'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0024_pdf_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Refreshed while the job runs; a stale one means it was interrupted', null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfimportjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
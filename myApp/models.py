@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
 import json
@@ -234,6 +236,7 @@ class LessonQuiz(models.Model):
     description = models.TextField(blank=True)
     is_required = models.BooleanField(default=True, help_text="If true, quiz must be passed to complete the lesson.")
     passing_score = models.IntegerField(default=70, help_text="Score percentage required to pass (0–100)")
+    generation_hash = models.CharField(max_length=64, blank=True, default='', help_text="Hash of the lesson content and prompt version the questions were generated from")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -275,6 +278,8 @@ class LessonQuizAttempt(models.Model):
     quiz = models.ForeignKey(LessonQuiz, on_delete=models.CASCADE, related_name='attempts')
     score = models.FloatField(null=True, blank=True, help_text="Score percentage (0–100)")
     passed = models.BooleanField(default=False)
+    responses = models.TextField(blank=True, default='', help_text="One chosen option letter per question, '-' if unanswered")
+    answer_key_version = models.CharField(max_length=12, blank=True, default='', help_text="Question order the responses follow")
     completed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -283,6 +288,88 @@ class LessonQuizAttempt(models.Model):
     def __str__(self):
         status = "Passed" if self.passed else "Failed"
         return f"{self.user.username} - {self.quiz.lesson.title} - {status}"
+    
+    def save(self, *args, **kwargs):
+        """New attempts are folded into the user's quiz summary; other saves rebuild it"""
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                LessonQuizSummary.record(self)
+            else:
+                LessonQuizSummary.rebuild(self.quiz_id, [self.user_id])
+
+
+class LessonQuizSummary(models.Model):
+    """
+    Quiz state per user, maintained on every LessonQuizAttempt write, so
+    lesson gating reads one row and a course's badges one query.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_quiz_summaries')
+    quiz = models.ForeignKey(LessonQuiz, on_delete=models.CASCADE, related_name='summaries')
+    attempts = models.PositiveIntegerField(default=0)
+    best_score = models.FloatField(null=True, blank=True)
+    passed = models.BooleanField(default=False)
+    last_attempt = models.ForeignKey(LessonQuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'quiz']
+        verbose_name_plural = 'Lesson quiz summaries'
+
+    def __str__(self):
+        status = "Passed" if self.passed else "Not passed"
+        return f"{self.user.username} - {self.quiz.lesson.title} - {status}"
+
+    @classmethod
+    def record(cls, attempt):
+        """Fold a new attempt in with one atomic UPDATE, so concurrent submissions need no lock"""
+        cls.objects.get_or_create(user_id=attempt.user_id, quiz_id=attempt.quiz_id)
+        changes = {
+            'attempts': models.F('attempts') + 1,
+            'last_attempt': attempt,
+            'last_attempt_at': attempt.completed_at,
+        }
+        if attempt.score is not None:
+            changes['best_score'] = Greatest(Coalesce('best_score', Value(attempt.score)), Value(attempt.score))
+        if attempt.passed:
+            changes['passed'] = True
+        cls.objects.filter(user_id=attempt.user_id, quiz_id=attempt.quiz_id).update(**changes)
+
+    @classmethod
+    def rebuild(cls, quiz_id, user_ids):
+        """Recompute existing summaries of one quiz from their attempts (after regrades and deletes)"""
+        attempts = LessonQuizAttempt.objects.filter(quiz_id=quiz_id, user_id__in=user_ids)
+        totals = {
+            row['user_id']: row
+            for row in attempts.values('user_id').annotate(
+                count=models.Count('id'),
+                best=models.Max('score'),
+                passes=models.Count('id', filter=models.Q(passed=True)),
+                last_at=models.Max('completed_at'),
+            )
+        }
+        last_ids = {}
+        for attempt_id, user_id in attempts.order_by('completed_at', 'id').values_list('id', 'user_id'):
+            last_ids[user_id] = attempt_id
+        summaries = list(cls.objects.filter(quiz_id=quiz_id, user_id__in=user_ids))
+        for summary in summaries:
+            row = totals.get(summary.user_id, {})
+            summary.attempts = row.get('count', 0)
+            summary.best_score = row.get('best')
+            summary.passed = row.get('passes', 0) > 0
+            summary.last_attempt_id = last_ids.get(summary.user_id)
+            summary.last_attempt_at = row.get('last_at')
+        cls.objects.bulk_update(summaries, ['attempts', 'best_score', 'passed', 'last_attempt', 'last_attempt_at'])
+
+    @classmethod
+    def for_course(cls, user, course):
+        """The user's summaries for every quiz in ``course``, keyed by lesson id (one query)"""
+        return {
+            summary.quiz.lesson_id: summary
+            for summary in cls.objects.filter(user=user, quiz__lesson__course=course).select_related('quiz', 'last_attempt')
+        }
+
 
 class UserProgress(models.Model):
     STATUS_CHOICES = [
@@ -427,32 +514,135 @@ class Exam(models.Model):
         return f"{self.course.name} - {self.title}"
 
 
+class ExamQuestion(models.Model):
+    """Multiple-choice question for a course's final exam"""
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='questions')
+    text = models.TextField()
+    option_a = models.CharField(max_length=300)
+    option_b = models.CharField(max_length=300)
+    option_c = models.CharField(max_length=300, blank=True)
+    option_d = models.CharField(max_length=300, blank=True)
+    correct_option = models.CharField(max_length=1, choices=LessonQuizQuestion.OPTION_CHOICES)
+    order = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['order', 'id']
+    
+    def __str__(self):
+        return f"Q{self.order} for {self.exam.title}"
+
+
 class ExamAttempt(models.Model):
     """Track individual exam attempts"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exam_attempts')
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='attempts')
+    attempt_number = models.PositiveIntegerField(default=0, editable=False, help_text="1-based attempt number for this user and exam, assigned on insert")
     score = models.FloatField(null=True, blank=True, help_text="Score percentage (0-100)")
     passed = models.BooleanField(default=False)
     started_at = models.DateTimeField(auto_now_add=True)
+    deadline_at = models.DateTimeField(null=True, blank=True, help_text="Server-side submission deadline (null = no time limit)")
     completed_at = models.DateTimeField(null=True, blank=True)
     time_taken_seconds = models.IntegerField(null=True, blank=True)
     answers = models.JSONField(default=dict, blank=True, help_text="Student's answers")
+    responses = models.TextField(blank=True, default='', help_text="Answers packed one option letter per question at grading time")
+    answer_key_version = models.CharField(max_length=12, blank=True, default='', help_text="Question order the responses were packed in")
     is_final = models.BooleanField(default=False, help_text="Whether this is the final/current attempt")
     
     class Meta:
         ordering = ['-started_at']
+        unique_together = ['user', 'exam', 'attempt_number']
+        indexes = [
+            # The expiry sweeper only ever scans attempts still in progress
+            models.Index(fields=['deadline_at'], condition=models.Q(completed_at__isnull=True), name='exam_attempt_open_deadline'),
+        ]
     
     def __str__(self):
         status = "Passed" if self.passed else "Failed"
-        return f"{self.user.username} - {self.exam.course.name} - Attempt {self.attempt_number()} - {status}"
+        return f"{self.user.username} - {self.exam.course.name} - Attempt {self.attempt_number} - {status}"
+    
+    def save(self, *args, **kwargs):
+        """
+        New attempts take the next number under a lock on the user's exam
+        summary row; every save keeps that summary current.
+        """
+        with transaction.atomic():
+            summary = ExamSummary.lock(self.user_id, self.exam_id)
+            if self._state.adding:
+                # Numbers continue after the highest one, even if earlier attempts were deleted
+                latest = ExamAttempt.objects.filter(user_id=self.user_id, exam_id=self.exam_id).aggregate(
+                    number=models.Max('attempt_number')
+                )['number']
+                self.attempt_number = (latest or 0) + 1
+                super().save(*args, **kwargs)
+                summary.record(self)
+            else:
+                super().save(*args, **kwargs)
+                ExamSummary.rebuild(self.user_id, self.exam_id)
+
+
+class ExamSummary(models.Model):
+    """
+    Exam state per user, maintained by ExamAttempt.save() and on attempt
+    deletion, so dashboards read one row instead of aggregating attempts.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exam_summaries')
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='summaries')
+    attempts_used = models.PositiveIntegerField(default=0)
+    best_score = models.FloatField(null=True, blank=True)
+    passed = models.BooleanField(default=False)
+    last_attempt = models.ForeignKey(ExamAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['user', 'exam']
+        verbose_name_plural = 'Exam summaries'
     
-    def attempt_number(self):
-        """Get the attempt number for this user and exam"""
-        return ExamAttempt.objects.filter(
-            user=self.user,
-            exam=self.exam,
-            started_at__lte=self.started_at
-        ).count()
+    def __str__(self):
+        return f"{self.user.username} - {self.exam.title} - {self.attempts_used} attempt(s)"
+    
+    @classmethod
+    def lock(cls, user_id, exam_id):
+        """The (user, exam) summary, created if missing and locked until the transaction ends"""
+        summary = cls.objects.select_for_update().filter(user_id=user_id, exam_id=exam_id).first()
+        if summary is None:
+            cls.objects.get_or_create(user_id=user_id, exam_id=exam_id)
+            summary = cls.objects.select_for_update().get(user_id=user_id, exam_id=exam_id)
+        return summary
+    
+    @classmethod
+    def rebuild(cls, user_id, exam_id):
+        """Recompute an existing summary from its attempts (after updates and deletes)"""
+        attempts = ExamAttempt.objects.filter(user_id=user_id, exam_id=exam_id)
+        totals = attempts.aggregate(
+            attempts_used=models.Count('id'),
+            best_score=models.Max('score'),
+            passed=models.Count('id', filter=models.Q(passed=True)),
+        )
+        last = attempts.order_by('-attempt_number').only('id', 'started_at').first()
+        cls.objects.filter(user_id=user_id, exam_id=exam_id).update(
+            attempts_used=totals['attempts_used'],
+            best_score=totals['best_score'],
+            passed=totals['passed'] > 0,
+            last_attempt=last,
+            last_attempt_at=last.started_at if last else None,
+        )
+    
+    def record(self, attempt):
+        """Fold a newly inserted attempt into this (locked) summary"""
+        self.attempts_used += 1
+        if attempt.score is not None and (self.best_score is None or attempt.score > self.best_score):
+            self.best_score = attempt.score
+        self.passed = self.passed or attempt.passed
+        self.last_attempt = attempt
+        self.last_attempt_at = attempt.started_at
+        self.save()
+    
+    @property
+    def attempts_remaining(self):
+        """None when the exam allows unlimited attempts"""
+        if not self.exam.max_attempts:
+            return None
+        return max(0, self.exam.max_attempts - self.attempts_used)
 
 
 class Certification(models.Model):
@@ -471,6 +661,14 @@ class Certification(models.Model):
     # Accredible Integration
     accredible_certificate_id = models.CharField(max_length=200, blank=True, help_text="Accredible certificate ID")
     accredible_certificate_url = models.URLField(blank=True, help_text="Link to Accredible certificate")
+    certificate_file = models.CharField(
+        max_length=255, blank=True,
+        help_text="Content-addressed name of the certificate PDF in certificate storage",
+    )
+    certificate_hash = models.CharField(
+        max_length=64, blank=True,
+        help_text="Fingerprint of the rendered certificate PDF; a mismatch means it needs reissuing",
+    )
     issued_at = models.DateTimeField(null=True, blank=True)
     
     # Related exam attempt that resulted in certification
@@ -488,6 +686,14 @@ class Certification(models.Model):
     class Meta:
         unique_together = ['user', 'course']
         ordering = ['-issued_at', '-created_at']
+        constraints = [
+            # Backs public verification lookups; rows without an ID are not indexed
+            models.UniqueConstraint(
+                fields=['accredible_certificate_id'],
+                condition=~models.Q(accredible_certificate_id=''),
+                name='certification_unique_certificate_id',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.course.name} - {self.get_status_display()}"
@@ -713,3 +919,124 @@ class LearningPathCourse(models.Model):
     def __str__(self):
         return f"{self.learning_path.name} - {self.course.name} (#{self.order})"
 
+
+
+# ========== ACTIVITY LOG ==========
+
+class ActivityEvent(models.Model):
+    """Append-only log of student activity, written where the activity happens"""
+    EVENT_TYPES = [
+        ('lesson_completed', 'Lesson Completed'),
+        ('progress_update', 'Progress Update'),
+        ('quiz_attempt', 'Quiz Attempt'),
+        ('exam_attempt', 'Exam Attempt'),
+        ('certification_issued', 'Certification Issued'),
+        ('access_granted', 'Access Granted'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_events')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='activity_events')
+    lesson = models.ForeignKey(Lesson, on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_events')
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPES)
+    data = models.JSONField(default=dict, blank=True, help_text="Event details (score, watch percentage, ...)")
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        # Every feed read is a range scan on one of these, newest first
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['course', '-created_at', '-id']),
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['event_type', '-created_at', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.get_event_type_display()} - {self.course.name}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("ActivityEvent is append-only; existing events cannot be modified.")
+        super().save(*args, **kwargs)
+    
+    @property
+    def type(self):
+        """Alias used by the dashboard feed templates"""
+        return self.event_type
+    
+    @property
+    def timestamp(self):
+        """Alias used by the dashboard feed templates"""
+        return self.created_at
+
+
+class PDFImportJob(models.Model):
+    """PDFs uploaded together to become lessons of one module, imported in the background"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='pdf_imports')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='pdf_imports')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    use_ai = models.BooleanField(default=True)
+    split_by_pages = models.PositiveIntegerField(null=True, blank=True, help_text="Pages per lesson; empty for one lesson per PDF")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Refreshed while the job runs; a stale one means it was interrupted")
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+    
+    def __str__(self):
+        return f"{self.course.name} - {self.module.name} - {self.get_status_display()}"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+
+class PDFImportFile(models.Model):
+    """One uploaded PDF of an import job, with its progress"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('extracting', 'Extracting'),
+        ('generating', 'Generating lessons'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    job = models.ForeignKey(PDFImportJob, on_delete=models.CASCADE, related_name='files')
+    position = models.PositiveIntegerField(default=0)
+    name = models.CharField(max_length=255)
+    path = models.CharField(max_length=500, help_text="Temporary copy of the upload, removed once imported")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    pages = models.PositiveIntegerField(default=0)
+    images = models.PositiveIntegerField(default=0)
+    lessons_total = models.PositiveIntegerField(default=0)
+    lessons_done = models.PositiveIntegerField(default=0)
+    lessons_created = models.PositiveIntegerField(default=0)
+    lessons_updated = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['job', 'position']
+    
+    def __str__(self):
+        return f"{self.name} - {self.get_status_display()}"
+    
+    @property
+    def percent(self):
+        """Share of the file's lessons saved; extraction counts as the first 10%"""
+        if self.status == 'completed':
+            return 100
+        if not self.lessons_total:
+            return 0
+        return 10 + 90 * self.lessons_done // self.lessons_total
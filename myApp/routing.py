@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/dashboard/activity/', consumers.StaffActivityConsumer.as_asgi()),
+]
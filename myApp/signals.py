@@ -0,0 +1,37 @@
+"""
+Signal receivers, connected in MyappConfig.ready()
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ExamAttempt, ExamQuestion, ExamSummary, LessonQuizAttempt, LessonQuizQuestion, LessonQuizSummary
+from .utils.exam_engine import invalidate_exam
+from .utils.quiz_grading import invalidate_answer_key
+
+
+@receiver([post_save, post_delete], sender=LessonQuizQuestion)
+def drop_cached_answer_key(sender, instance, **kwargs):
+    """Any question change invalidates the quiz's compiled answer key"""
+    invalidate_answer_key(instance.quiz_id)
+    # Again after commit, in case a concurrent request re-cached the old key
+    transaction.on_commit(lambda: invalidate_answer_key(instance.quiz_id))
+
+
+@receiver(post_delete, sender=ExamAttempt)
+def rebuild_exam_summary(sender, instance, **kwargs):
+    """Inserts and updates maintain the summary in ExamAttempt.save(); deletes land here"""
+    ExamSummary.rebuild(instance.user_id, instance.exam_id)
+
+
+@receiver(post_delete, sender=LessonQuizAttempt)
+def rebuild_lesson_quiz_summary(sender, instance, **kwargs):
+    """Inserts and updates maintain the summary in LessonQuizAttempt.save(); deletes land here"""
+    LessonQuizSummary.rebuild(instance.quiz_id, [instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def drop_cached_exam(sender, instance, **kwargs):
+    """Any question change invalidates the exam's cached answer key and paper"""
+    invalidate_exam(instance.exam_id)
+    transaction.on_commit(lambda: invalidate_exam(instance.exam_id))
@@ -1,3 +1,1648 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import inspect
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from unittest import expectedFailure, mock
 
-# Create your tests here.
+import fitz
+import numpy as np
+import pdfplumber
+from PIL import Image as PILImage
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from .models import (
+    Course,
+    Lesson,
+    UserProgress,
+    CourseEnrollment,
+    CourseAccess,
+    Certification,
+    Exam,
+    ExamAttempt,
+    ExamQuestion,
+    ExamSummary,
+    ActivityEvent,
+    Cohort,
+    CohortMember,
+    LessonQuiz,
+    LessonQuizQuestion,
+    LessonQuizAttempt,
+    LessonQuizSummary,
+    Bundle,
+    Module,
+    PDFImportJob,
+)
+from .dashboard_views import annotate_student_stats, generate_ai_quiz
+from .consumers import StaffActivityConsumer
+from .utils.activity import LiveActivityBuffer, get_activity_feed, record_activity
+from .utils.analytics import bucket_trophies, get_course_type_stats, get_trophy_distribution
+from .utils.progress import build_progress_matrix
+from .utils.perf import fingerprint, registry as perf_registry
+from .utils.funnel import get_progress_frame, lesson_funnel, weekly_retention
+from .utils.synthetic import seed_synthetic
+from .utils.quiz_grading import get_answer_key, grade, grade_many
+from .utils.item_analysis import ItemStatistics, get_item_statistics, response_matrix
+from .utils.quiz_generation import FakeQuizBackend, generate_course_quizzes, parse_quiz_response
+from .utils.certificate_generator import generate_certificate, generate_certificate_pdf, get_certificate_template, render_certificate_pdf
+from .utils.certificate_issuance import pending_certificates
+from .utils.certificate_storage import content_hash, get_certificate_storage
+from .utils.verification import (
+    BULK_VERIFY_RATE, BULK_VERIFY_WINDOW_SECONDS, MAX_BULK_VERIFY, VERIFY_CACHE_SECONDS, VERIFY_MISS_CACHE_SECONDS,
+)
+from .utils.pdf_extractor import PDFExtractor, _pdfplumber_pages, is_table_heavy
+from .utils.pdf_import import interrupted_pdf_imports, run_pdf_import
+from .utils.pdf_image_extractor import PDFImageExtractor
+from .management.commands.benchmark_pdf_extraction import build_manual
+from .utils.exam_engine import ExamError, save_answers, start_attempt, sweep_expired_attempts
+
+
+def make_course(slug, course_type='sprint', lessons=0):
+    course = Course.objects.create(
+        name=slug.title(),
+        slug=slug,
+        course_type=course_type,
+        description='',
+        short_description='',
+    )
+    for i in range(lessons):
+        Lesson.objects.create(course=course, title=f'Lesson {i}', slug=f'lesson-{i}', description='', order=i)
+    return course
+
+
+class AnalyticsAggregateTests(TestCase):
+    """Grouped aggregates must match the per-row loops they replaced."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = [
+            make_course(f'course-{i}', course_type=course_type, lessons=3)
+            for i, course_type in enumerate(['sprint', 'sprint', 'nlp'] + ['speaking'] * 20)
+        ]
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.students = [User.objects.create_user(f'student{i}') for i in range(8)]
+        # Certification counts chosen to land on and either side of each threshold
+        for student, n in zip(cls.students, [0, 1, 2, 3, 5, 8, 12, 20]):
+            for course in cls.courses[:n]:
+                Certification.objects.create(user=student, course=course, status='passed')
+        for course in cls.courses[:20]:
+            Certification.objects.create(user=cls.staff, course=course, status='passed')
+        Certification.objects.create(user=cls.students[1], course=cls.courses[22], status='failed')
+
+        for student in cls.students[:4]:
+            CourseEnrollment.objects.create(user=student, course=cls.courses[0])
+        CourseAccess.objects.create(user=cls.students[5], course=cls.courses[2], access_type='manual')
+        CourseAccess.objects.create(user=cls.students[6], course=cls.courses[2], access_type='manual', status='revoked')
+        for lesson in cls.courses[0].lessons.all():
+            UserProgress.objects.create(user=cls.students[0], lesson=lesson, completed=True)
+        UserProgress.objects.create(user=cls.students[5], lesson=cls.courses[2].lessons.first(), completed=True)
+
+    def legacy_trophy_distribution(self):
+        distribution = {tier: 0 for tier in ['bronze', 'silver', 'gold', 'platinum', 'diamond', 'ultimate']}
+        for user in User.objects.filter(is_staff=False, is_superuser=False):
+            cert_count = Certification.objects.filter(user=user, status='passed').count()
+            if cert_count >= 20:
+                distribution['ultimate'] += 1
+            elif cert_count >= 12:
+                distribution['diamond'] += 1
+            elif cert_count >= 8:
+                distribution['platinum'] += 1
+            elif cert_count >= 5:
+                distribution['gold'] += 1
+            elif cert_count >= 3:
+                distribution['silver'] += 1
+            elif cert_count >= 1:
+                distribution['bronze'] += 1
+        return distribution
+
+    def legacy_course_type_stats(self):
+        stats = {}
+        for course_type, _ in Course.COURSE_TYPES:
+            courses_of_type = Course.objects.filter(course_type=course_type)
+            total_students = (
+                CourseEnrollment.objects.filter(course__in=courses_of_type).count()
+                + CourseAccess.objects.filter(course__in=courses_of_type, status='unlocked').count()
+            )
+            total_lessons = sum(c.lessons.count() for c in courses_of_type)
+            completed = UserProgress.objects.filter(lesson__course__in=courses_of_type, completed=True).count()
+            rate = (completed / (total_lessons * total_students * 100)) if total_students > 0 and total_lessons > 0 else 0
+            stats[course_type] = {
+                'total_courses': courses_of_type.count(),
+                'total_students': total_students,
+                'completion_rate': min(rate * 100, 100),
+            }
+        return stats
+
+    def test_trophy_distribution_matches_legacy(self):
+        with self.assertNumQueries(1):
+            distribution = get_trophy_distribution()
+        self.assertEqual(distribution, self.legacy_trophy_distribution())
+        self.assertEqual(distribution, {
+            'bronze': 2, 'silver': 1, 'gold': 1, 'platinum': 1, 'diamond': 1, 'ultimate': 1,
+        })
+
+    def test_bucket_trophies_thresholds(self):
+        self.assertEqual(
+            bucket_trophies([0, 1, 2, 3, 4, 5, 7, 8, 11, 12, 19, 20, 99]),
+            {'bronze': 2, 'silver': 2, 'gold': 2, 'platinum': 2, 'diamond': 2, 'ultimate': 2},
+        )
+        self.assertEqual(sum(bucket_trophies([]).values()), 0)
+
+    def test_course_type_stats_matches_legacy(self):
+        with self.assertNumQueries(5):
+            stats = get_course_type_stats()
+        self.assertEqual(stats, self.legacy_course_type_stats())
+        self.assertEqual(list(stats), [course_type for course_type, _ in Course.COURSE_TYPES])
+
+
+class StudentListTests(TestCase):
+    """dashboard_students is one annotated queryset and has no side effects."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.course_a = make_course('course-a', lessons=4)
+        cls.course_b = make_course('course-b', lessons=2)
+        cls.done = User.objects.create_user('done')
+        cls.partial = User.objects.create_user('partial')
+        cls.certified = User.objects.create_user('certified')
+        cls.idle = User.objects.create_user('idle')
+
+        CourseEnrollment.objects.create(user=cls.done, course=cls.course_b)
+        for lesson in cls.course_b.lessons.all():
+            UserProgress.objects.create(user=cls.done, lesson=lesson, completed=True)
+
+        CourseEnrollment.objects.create(user=cls.partial, course=cls.course_a)
+        CourseAccess.objects.create(user=cls.partial, course=cls.course_b, access_type='manual')
+        CourseAccess.objects.create(user=cls.partial, course=cls.course_a, access_type='manual')
+        UserProgress.objects.create(user=cls.partial, lesson=cls.course_a.lessons.first(), completed=True)
+
+        CourseAccess.objects.create(user=cls.certified, course=cls.course_a, access_type='manual')
+        Certification.objects.create(
+            user=cls.certified, course=cls.course_a, status='passed', issued_at=timezone.now()
+        )
+        exam = Exam.objects.create(course=cls.course_a, title='Final')
+        ExamAttempt.objects.create(user=cls.certified, exam=exam, score=90, passed=True)
+
+        CourseAccess.objects.create(user=cls.idle, course=cls.course_a, access_type='manual', status='revoked')
+
+    def test_annotations(self):
+        rows = {user.username: user for user in annotate_student_stats(User.objects.all())}
+        partial = rows['partial']
+        self.assertEqual((partial.course_count, partial.total_lessons, partial.completed_lessons), (2, 6, 1))
+        self.assertEqual(rows['partial'].overall_progress, 16)
+        self.assertEqual(rows['partial'].student_status, 'active')
+        self.assertEqual(rows['done'].student_status, 'completed')
+        self.assertEqual(rows['certified'].student_status, 'certified')
+        self.assertEqual(rows['certified'].certifications_count, 1)
+        self.assertIsNotNone(rows['certified'].last_exam_at)
+        self.assertEqual(rows['idle'].course_count, 0)
+        self.assertEqual(rows['idle'].student_status, 'inactive')
+
+    def test_course_filter_scopes_counts(self):
+        rows = {
+            user.username: user
+            for user in annotate_student_stats(User.objects.all(), course_id=self.course_b.id)
+            .filter(course_count__gt=0)
+        }
+        self.assertEqual(set(rows), {'done', 'partial'})
+        self.assertEqual(rows['partial'].total_lessons, 2)
+        self.assertEqual(rows['partial'].student_status, 'inactive')
+
+    def test_view_does_not_enroll_staff(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard_students'), {'status': 'active', 'sort': 'progress'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [data['student'].username for data in response.context['students_data']],
+            ['partial'],
+        )
+        self.assertFalse(CourseEnrollment.objects.filter(user=self.admin).exists())
+
+
+class ActivityFeedTests(TestCase):
+    """Activity is logged at the source and read back with keyset pagination."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('learner', password='pw')
+        cls.other = User.objects.create_user('other')
+        cls.course = make_course('feed-course', lessons=2)
+        cls.other_course = make_course('other-course', lessons=1)
+
+    def test_complete_lesson_records_event_once(self):
+        self.client.force_login(self.student)
+        lesson = self.course.lessons.first()
+        url = reverse('complete_lesson', args=[lesson.id])
+        self.client.post(url)
+        self.client.post(url)
+        events = ActivityEvent.objects.filter(user=self.student, event_type='lesson_completed')
+        self.assertEqual([event.lesson_id for event in events], [lesson.id])
+
+    def test_progress_milestone_and_completion(self):
+        self.client.force_login(self.student)
+        lesson = self.course.lessons.first()
+        url = reverse('update_video_progress', args=[lesson.id])
+        for pct in (10, 55, 70, 95):
+            self.client.post(url, {'watch_percentage': pct, 'timestamp': 1}, content_type='application/json')
+        self.assertEqual(
+            list(ActivityEvent.objects.order_by('id').values_list('event_type', flat=True)),
+            ['progress_update', 'lesson_completed'],
+        )
+
+    def test_keyset_pagination_and_filters(self):
+        base = timezone.now()
+        for i in range(5):
+            record_activity(self.student, self.course, 'quiz_attempt', created_at=base)
+        record_activity(self.other, self.other_course, 'access_granted', created_at=base - timezone.timedelta(days=1))
+
+        seen = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                events, cursor = get_activity_feed(limit=2, cursor=cursor)
+            seen.extend(event.id for event in events)
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(ActivityEvent.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), 6)
+
+        events, _ = get_activity_feed(course=self.other_course)
+        self.assertEqual([event.event_type for event in events], ['access_granted'])
+        events, _ = get_activity_feed(user=self.student, event_types=['access_granted'])
+        self.assertEqual(events, [])
+
+    def test_events_are_append_only(self):
+        event = record_activity(self.student, self.course, 'quiz_attempt')
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_live_buffer_drops_oldest_when_full(self):
+        buffer = LiveActivityBuffer(max_pending=3)
+        self.assertIsNone(buffer.drain())
+        for i in range(5):
+            buffer.add({'id': i})
+        batch = buffer.drain()
+        self.assertEqual([event['id'] for event in batch['events']], [2, 3, 4])
+        self.assertEqual(batch['dropped'], 2)
+        self.assertIsNone(buffer.drain())
+
+    def test_polled_feed_page_is_shared_between_viewers(self):
+        cache.clear()
+        for i in range(3):
+            record_activity(self.student, self.course, 'quiz_attempt', data={'n': i})
+        url = reverse('dashboard_activity_feed')
+        viewers = [User.objects.create_superuser(f'viewer{i}', f'viewer{i}@example.com', None) for i in range(2)]
+        self.client.force_login(viewers[0])
+        first = self.client.get(url, {'limit': 2}).json()
+        self.client.force_login(viewers[1])
+        with mock.patch('myApp.utils.activity.get_activity_feed') as feed:
+            second = self.client.get(url, {'limit': 2}).json()
+        feed.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual([event['data']['n'] for event in second['events']], [2, 1])
+        # The cursor still pages on into the log
+        rest = self.client.get(url, {'limit': 2, 'cursor': second['next_cursor']}).json()
+        self.assertEqual([event['data']['n'] for event in rest['events']], [0])
+
+    def test_live_flush_waits_for_the_previous_send(self):
+        consumer = StaffActivityConsumer()
+        consumer.buffer = LiveActivityBuffer()
+        consumer.sending = None
+        sent = []
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def send_json(batch):
+                sent.append([event['id'] for event in batch['events']])
+                await release.wait()
+
+            consumer.send_json = send_json
+            consumer.buffer.add({'id': 1})
+            self.assertTrue(consumer.flush())
+            await asyncio.sleep(0)
+            consumer.buffer.add({'id': 2})
+            self.assertFalse(consumer.flush())
+            consumer.buffer.add({'id': 3})
+            release.set()
+            await consumer.sending
+            self.assertTrue(consumer.flush())
+            await consumer.sending
+
+        asyncio.run(scenario())
+        self.assertEqual(sent, [[1], [2, 3]])
+
+    def test_event_stream_is_not_served_under_wsgi(self):
+        self.client.force_login(User.objects.create_superuser('streamer', 'streamer@example.com', None))
+        # 204 stops EventSource from reconnecting; the page polls the JSON feed instead
+        self.assertEqual(self.client.get(reverse('dashboard_activity_stream')).status_code, 204)
+
+
+class ProgressMatrixTests(TestCase):
+    """The course progress heatmap is built from one pivoted progress query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.course = make_course('matrix-course', lessons=3)
+        cls.lessons = list(cls.course.lessons.order_by('order', 'id'))
+        cls.students = [User.objects.create_user(f'matrix{i}') for i in range(4)]
+        for student in cls.students:
+            CourseEnrollment.objects.create(user=student, course=cls.course)
+        # matrix0 finishes, matrix1 stops in lesson 2, matrix2 stops after lesson 1, matrix3 never starts
+        for lesson in cls.lessons:
+            UserProgress.objects.create(user=cls.students[0], lesson=lesson, status='completed', completed=True, video_watch_percentage=100)
+        UserProgress.objects.create(user=cls.students[1], lesson=cls.lessons[0], status='completed', completed=True, video_watch_percentage=100)
+        UserProgress.objects.create(user=cls.students[1], lesson=cls.lessons[1], status='in_progress', video_watch_percentage=40)
+        UserProgress.objects.create(user=cls.students[2], lesson=cls.lessons[0], status='completed', completed=True, video_watch_percentage=95)
+
+    def test_build_matrix_ignores_unknown_ids(self):
+        matrix = build_progress_matrix([3, 1], [20, 10], [
+            (1, 10, 'completed', True, 100.0),
+            (3, 20, 'in_progress', False, 30.0),
+            (3, 10, 'in_progress', True, 50.0),
+            (2, 10, 'completed', True, 100.0),
+            (1, 99, 'completed', True, 100.0),
+        ])
+        self.assertEqual(matrix.status.tolist(), [[1, 2], [0, 2]])
+        self.assertEqual(matrix.completed_counts().tolist(), [1, 1])
+        self.assertEqual(matrix.average_watch().tolist(), [40.0, 100.0])
+
+    def test_lesson_stats(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard_course_progress', args=[self.course.slug]))
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['lesson_stats']
+        self.assertEqual([row['completion_rate'] for row in stats], [75.0, 25.0, 25.0])
+        self.assertEqual([row['drop_off_rate'] for row in stats], [25.0, 25.0, 0.0])
+        rows = response.context['student_progress']
+        self.assertEqual(
+            [(row['user'].username, row['completed_lessons']) for row in rows],
+            [('matrix0', 3), ('matrix1', 1), ('matrix2', 1), ('matrix3', 0)],
+        )
+        self.assertEqual(rows[1]['avg_watch_percentage'], 70.0)
+
+    def test_completed_flag_wins_over_status(self):
+        # complete_lesson below the watch threshold, then update_status moves it back to in_progress
+        UserProgress.objects.create(user=self.students[3], lesson=self.lessons[0], status='in_progress', completed=True, video_watch_percentage=20)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard_course_progress', args=[self.course.slug]))
+        self.assertEqual([row['completion_rate'] for row in response.context['lesson_stats']], [100.0, 25.0, 25.0])
+        self.assertEqual(
+            [row['completed_lessons'] for row in response.context['student_progress'] if row['user'] == self.students[3]], [1],
+        )
+
+
+class ExportTests(TestCase):
+    """Exports stream filtered rows as CSV or Parquet."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.course = make_course('export-course', lessons=2)
+        cls.other_course = make_course('export-other', lessons=1)
+        cls.members = [User.objects.create_user(f'member{i}') for i in range(3)]
+        cls.outsider = User.objects.create_user('outsider')
+        cls.cohort = Cohort.objects.create(name='Export Cohort')
+        for user in cls.members:
+            CohortMember.objects.create(cohort=cls.cohort, user=user)
+        for user in cls.members + [cls.outsider]:
+            for lesson in Lesson.objects.filter(course__in=[cls.course, cls.other_course]):
+                UserProgress.objects.create(user=user, lesson=lesson, video_watch_percentage=50)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_csv_export_applies_filters(self):
+        url = reverse('dashboard_export', args=['progress'])
+        response = self.client.get(url, {'course': self.course.id, 'cohort': self.cohort.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,user_id,user__username'))
+        self.assertEqual(len(lines) - 1, len(self.members) * 2)
+        self.assertNotIn('outsider', ''.join(lines))
+
+    def test_parquet_export_round_trips(self):
+        import pyarrow.parquet as pq
+
+        response = self.client.get(reverse('dashboard_export', args=['progress']), {'format': 'parquet'})
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.num_rows, UserProgress.objects.count())
+        self.assertEqual(str(table.schema.field('completed').type), 'bool')
+
+    def test_invalid_filters(self):
+        url = reverse('dashboard_export', args=['certifications'])
+        self.assertEqual(self.client.get(url, {'from': '2025-13-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard_export', args=['nope'])).status_code, 404)
+
+
+class FunnelTests(TestCase):
+    """Funnel metrics come from one cached, incrementally refreshed extraction."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = make_course('funnel-course', lessons=3)
+        cls.lessons = list(cls.course.lessons.order_by('order', 'id'))
+        cls.learners = [User.objects.create_user(f'funnel{i}') for i in range(4)]
+        # funnel0 finishes; funnel1 skips lesson 2; funnel2 stops at lesson 2; funnel3 only opens lesson 1
+        done = {'status': 'completed', 'completed': True, 'video_watch_percentage': 100}
+        for lesson in cls.lessons:
+            UserProgress.objects.create(user=cls.learners[0], lesson=lesson, **done)
+        UserProgress.objects.create(user=cls.learners[1], lesson=cls.lessons[0], **done)
+        UserProgress.objects.create(user=cls.learners[1], lesson=cls.lessons[2], **done)
+        UserProgress.objects.create(user=cls.learners[2], lesson=cls.lessons[0], **done)
+        UserProgress.objects.create(user=cls.learners[2], lesson=cls.lessons[1], status='in_progress', video_watch_percentage=30)
+        UserProgress.objects.create(user=cls.learners[3], lesson=cls.lessons[0], video_watch_percentage=0)
+
+    def setUp(self):
+        # Row ids are reused after rollback, so frames cached by other tests could match
+        cache.clear()
+
+    def test_funnel_rates(self):
+        funnel = lesson_funnel(get_progress_frame(self.course), self.lessons)
+        self.assertEqual([step['reached_rate'] for step in funnel], [75.0, 50.0, 50.0])
+        self.assertEqual([step['completed_rate'] for step in funnel], [75.0, 25.0, 50.0])
+        self.assertEqual([step['completed_through_rate'] for step in funnel], [75.0, 25.0, 25.0])
+
+    def test_incremental_refresh(self):
+        get_progress_frame(self.course)
+        progress = UserProgress.objects.get(user=self.learners[2], lesson=self.lessons[1])
+        progress.completed = True
+        progress.save()
+        UserProgress.objects.filter(user=self.learners[3]).delete()
+
+        frame = get_progress_frame(self.course)
+        self.assertEqual(len(frame), UserProgress.objects.filter(lesson__course=self.course).count())
+        self.assertTrue(frame.loc[frame['id'] == progress.id, 'completed'].item())
+
+    def test_delete_hidden_by_same_row_count(self):
+        get_progress_frame(self.course)
+        # One row replaced by another older than the watermark: the count is unchanged
+        UserProgress.objects.filter(user=self.learners[3]).delete()
+        replacement = UserProgress.objects.create(user=self.learners[3], lesson=self.lessons[1])
+        UserProgress.objects.filter(pk=replacement.pk).update(last_accessed=timezone.now() - timezone.timedelta(days=30))
+
+        frame = get_progress_frame(self.course)
+        expected = UserProgress.objects.filter(lesson__course=self.course).values_list('id', flat=True)
+        self.assertEqual(sorted(frame['id']), sorted(expected))
+
+    def test_weekly_retention_starts_at_full_cohort(self):
+        retention = weekly_retention(get_progress_frame(self.course))
+        self.assertEqual(sum(cohort['size'] for cohort in retention), len(self.learners))
+        self.assertTrue(all(cohort['retention'][0] == 100.0 for cohort in retention))
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(reverse('dashboard_course_funnel', args=[self.course.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['learners'], 4)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Every request is recorded per view; staff can read the aggregates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.course = make_course('perf-course', lessons=2)
+
+    def setUp(self):
+        perf_registry.reset()
+        self.client.force_login(self.admin)
+
+    def test_fingerprint_ignores_parameters(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s) LIMIT 5'),
+        )
+
+    def test_requests_are_recorded_and_budget_logged(self):
+        self.client.get(reverse('dashboard_course_progress', args=[self.course.slug]))
+        with self.settings(PERF_QUERY_BUDGET=0), self.assertLogs('myApp.middleware', 'WARNING'):
+            self.client.get(reverse('dashboard_home'))
+
+        rows = {row['view']: row for row in perf_registry.snapshot()}
+        progress = rows['dashboard_course_progress']
+        self.assertEqual(progress['requests'], 1)
+        self.assertGreater(progress['avg_queries'], 0)
+        self.assertGreater(progress['avg_template_ms'], 0)
+        self.assertEqual(rows['dashboard_home']['over_budget'], 1)
+
+        response = self.client.get(reverse('dashboard_perf'))
+        self.assertContains(response, 'dashboard_course_progress')
+
+
+class QuizGradingTests(TestCase):
+    """Submissions are graded from the cached answer key and stored packed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.student = User.objects.create_user('learner', password='pw')
+        cls.course = make_course('quiz-course', lessons=1)
+        cls.lesson = cls.course.lessons.get()
+        CourseEnrollment.objects.create(user=cls.student, course=cls.course)
+        cls.quiz = LessonQuiz.objects.create(lesson=cls.lesson, title='Quiz', passing_score=60)
+        cls.questions = [
+            LessonQuizQuestion.objects.create(
+                quiz=cls.quiz, text=f'Q{i}', option_a='a', option_b='b', correct_option=option, order=i,
+            )
+            for i, option in enumerate('ABA')
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pack_and_grade(self):
+        key = get_answer_key(self.quiz.id)
+        self.assertEqual(key.correct_options, 'ABA')
+        q1, q2, q3 = (question.id for question in self.questions)
+        responses = key.pack({f'q_{q1}': 'A', f'q_{q3}': 'X'})
+        self.assertEqual(responses, 'A--')
+        self.assertEqual(grade(key.correct_options, responses), (1, 3, 1 / 3 * 100))
+        self.assertEqual(grade_many(key.correct_options, ['ABA', 'A--', 'BAB']).tolist(), [3, 1, 0])
+        with self.assertNumQueries(0):
+            get_answer_key(self.quiz.id)
+
+    def test_submission_stores_responses(self):
+        q1, q2, q3 = (question.id for question in self.questions)
+        self.client.force_login(self.student)
+        url = reverse('lesson_quiz', args=[self.course.slug, self.lesson.slug])
+        response = self.client.post(url, {f'q_{q1}': 'A', f'q_{q2}': 'B', f'q_{q3}': 'B'})
+        self.assertEqual(response.context['result']['correct'], 2)
+
+        attempt = LessonQuizAttempt.objects.get()
+        self.assertEqual(attempt.responses, 'ABB')
+        self.assertEqual(attempt.answer_key_version, get_answer_key(self.quiz.id).version)
+        self.assertTrue(attempt.passed)
+
+    def test_correcting_the_key_regrades_attempts(self):
+        version = get_answer_key(self.quiz.id).version
+        attempt = LessonQuizAttempt.objects.create(
+            user=self.student, quiz=self.quiz, score=2 / 3 * 100, passed=True,
+            responses='ABB', answer_key_version=version,
+        )
+        self.client.force_login(self.admin)
+        self.client.post(reverse('dashboard_lesson_quiz', args=[self.lesson.id]), {
+            'action': 'edit_question', 'question_id': self.questions[2].id, 'q_text': 'Q2',
+            'q_option_a': 'a', 'q_option_b': 'b', 'q_correct_option': 'B',
+        })
+
+        self.assertEqual(get_answer_key(self.quiz.id).correct_options, 'ABB')
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 100)
+        self.assertTrue(attempt.passed)
+        self.assertEqual(LessonQuizSummary.objects.get(user=self.student, quiz=self.quiz).best_score, 100)
+
+
+class ItemAnalysisTests(TestCase):
+    """Running-sum item statistics match a direct computation on the response matrix."""
+
+    RESPONSES = ['ABCA', 'ABDA', 'BBCA', 'A-CB', 'CACB', 'ABCA', 'DBCC']
+    KEY = 'ABCA'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_summary_matches_direct_computation(self):
+        stats = ItemStatistics(self.KEY)
+        stats.add(response_matrix(self.RESPONSES[:3], 4))
+        stats.add(response_matrix(self.RESPONSES[3:], 4))
+        summary = stats.summary()
+
+        correct = np.array([[given == expected for given, expected in zip(row, self.KEY)] for row in self.RESPONSES], dtype=float)
+        totals = correct.sum(axis=1)
+        for i, item in enumerate(summary['items']):
+            self.assertAlmostEqual(item['difficulty'], correct[:, i].mean(), places=3)
+            expected = np.corrcoef(correct[:, i], totals - correct[:, i])[0, 1]
+            self.assertAlmostEqual(item['discrimination'], expected, places=3)
+        item_var = correct.var(axis=0).sum()
+        self.assertAlmostEqual(summary['alpha'], 4 / 3 * (1 - item_var / totals.var()), places=3)
+        self.assertEqual(summary['items'][1]['option_rates']['blank'], round(1 / 7, 3))
+
+    def test_statistics_are_topped_up_and_shown(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        course = make_course('items-course', lessons=1)
+        quiz = LessonQuiz.objects.create(lesson=course.lessons.get(), title='Quiz')
+        for i, option in enumerate(self.KEY):
+            LessonQuizQuestion.objects.create(quiz=quiz, text=f'Q{i}', option_a='a', option_b='b', correct_option=option, order=i)
+        version = get_answer_key(quiz.id).version
+        for responses in self.RESPONSES:
+            LessonQuizAttempt.objects.create(user=admin, quiz=quiz, responses=responses, answer_key_version=version)
+
+        self.assertEqual(get_item_statistics(quiz).attempts, 7)
+        LessonQuizAttempt.objects.create(user=admin, quiz=quiz, responses='ABCA', answer_key_version=version)
+        self.assertEqual(get_item_statistics(quiz).attempts, 8)
+        LessonQuizAttempt.objects.filter(responses='DBCC').delete()
+        self.assertEqual(get_item_statistics(quiz).attempts, 7)
+
+        self.client.force_login(admin)
+        response = self.client.get(reverse('dashboard_lesson_quiz', args=[quiz.lesson_id]))
+        self.assertContains(response, "Cronbach")
+        self.assertEqual(response.context['item_analysis']['attempts'], 7)
+
+
+class QuizImportTests(TestCase):
+    """Bulk import validates every file before writing anything."""
+
+    CSV = (
+        'question,option_a,option_b,option_c,option_d,correct_answer\n'
+        'Two plus two?,3,4,5,,B\n'
+        'Sky colour?,Blue,Green,,,A\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.course = make_course('import-course', lessons=3)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _zip(self, files):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name, content in files.items():
+                archive.writestr(name, content)
+        return SimpleUploadedFile('quizzes.zip', buffer.getvalue(), content_type='application/zip')
+
+    def _pdf(self):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), '1. Largest planet?\nA. Mars\nB. Jupiter')
+        document.new_page().insert_text((72, 72), 'C. Venus\nAnswer: B\n2. Closest star?\nA. Sun\nB. Sirius\nAnswer: A')
+        return document.tobytes()
+
+    def _post(self, upload, **extra):
+        return self.client.post(reverse('dashboard_import_quizzes'), {
+            'course_id': self.course.id, 'quiz_files': upload, **extra,
+        })
+
+    def test_dry_run_reports_without_writing(self):
+        response = self._post(self._zip({'lesson-0.csv': self.CSV, 'docs/lesson-1.pdf': self._pdf()}), dry_run='1')
+        report = response.context['report']
+        self.assertFalse(report['imported'])
+        self.assertEqual([result['questions'] for result in report['files']], [2, 2])
+        self.assertFalse(LessonQuizQuestion.objects.exists())
+
+    def test_invalid_file_blocks_the_whole_import(self):
+        bad = self.CSV + 'Broken?,Yes,No,,,D\n'
+        response = self._post(self._zip({'lesson-0.csv': self.CSV, 'lesson-1.csv': bad, 'missing.csv': self.CSV}))
+        errors = {result['name']: result['errors'] for result in response.context['report']['files']}
+        self.assertEqual(errors['lesson-0.csv'], [])
+        self.assertIn('4: correct answer', errors['lesson-1.csv'][0])
+        self.assertIn("no lesson with slug 'missing'", errors['missing.csv'][0])
+        self.assertFalse(LessonQuiz.objects.exists())
+
+    def test_import_appends_or_replaces_questions(self):
+        lesson = self.course.lessons.get(slug='lesson-0')
+        quiz = LessonQuiz.objects.create(lesson=lesson, title='Existing')
+        LessonQuizQuestion.objects.create(quiz=quiz, text='Old', option_a='a', option_b='b', correct_option='A', order=5)
+        self.assertEqual(get_answer_key(quiz.id).correct_options, 'A')
+
+        self._post(self._zip({'lesson-0.csv': self.CSV, 'lesson-1.pdf': self._pdf()}))
+        self.assertEqual(list(quiz.questions.values_list('order', flat=True)), [5, 6, 7])
+        self.assertEqual(get_answer_key(quiz.id).correct_options, 'ABA')
+        pdf_quiz = LessonQuiz.objects.get(lesson__slug='lesson-1')
+        self.assertEqual(
+            list(pdf_quiz.questions.values_list('option_c', 'correct_option')), [('Venus', 'B'), ('', 'A')]
+        )
+
+        self._post(SimpleUploadedFile('lesson-0.csv', self.CSV.encode()), replace='1')
+        self.assertEqual(list(quiz.questions.values_list('text', flat=True)), ['Two plus two?', 'Sky colour?'])
+
+
+class ExamSummaryTests(TestCase):
+    """Attempt numbers are stored on insert and summaries follow every write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('examinee', password='pw')
+        cls.other = User.objects.create_user('other', password='pw')
+        cls.exam = Exam.objects.create(course=make_course('exam-course', lessons=1), title='Final', max_attempts=3)
+
+    def _summary(self, user=None):
+        return ExamSummary.objects.get(user=user or self.student, exam=self.exam)
+
+    def test_attempts_are_numbered_per_user(self):
+        first = ExamAttempt.objects.create(user=self.student, exam=self.exam, score=40)
+        ExamAttempt.objects.create(user=self.other, exam=self.exam, score=90, passed=True)
+        second = ExamAttempt.objects.create(user=self.student, exam=self.exam, score=75, passed=True)
+        self.assertEqual((first.attempt_number, second.attempt_number), (1, 2))
+        with self.assertNumQueries(0):
+            self.assertIn('Attempt 2', str(second))
+
+        summary = self._summary()
+        self.assertEqual((summary.attempts_used, summary.best_score, summary.passed), (2, 75, True))
+        self.assertEqual((summary.last_attempt_id, summary.attempts_remaining), (second.id, 1))
+
+    def test_updates_and_deletes_rebuild_the_summary(self):
+        first = ExamAttempt.objects.create(user=self.student, exam=self.exam)
+        self.assertEqual((self._summary().attempts_used, self._summary().best_score), (1, None))
+        first.score, first.passed = 85, True
+        first.save()
+        self.assertEqual((self._summary().best_score, self._summary().passed), (85, True))
+
+        second = ExamAttempt.objects.create(user=self.student, exam=self.exam, score=20)
+        first.delete()
+        summary = self._summary()
+        self.assertEqual((summary.attempts_used, summary.best_score, summary.passed), (1, 20, False))
+        # Numbers are never reused, so the next attempt stays unique
+        self.assertEqual(ExamAttempt.objects.create(user=self.student, exam=self.exam).attempt_number, 3)
+
+        second.delete()
+        self.assertEqual(self._summary().last_attempt.attempt_number, 3)
+
+
+class LessonQuizSummaryTests(TestCase):
+    """Quiz summaries follow every attempt write and drive lesson gating."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('quizzer', password='pw')
+        cls.course = make_course('summary-course', lessons=3)
+        cls.lessons = list(cls.course.lessons.order_by('order'))
+        CourseEnrollment.objects.create(user=cls.student, course=cls.course)
+        cls.quizzes = [
+            LessonQuiz.objects.create(lesson=lesson, title=f'Quiz {lesson.order}', passing_score=60)
+            for lesson in cls.lessons[:2]
+        ]
+
+    def _summary(self, quiz=None):
+        return LessonQuizSummary.objects.get(user=self.student, quiz=quiz or self.quizzes[0])
+
+    def test_attempts_update_and_rebuild_the_summary(self):
+        first = LessonQuizAttempt.objects.create(user=self.student, quiz=self.quizzes[0], score=40, passed=False)
+        second = LessonQuizAttempt.objects.create(user=self.student, quiz=self.quizzes[0], score=80, passed=True)
+        LessonQuizAttempt.objects.create(user=self.student, quiz=self.quizzes[0], score=50, passed=False)
+        summary = self._summary()
+        self.assertEqual((summary.attempts, summary.best_score, summary.passed), (3, 80, True))
+
+        second.score, second.passed = 55, False
+        second.save()
+        self.assertEqual((self._summary().best_score, self._summary().passed), (55, False))
+
+        second.delete()
+        first.delete()
+        summary = self._summary()
+        self.assertEqual((summary.attempts, summary.best_score), (1, 50))
+        self.assertEqual(summary.last_attempt.score, 50)
+
+    def test_lesson_page_reads_summaries_for_gating_and_badges(self):
+        LessonQuizAttempt.objects.create(user=self.student, quiz=self.quizzes[0], score=90, passed=True)
+        LessonQuizAttempt.objects.create(user=self.student, quiz=self.quizzes[1], score=10, passed=False)
+        self.client.force_login(self.student)
+
+        response = self.client.get(reverse('lesson_detail', args=[self.course.slug, self.lessons[0].slug]))
+        self.assertTrue(response.context['quiz_passed'])
+        self.assertEqual(response.context['latest_quiz_attempt'].score, 90)
+        self.assertEqual(response.context['passed_quiz_lessons'], [self.lessons[0].id])
+        self.assertEqual(response.context['failed_quiz_lessons'], [self.lessons[1].id])
+
+        self.assertEqual(self.client.post(reverse('complete_lesson', args=[self.lessons[0].id])).status_code, 200)
+        self.assertEqual(self.client.post(reverse('complete_lesson', args=[self.lessons[1].id])).status_code, 400)
+
+
+class ExamEngineTests(TestCase):
+    """Timed exams: batched autosave, server-side deadlines and the expiry sweeper."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('candidate', password='pw')
+        cls.course = make_course('exam-engine', lessons=1)
+        CourseEnrollment.objects.create(user=cls.student, course=cls.course)
+        UserProgress.objects.create(user=cls.student, lesson=cls.course.lessons.get(), completed=True)
+        cls.exam = Exam.objects.create(
+            course=cls.course, title='Final', passing_score=60, max_attempts=2, time_limit_minutes=30,
+        )
+        cls.questions = [
+            ExamQuestion.objects.create(exam=cls.exam, text=f'Q{i}', option_a='a', option_b='b', correct_option=answer, order=i)
+            for i, answer in enumerate('ABA')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def _fields(self, *answers):
+        return {f'q_{question.id}': answer for question, answer in zip(self.questions, answers)}
+
+    def test_autosave_merges_batches_with_one_update(self):
+        attempt = start_attempt(self.student, self.exam)
+        self.assertEqual(start_attempt(self.student, self.exam), attempt)
+        with self.assertNumQueries(1):
+            self.assertTrue(save_answers(attempt.id, self.student, self._fields('A', 'A')))
+        with self.assertNumQueries(1):
+            cleared = f'q_{self.questions[0].id}'
+            self.assertTrue(save_answers(attempt.id, self.student, {**self._fields('B', 'B'), cleared: '', 'junk': 'A'}))
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.answers, {f'q_{self.questions[1].id}': 'B'})
+
+        other = User.objects.create_user('intruder', password='pw')
+        self.assertFalse(save_answers(attempt.id, other, self._fields('A')))
+
+    def test_exam_flow_grades_and_certifies(self):
+        self.assertTrue(self.client.get(reverse('student_exam', args=[self.course.slug])).context['can_start'])
+        self.client.post(reverse('student_exam_start', args=[self.course.slug]))
+        attempt = ExamAttempt.objects.get(user=self.student)
+        self.assertAlmostEqual((attempt.deadline_at - attempt.started_at).total_seconds(), 30 * 60, delta=5)
+
+        response = self.client.get(reverse('student_exam', args=[self.course.slug]))
+        self.assertEqual([question['id'] for question in response.context['paper']], [q.id for q in self.questions])
+        response = self.client.post(
+            reverse('exam_autosave', args=[attempt.id]),
+            data=json.dumps({'answers': self._fields('A', 'B')}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.client.post(reverse('exam_submit', args=[attempt.id]), self._fields('A', 'B', 'C'))
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.responses, round(attempt.score, 1), attempt.passed), ('ABC', 66.7, True))
+        summary = ExamSummary.objects.get(user=self.student, exam=self.exam)
+        self.assertEqual((summary.attempts_used, summary.passed), (1, True))
+        certification = Certification.objects.get(user=self.student, course=self.course)
+        self.assertEqual((certification.status, certification.passing_exam_attempt_id), ('passed', attempt.id))
+        self.assertEqual(
+            set(ActivityEvent.objects.filter(user=self.student).values_list('event_type', flat=True)),
+            {'exam_attempt', 'certification_issued'},
+        )
+        with self.assertRaises(ExamError):
+            start_attempt(self.student, self.exam)
+
+    def test_expired_attempts_are_closed_and_swept(self):
+        attempt = start_attempt(self.student, self.exam)
+        save_answers(attempt.id, self.student, self._fields('A'))
+        deadline = timezone.now() - timezone.timedelta(minutes=1)
+        ExamAttempt.objects.filter(id=attempt.id).update(deadline_at=deadline)
+
+        self.assertFalse(save_answers(attempt.id, self.student, self._fields('A', 'B')))
+        response = self.client.post(
+            reverse('exam_autosave', args=[attempt.id]),
+            data=json.dumps({'answers': self._fields('B')}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 409)
+
+        self.assertEqual(sweep_expired_attempts(), 1)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.responses, attempt.completed_at, attempt.passed), ('A--', deadline, False))
+        self.assertEqual(Certification.objects.get(user=self.student, course=self.course).status, 'failed')
+        self.assertEqual(sweep_expired_attempts(), 0)
+
+        # The second and last attempt; a late submit keeps only the autosaved answers
+        attempt = start_attempt(self.student, self.exam)
+        ExamAttempt.objects.filter(id=attempt.id).update(deadline_at=deadline)
+        self.client.post(reverse('exam_submit', args=[attempt.id]), self._fields('A', 'B', 'A'))
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.responses, '---')
+        self.assertEqual(ExamSummary.objects.get(user=self.student, exam=self.exam).attempts_used, 2)
+        with self.assertRaisesMessage(ExamError, 'all your attempts'):
+            start_attempt(self.student, self.exam)
+
+
+class CertificateRenderingTests(TestCase):
+    """Certificates stamped onto the cached course template match the full render."""
+
+    def _words(self, data):
+        with fitz.open('pdf', data) as document:
+            self.assertFalse(document.is_repaired)
+            return sorted((round(w[0], 1), round(w[1], 1), w[4]) for w in document[0].get_text('words'))
+
+    def test_stamped_certificate_matches_full_render(self):
+        issued = timezone.now()
+        for modules in ([], ['Module 1 - Basics', 'Module 2 - Practice']):
+            args = ('Zoë (O\'Brien) \\', 'Positive Psychology', issued, 'CERT-PP-7', modules)
+            self.assertEqual(
+                self._words(generate_certificate_pdf(*args).getvalue()),
+                self._words(render_certificate_pdf(*args).getvalue()),
+            )
+
+    def test_template_is_rendered_once_per_layout(self):
+        template = get_certificate_template('Nutrition', ['Module 1 - Intro'])
+        self.assertIs(get_certificate_template('Nutrition', ['Module 1 - Intro']), template)
+        self.assertIsNot(get_certificate_template('Nutrition Basics', ['Module 1 - Intro']), template)
+        first = template.stamp('Ann', timezone.now(), 'CERT-1')
+        self.assertTrue(first.startswith(template.data))
+        self.assertIn('Ann', [word[2] for word in self._words(first)])
+
+
+def use_temporary_media(test):
+    """Point MEDIA_ROOT and certificate storage at a directory removed after the test"""
+    media = tempfile.TemporaryDirectory()
+    test.addCleanup(media.cleanup)
+    settings_override = override_settings(MEDIA_ROOT=media.name, CERTIFICATE_STORAGE='local')
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+
+
+class CertificateStorageTests(TestCase):
+    """Certificates are stored by content hash and streamed with ETag and Range support."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('certified', password='pw', first_name='Cert', last_name='Holder')
+        cls.course = make_course('stored-course')
+        cls.certification = Certification.objects.create(
+            user=cls.student, course=cls.course, status='passed', issued_at=timezone.now(),
+        )
+
+    def setUp(self):
+        use_temporary_media(self)
+
+    def test_identical_renders_are_stored_once(self):
+        storage = get_certificate_storage()
+        first = generate_certificate(self.student, self.course, self.certification.issued_at)
+        second = generate_certificate(self.student, self.course, self.certification.issued_at)
+        self.assertEqual(first['certificate_file'], second['certificate_file'])
+        self.assertIsNone(first['certificate_url'])
+        self.assertEqual(storage.storage.listdir(f'certificates/{self.course.slug}')[1], [
+            first['certificate_file'].rsplit('/', 1)[1],
+        ])
+
+    def test_view_certificate_streams_with_etag_and_ranges(self):
+        stored = generate_certificate(self.student, self.course, self.certification.issued_at)
+        self.certification.certificate_file = stored['certificate_file']
+        self.certification.save()
+        self.client.force_login(self.student)
+        url = reverse('view_certificate', args=[self.course.slug])
+
+        response = self.client.get(url)
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(response['ETag'], f'"{content_hash(stored["certificate_file"])}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+        partial = self.client.get(url, headers={'Range': 'bytes=4-9'})
+        self.assertEqual((partial.status_code, partial.content), (206, pdf[4:10]))
+        self.assertEqual(partial['Content-Range'], f'bytes 4-9/{len(pdf)}')
+        self.assertEqual(self.client.get(url, headers={'Range': 'bytes=-5'}).content, pdf[-5:])
+        self.assertEqual(self.client.get(url, headers={'Range': f'bytes={len(pdf)}-'}).status_code, 416)
+
+
+class IssueCertificatesTests(TestCase):
+    """Bulk issuance stores every out-of-date certificate once and resumes cleanly."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = make_course('cert-course')
+        Module.objects.create(course=cls.course, name='Basics', order=1)
+        for i in range(3):
+            user = User.objects.create_user(f'graduate{i}', first_name='Grad', last_name=str(i))
+            Certification.objects.create(user=user, course=cls.course, status='passed', issued_at=timezone.now())
+        Certification.objects.create(user=User.objects.create_user('failing'), course=cls.course, status='failed')
+
+    def setUp(self):
+        use_temporary_media(self)
+
+    def _issue(self, *args):
+        out = io.StringIO()
+        call_command('issue_certificates', self.course.slug, '--storage', 'local', '--workers', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_issue_is_resumable_and_follows_renames(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(pending_certificates([self.course])), 3)
+        self.assertIn('Issued 3 certificate(s)', self._issue('--batch-size', '2'))
+        certification = Certification.objects.filter(status='passed').first()
+        self.assertEqual(certification.accredible_certificate_url, reverse('view_certificate', args=[self.course.slug]))
+        self.assertTrue(certification.certificate_file.startswith(f'certificates/{self.course.slug}/'))
+        self.assertEqual(len(certification.certificate_hash), 64)
+        self.assertFalse(Certification.objects.get(status='failed').accredible_certificate_url)
+
+        self.assertIn('0 certificate(s) to issue', self._issue())
+        self.course.name = 'Cert Course Renamed'
+        self.course.save()
+        self.assertIn('3 certificate(s) to issue', self._issue('--dry-run'))
+        self.assertEqual(len(pending_certificates([self.course])), 3)
+
+
+    def test_identical_reissues_are_not_uploaded(self):
+        self._issue()
+        with mock.patch('myApp.utils.certificate_storage.LocalCertificateStorage.save') as save:
+            self.assertIn('Issued 3 certificate(s)', self._issue('--force'))
+        save.assert_not_called()
+
+    def test_cloudinary_uploads_without_admin_api_lookups(self):
+        from .utils import certificate_storage
+
+        uploaded = {'secure_url': 'https://res.cloudinary.com/demo/raw/upload/v1/cert.pdf'}
+        with mock.patch.object(certificate_storage.cloudinary, 'config'), \
+                mock.patch.object(certificate_storage.cloudinary.uploader, 'upload', return_value=uploaded) as upload:
+            name, url = get_certificate_storage('cloudinary').save(b'%PDF-1.4', self.course.slug)
+        self.assertEqual((name, url), (f'certificates/{self.course.slug}/{hashlib.sha256(b"%PDF-1.4").hexdigest()}.pdf', uploaded['secure_url']))
+        upload.assert_called_once()
+        self.assertEqual(upload.call_args.kwargs['overwrite'], False)
+
+class CertificateVerificationTests(TestCase):
+    """Public verification answers from the certificate ID index with cacheable responses."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = make_course('verified-course')
+        cls.issued = Certification.objects.create(
+            user=User.objects.create_user('holder', first_name='Ada', last_name='Holder'), course=cls.course,
+            status='passed', issued_at=timezone.now(), accredible_certificate_id='CERT-VERIFIED-1',
+        )
+        cls.revoked = Certification.objects.create(
+            user=User.objects.create_user('revoked'), course=cls.course,
+            status='failed', accredible_certificate_id='CERT-VERIFIED-2',
+        )
+        Certification.objects.create(user=User.objects.create_user('no-id'), course=cls.course, status='failed')
+
+    def setUp(self):
+        # Bulk request counts for the test client's address
+        cache.clear()
+
+    def test_single_verification_is_cached_with_etags(self):
+        url = reverse('verify_certificate', args=['CERT-VERIFIED-1'])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['holder'], 'Ada Holder')
+        self.assertTrue(response.json()['valid'])
+        self.assertEqual(response['Cache-Control'], f'public, max-age={VERIFY_CACHE_SECONDS}')
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        html = self.client.get(url)
+        self.assertContains(html, 'Valid certificate')
+        self.assertNotEqual(html['ETag'], response['ETag'])
+
+        revoked = self.client.get(reverse('verify_certificate', args=['CERT-VERIFIED-2']), {'format': 'json'})
+        self.assertEqual((revoked.status_code, revoked.json()['valid']), (200, False))
+        self.assertEqual(revoked['Cache-Control'], f'public, max-age={VERIFY_MISS_CACHE_SECONDS}')
+        self.assertEqual(self.client.get(reverse('verify_certificate', args=['CERT-NOPE'])).status_code, 404)
+
+    def test_bulk_verification_uses_one_query(self):
+        url = reverse('verify_certificates_bulk')
+        ids = ['CERT-VERIFIED-2', 'CERT-NOPE', 'CERT-VERIFIED-1']
+        with self.assertNumQueries(1):
+            results = self.client.post(url, {'ids': ids}, content_type='application/json').json()['results']
+        self.assertEqual([(r['certificate_id'], r['found'], r['valid']) for r in results], [
+            ('CERT-VERIFIED-2', True, False), ('CERT-NOPE', False, False), ('CERT-VERIFIED-1', True, True),
+        ])
+        too_many = {'ids': [f'CERT-{i}' for i in range(MAX_BULK_VERIFY + 1)]}
+        self.assertEqual(self.client.post(url, too_many, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'ids': 'CERT-VERIFIED-1'}, content_type='application/json').status_code, 400)
+
+    def test_bulk_verification_is_rate_limited_and_omits_holders(self):
+        url = reverse('verify_certificates_bulk')
+        responses = [
+            self.client.post(url, {'ids': ['CERT-VERIFIED-1']}, content_type='application/json')
+            for _ in range(BULK_VERIFY_RATE + 1)
+        ]
+        self.assertEqual({r.status_code for r in responses[:-1]}, {200})
+        self.assertNotIn('holder', responses[0].json()['results'][0])
+        self.assertEqual(responses[-1].status_code, 429)
+        self.assertEqual(responses[-1]['Retry-After'], str(BULK_VERIFY_WINDOW_SECONDS))
+        # Other clients and single lookups are unaffected
+        self.assertEqual(self.client.post(url, {'ids': []}, content_type='application/json', REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.assertIn('holder', self.client.get(reverse('verify_certificate', args=['CERT-VERIFIED-1']), {'format': 'json'}).json())
+
+    def test_bulk_rate_limit_is_per_client_behind_the_proxy(self):
+        url = reverse('verify_certificates_bulk')
+
+        def post(forwarded_for):
+            return self.client.post(
+                url, {'ids': []}, content_type='application/json', REMOTE_ADDR='10.1.0.1', HTTP_X_FORWARDED_FOR=forwarded_for,
+            ).status_code
+
+        with self.settings(TRUSTED_PROXY_COUNT=1):
+            self.assertEqual({post('203.0.113.5') for _ in range(BULK_VERIFY_RATE)}, {200})
+            self.assertEqual(post('203.0.113.5'), 429)
+            # Another employer behind the same proxy has its own bucket
+            self.assertEqual(post('198.51.100.7'), 200)
+            # A spoofed leading entry does not escape the limit
+            self.assertEqual(post('192.0.2.1, 203.0.113.5'), 429)
+
+    def test_certificate_ids_are_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Certification.objects.create(
+                user=User.objects.create_user('copy'), course=self.course, accredible_certificate_id='CERT-VERIFIED-1',
+            )
+
+
+class PDFExtractionTests(TestCase):
+    """Text streams page by page from PyMuPDF, with pdfplumber only for table pages."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/manual.pdf'
+        build_manual(self.path, 5, table_every=3)
+
+    def test_pages_stream_with_tables_from_pdfplumber(self):
+        with fitz.open(self.path) as document:
+            self.assertEqual([is_table_heavy(page) for page in document], [False, False, True, False, False])
+        with mock.patch('myApp.utils.pdf_extractor._pdfplumber_text', return_value='from pdfplumber') as plumber:
+            pages = list(PDFExtractor().iter_pages(self.path))
+        self.assertEqual(plumber.call_count, 1)
+        self.assertEqual([page_num for page_num, _ in pages], [1, 2, 3, 4, 5])
+        self.assertEqual(pages[2][1], 'from pdfplumber')
+        self.assertTrue(pages[3][1].startswith('Chapter 4\n'))
+
+        table = dict(PDFExtractor().iter_pages(self.path, first_page=3, last_page=3))[3]
+        self.assertIn('R2C1 3 R2C2 3 R2C3 3 R2C4 3', table)
+        self.assertEqual(dict(PDFExtractor(prefer_pdfplumber=True).iter_pages(self.path, 3, 3))[3], table)
+
+    def test_pdfplumber_internals_still_exist(self):
+        # _pdfplumber_pages relies on both; a pdfplumber/pdfminer upgrade must keep them
+        self.assertIn('initial_doctop', inspect.signature(pdfplumber.page.Page).parameters)
+        with pdfplumber.open(self.path) as pdf:
+            self.assertIsInstance(pdf.doc._cached_objs, dict)
+            pages = list(_pdfplumber_pages(pdf))
+            self.assertEqual([page_num for page_num, _ in pages], [1, 2, 3, 4, 5])
+            self.assertFalse(pdf.doc._cached_objs)
+
+    def test_chunks_keep_page_markers(self):
+        extractor = PDFExtractor()
+        self.assertEqual(re.findall(r'--- Page (\d+) ---', extractor.extract_text(self.path)), ['1', '2', '3', '4', '5'])
+        chunks = list(extractor.iter_chunks(self.path, 2))
+        self.assertEqual([(c['start_page'], c['end_page']) for c in chunks], [(1, 2), (3, 4), (5, 5)])
+        self.assertTrue(chunks[1]['text'].startswith('--- Page 3 ---\nChapter 3'))
+        self.assertIn('--- Page 4 ---', chunks[1]['text'])
+
+
+def png(width, height, color):
+    image = io.BytesIO()
+    PILImage.new('RGB', (width, height), color).save(image, 'PNG')
+    return image.getvalue()
+
+
+class PDFImageExtractionTests(TestCase):
+    """Each distinct image is read once, sized from metadata, with all its placements."""
+
+    def test_repeated_images_are_extracted_once(self):
+        logo, icon = png(600, 400, (200, 30, 30)), png(50, 50, (0, 0, 200))
+        document = fitz.open()
+        for page_num in range(2):
+            page = document.new_page()
+            page.insert_image(fitz.Rect(72, 72, 372, 272), stream=logo)
+            page.insert_image(fitz.Rect(72, 300, 122, 350), stream=icon)
+        document[1].insert_image(fitz.Rect(300, 500, 450, 600), stream=logo)
+        # A second copy of the same logo under its own xref
+        copy = fitz.open()
+        copy.new_page().insert_image(fitz.Rect(72, 72, 372, 272), stream=logo)
+        document.insert_pdf(copy)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/logos.pdf'
+        document.save(path)
+
+        with mock.patch.object(PDFImageExtractor, '_configure_cloudinary'):
+            extractor = PDFImageExtractor()
+        with mock.patch('myApp.utils.pdf_image_extractor.Image.open') as decode, \
+                mock.patch.object(fitz.Document, 'extract_image', autospec=True, side_effect=fitz.Document.extract_image) as extract:
+            images = extractor.extract_images(path, min_size=100)
+        decode.assert_not_called()
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(len(images), 1)
+        self.assertEqual((images[0]['width'], images[0]['height']), (600, 400))
+        self.assertEqual(
+            [(p['page_num'], round(p['x0']), round(p['y0'])) for p in images[0]['placements']],
+            [(1, 72, 72), (2, 72, 72), (2, 300, 500), (3, 72, 72)],
+        )
+
+        with mock.patch.object(PDFImageExtractor, 'upload_to_cloudinary', return_value={
+            'secure_url': 'https://images.example.com/logo.webp', 'public_id': 'logo', 'width': 600, 'height': 400,
+        }) as upload:
+            uploaded = extractor.extract_and_upload_images(path, min_size=100)
+        upload.assert_called_once()
+        self.assertEqual([(image['url'], image['page_num']) for image in uploaded], [
+            ('https://images.example.com/logo.webp', 1), ('https://images.example.com/logo.webp', 2),
+            ('https://images.example.com/logo.webp', 2), ('https://images.example.com/logo.webp', 3),
+        ])
+
+
+class FakeImageExtractor:
+    """Stands in for PDFImageExtractor: one image placed on pages 3 and 5, uploaded to a fake URL"""
+
+    def __init__(self):
+        self.uploads = 0
+
+    def prepare_images(self, pdf_path, min_size, quality):
+        placements = [{'page_num': page_num, 'x0': 0, 'y0': 0, 'x1': 10, 'y1': 10} for page_num in (3, 5)]
+        return [{'webp': b'webp', 'placements': placements, **placements[0]}]
+
+    def upload_prepared(self, image, folder, public_id_prefix):
+        self.uploads += 1
+        return {'url': f'https://images.example.com/{public_id_prefix}.webp', 'placements': image['placements'], **image['placements'][0]}
+
+
+@mock.patch('myApp.utils.pdf_import._ai_generator', return_value=None)
+class PDFImportTests(TestCase):
+    """Uploads return at once; the import runs as a job whose progress the page polls."""
+
+    def setUp(self):
+        self.images = FakeImageExtractor()
+        patcher = mock.patch('myApp.utils.pdf_import._image_extractor', return_value=self.images)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.course = make_course('imported-course')
+        self.client.force_login(User.objects.create_superuser('creator', 'creator@example.com', None))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.manual = f'{directory.name}/manual.pdf'
+        build_manual(self.manual, 5, table_every=0)
+
+    def _upload(self, *files, **data):
+        uploads = [SimpleUploadedFile(name, content, content_type='application/pdf') for name, content in files]
+        with mock.patch('myApp.utils.pdf_import.launch_pdf_import') as launch, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('upload_pdf_lessons', args=[self.course.slug]),
+                {'module_name': 'Imported', 'pdf_files': uploads, **data},
+            )
+        self.assertRedirects(response, reverse('upload_pdf_lessons', args=[self.course.slug]), fetch_redirect_response=False)
+        job = PDFImportJob.objects.get()
+        launch.assert_called_once_with(job.id)
+        return job
+
+    def test_upload_is_imported_in_background(self, ai_generator):
+        with open(self.manual, 'rb') as pdf:
+            content = pdf.read()
+        job = self._upload(('First.pdf', content), ('Second.pdf', content), split_by_pages='2')
+        self.assertEqual([(f.name, f.status) for f in job.files.all()], [('First.pdf', 'queued'), ('Second.pdf', 'queued')])
+        self.assertEqual(Lesson.objects.filter(course=self.course).count(), 0)
+
+        run_pdf_import(job.id, workers=0, io_workers=0)
+        lessons = list(Lesson.objects.filter(course=self.course).order_by('order'))
+        self.assertEqual([lesson.slug for lesson in lessons], [
+            'first-part-1', 'first-part-2', 'first-part-3', 'second-part-1', 'second-part-2', 'second-part-3',
+        ])
+        self.assertEqual([lesson.order for lesson in lessons], [1, 2, 3, 4, 5, 6])
+        # One upload per file, placed in every lesson covering one of its pages
+        self.assertEqual(self.images.uploads, 2)
+        images = [
+            [block['data']['file']['url'] for block in lesson.content['blocks'] if block['type'] == 'image']
+            for lesson in lessons[:3]
+        ]
+        self.assertEqual(images, [[], ['https://images.example.com/first.webp'], ['https://images.example.com/first.webp']])
+
+        status = self.client.get(reverse('pdf_import_status', args=[self.course.slug])).json()['jobs'][0]
+        self.assertEqual((status['status'], status['finished']), ('completed', True))
+        self.assertEqual(
+            [(f['name'], f['percent'], f['pages'], f['images'], f['lessons_created']) for f in status['files']],
+            [('First.pdf', 100, 5, 1, 3), ('Second.pdf', 100, 5, 1, 3)],
+        )
+        self.assertFalse(any(os.path.exists(f.path) for f in job.files.all()))
+
+    def test_unreadable_file_fails_alone(self, ai_generator):
+        with open(self.manual, 'rb') as pdf:
+            job = self._upload(('Broken.pdf', b'not a pdf'), ('Manual.pdf', pdf.read()))
+        run_pdf_import(job.id, workers=0, io_workers=0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        broken, manual = job.files.all()
+        self.assertEqual(broken.status, 'failed')
+        self.assertIn('Could not open PDF', broken.error)
+        self.assertEqual((manual.status, manual.lessons_created), ('completed', 1))
+        self.assertTrue(Lesson.objects.filter(course=self.course, slug='manual').exists())
+
+    def test_only_interrupted_jobs_are_resumed(self, ai_generator):
+        with open(self.manual, 'rb') as pdf:
+            job = self._upload(('Manual.pdf', pdf.read()))
+        long_ago = timezone.now() - timezone.timedelta(hours=1)
+        module = job.module
+        alive = PDFImportJob.objects.create(course=self.course, module=module, status='running', heartbeat_at=timezone.now())
+        just_queued = PDFImportJob.objects.create(course=self.course, module=module)
+        PDFImportJob.objects.filter(pk=job.pk).update(status='running', heartbeat_at=long_ago)
+
+        self.assertEqual(list(interrupted_pdf_imports()), [job])
+        out = io.StringIO()
+        call_command('run_pdf_imports', workers=0, io_workers=0, stdout=out)
+        self.assertIn('1 import job(s) to run', out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertGreater(job.started_at, long_ago)
+        self.assertEqual(
+            list(PDFImportJob.objects.filter(pk__in=[alive.pk, just_queued.pk]).values_list('status', flat=True).order_by('pk')),
+            ['running', 'queued'],
+        )
+
+
+class CountingBackend(FakeQuizBackend):
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, prompt):
+        self.calls += 1
+        return super().complete(prompt)
+
+
+class QuizGenerationTests(TestCase):
+    """Course generation only calls the model for lessons whose content changed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = make_course('generation-course', lessons=3)
+        cls.course.lessons.filter(slug='lesson-1').update(description='Breathing slows the heart. Posture matters.')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_lessons_are_skipped(self):
+        backend = CountingBackend()
+        results = generate_course_quizzes(self.course, num_questions=3, workers=2, backend=backend)
+        self.assertEqual([result['status'] for result in results], ['generated'] * 3)
+        self.assertEqual(backend.calls, 3)
+        self.assertEqual(LessonQuizQuestion.objects.filter(quiz__lesson__course=self.course).count(), 9)
+
+        results = generate_course_quizzes(self.course, num_questions=3, workers=2, backend=backend)
+        self.assertEqual([result['status'] for result in results], ['unchanged'] * 3)
+        self.assertEqual(backend.calls, 3)
+
+        lesson = self.course.lessons.get(slug='lesson-2')
+        lesson.description = 'Sleep restores focus.'
+        lesson.save()
+        results = generate_course_quizzes(self.course, num_questions=3, workers=2, backend=backend)
+        self.assertEqual([result['status'] for result in results], ['unchanged', 'unchanged', 'generated'])
+        self.assertEqual(backend.calls, 4)
+        self.assertEqual(lesson.quiz.questions.count(), 3)
+        options = ' '.join(' '.join(row) for row in lesson.quiz.questions.values_list('option_a', 'option_b', 'option_c', 'option_d'))
+        self.assertIn('Sleep restores focus.', options)
+
+    def test_cached_generation_is_reused_and_answer_key_refreshed(self):
+        backend = CountingBackend()
+        generate_course_quizzes(self.course, num_questions=2, backend=backend)
+        quiz = LessonQuiz.objects.get(lesson__slug='lesson-0')
+        key = get_answer_key(quiz.id)
+
+        # A new quiz for the same content comes from the cache...
+        quiz.generation_hash = ''
+        quiz.save()
+        quiz.questions.all().delete()
+        results = generate_course_quizzes(self.course, num_questions=2, backend=backend)
+        self.assertEqual([result['status'] for result in results], ['cached', 'unchanged', 'unchanged'])
+        self.assertEqual(backend.calls, 3)
+        self.assertNotEqual(get_answer_key(quiz.id).version, key.version)
+
+        # ...but forcing asks the model again
+        results = generate_course_quizzes(self.course, num_questions=2, backend=backend, force=True)
+        self.assertEqual([result['status'] for result in results], ['generated'] * 3)
+        self.assertEqual(backend.calls, 6)
+
+    def test_single_lesson_generation_skips_the_cache(self):
+        generate_course_quizzes(self.course, num_questions=2, backend=CountingBackend())
+        lesson = self.course.lessons.get(slug='lesson-0')
+        backend = CountingBackend()
+        with mock.patch('myApp.dashboard_views.get_quiz_backend', return_value=backend):
+            generate_ai_quiz(lesson, lesson.quiz, num_questions=2)
+        self.assertEqual(backend.calls, 1)
+
+    def test_dashboard_generated_quizzes_count_as_generated(self):
+        lesson = self.course.lessons.get(slug='lesson-1')
+        quiz = LessonQuiz.objects.create(lesson=lesson, title='From the dashboard')
+        with mock.patch('myApp.dashboard_views.get_quiz_backend', return_value=FakeQuizBackend()):
+            generate_ai_quiz(lesson, quiz, num_questions=2)
+        quiz.refresh_from_db()
+        self.assertTrue(quiz.generation_hash)
+
+        backend = CountingBackend()
+        results = generate_course_quizzes(self.course, num_questions=2, backend=backend)
+        self.assertEqual([result['status'] for result in results], ['generated', 'unchanged', 'generated'])
+        lesson.description = 'Posture changes breathing.'
+        lesson.save()
+        results = generate_course_quizzes(self.course, num_questions=2, backend=backend)
+        self.assertEqual(results[1]['status'], 'generated')
+        self.assertEqual(quiz.questions.count(), 2)
+
+    def test_hand_written_quizzes_are_kept_unless_forced(self):
+        lesson = self.course.lessons.get(slug='lesson-1')
+        quiz = LessonQuiz.objects.create(lesson=lesson, title='Written by the coach')
+        LessonQuizQuestion.objects.create(
+            quiz=quiz, order=1, text='Why breathe?', option_a='To live', option_b='No', correct_option='A',
+        )
+        backend = CountingBackend()
+        results = generate_course_quizzes(self.course, num_questions=2, backend=backend)
+        self.assertEqual([result['status'] for result in results], ['generated', 'manual', 'generated'])
+        self.assertEqual(list(quiz.questions.values_list('text', flat=True)), ['Why breathe?'])
+
+        results = generate_course_quizzes(self.course, num_questions=2, backend=backend, force=True)
+        self.assertEqual(results[1]['status'], 'generated')
+        self.assertEqual(quiz.questions.count(), 2)
+
+    def test_unusable_response_is_reported(self):
+        backend = FakeQuizBackend()
+        backend.complete = lambda prompt: 'not json'
+        results = generate_course_quizzes(self.course, backend=backend)
+        self.assertEqual({result['status'] for result in results}, {'failed'})
+        self.assertFalse(LessonQuiz.objects.filter(lesson__course=self.course).exists())
+
+    def test_parse_quiz_response_cleans_questions(self):
+        text = '```json\n{"questions": [{"question": "Q?", "option_a": "a", "option_b": "b", "correct_answer": "x"},' \
+               ' {"question": "", "option_a": "a", "option_b": "b"}]}\n```'
+        self.assertEqual(parse_quiz_response(text), [{
+            'text': 'Q?', 'option_a': 'a', 'option_b': 'b', 'option_c': '', 'option_d': '', 'correct_option': 'A',
+        }])
+
+
+class _DiscardScale(Exception):
+    pass
+
+
+class QueryCountContractTests(TestCase):
+    """
+    Every page must run the same number of queries whether the platform has
+    a handful of rows or ten times as many. Views that are O(n) by design go
+    in QUERY_COUNT_ALLOWLIST with the reason. Known N+1s are listed in
+    KNOWN_N_PLUS_ONES, each with an expected-failure test that starts passing
+    (and so fails the run) once it is fixed; remove the entry with the fix.
+    """
+
+    SCALES = (
+        {'users': 5, 'courses': 5, 'lessons_per_course': 2},
+        {'users': 50, 'courses': 50, 'lessons_per_course': 4},
+    )
+
+    # url name -> why the query count grows with the data by design
+    QUERY_COUNT_ALLOWLIST = {}
+
+    # url name -> the N+1 to fix
+    KNOWN_N_PLUS_ONES = {
+        'home': 'lesson and progress counts per course card',
+        'courses': 'lesson list, lesson count and progress per course card',
+        'student_dashboard': 'prerequisite and bundle lookups per course',
+        'course_detail': 'renders lesson_detail for enrolled students',
+        'lesson_detail': 'previous-lessons query per lesson when working out which are unlocked',
+        'student_course_progress': 'progress lookup per lesson',
+        'creator_dashboard': 'Course.get_lesson_count per course',
+        'dashboard_courses': 'template calls get_lesson_count instead of the lesson_count annotation',
+        'dashboard_add_lesson': 'Course.get_lesson_count per course in the course picker',
+        'dashboard_analytics': 'per-student, per-course completion counts',
+    }
+
+    # url name -> why the view is not driven by this test
+    NOT_MEASURED = {
+        'logout': 'ends the session used by the other requests',
+        'dashboard_delete_course': 'destructive POST',
+        'dashboard_delete_lesson': 'destructive POST',
+        'dashboard_delete_quiz': 'destructive POST',
+        'dashboard_delete_bundle': 'destructive POST',
+        'dashboard_clear_course_lessons': 'destructive POST',
+        'clear_course_lessons': 'destructive POST',
+        'dashboard_upload_pdf_lessons': 'needs an uploaded PDF and AI',
+        'upload_pdf_lessons': 'needs an uploaded PDF and AI',
+        'generate_lesson_ai': 'calls the AI provider',
+        'verify_vimeo_url': 'calls the Vimeo API',
+        'upload_video_transcribe': 'needs an uploaded video and AI',
+        'chatbot_webhook': 'external webhook',
+        'train_lesson_chatbot': 'calls the AI provider',
+        'lesson_chatbot': 'calls the AI provider',
+        'generate_course_content_webhook': 'external webhook',
+        'dashboard_activity_stream': 'long-lived event stream',
+        'dashboard_student_progress': 'template dashboard/student_progress.html does not exist',
+        'dashboard_grant_access': 'state-changing POST',
+        'dashboard_revoke_access': 'state-changing POST',
+        'dashboard_grant_bundle': 'state-changing POST',
+        'dashboard_add_cohort': 'state-changing POST',
+        'dashboard_bulk_grant_access': 'state-changing POST',
+        'student_exam_start': 'state-changing POST',
+        'exam_autosave': 'state-changing POST',
+        'exam_submit': 'state-changing POST',
+    }
+
+    def _requests(self, student, course, lesson, quiz_lesson, bundle):
+        """(url name, role, method, args, payload) for every measured view"""
+        return [
+            ('home', 'student', 'get', [], None),
+            ('login', 'anonymous', 'get', [], None),
+            ('courses', 'student', 'get', [], None),
+            ('course_detail', 'student', 'get', [course.slug], None),
+            ('lesson_detail', 'student', 'get', [course.slug, lesson.slug], None),
+            ('lesson_quiz', 'student', 'get', [course.slug, quiz_lesson.slug], None),
+            ('student_dashboard', 'student', 'get', [], None),
+            ('student_course_progress', 'student', 'get', [course.slug], None),
+            ('student_certifications', 'student', 'get', [], None),
+            ('student_exam', 'student', 'get', [course.slug], None),
+            ('view_certificate', 'student', 'get', [course.slug], None),
+            ('verify_certificate', 'anonymous', 'get', [f'CERT-CONTRACT-{student.id}'], None),
+            ('verify_certificates_bulk', 'anonymous', 'post', [], {'ids': [f'CERT-CONTRACT-{student.id}', 'CERT-MISSING']}),
+            ('update_video_progress', 'student', 'post', [lesson.id], {'watch_percentage': 40, 'timestamp': 30}),
+            ('complete_lesson', 'student', 'post', [lesson.id], None),
+            ('toggle_favorite_course', 'student', 'post', [course.id], None),
+            ('dashboard_home', 'staff', 'get', [], None),
+            ('dashboard_analytics', 'staff', 'get', [], None),
+            ('dashboard_courses', 'staff', 'get', [], None),
+            ('dashboard_add_course', 'staff', 'get', [], None),
+            ('dashboard_course_detail', 'staff', 'get', [course.slug], None),
+            ('dashboard_course_lessons', 'staff', 'get', [course.slug], None),
+            ('dashboard_lessons', 'staff', 'get', [], None),
+            ('dashboard_add_lesson', 'staff', 'get', [], None),
+            ('dashboard_upload_quiz', 'staff', 'get', [], None),
+            ('dashboard_import_quizzes', 'staff', 'get', [], None),
+            ('dashboard_edit_lesson', 'staff', 'get', [lesson.id], None),
+            ('dashboard_lesson_quiz', 'staff', 'get', [quiz_lesson.id], None),
+            ('dashboard_quizzes', 'staff', 'get', [], None),
+            ('dashboard_students', 'staff', 'get', [], None),
+            ('dashboard_activity_feed', 'staff', 'get', [], None),
+            ('dashboard_student_detail', 'staff', 'get', [student.id], None),
+            ('dashboard_student_detail_course', 'staff', 'get', [student.id, course.slug], None),
+            ('dashboard_course_progress', 'staff', 'get', [course.slug], None),
+            ('dashboard_course_funnel', 'staff', 'get', [course.slug], None),
+            ('dashboard_perf', 'staff', 'get', [], None),
+            ('dashboard_exports', 'staff', 'get', [], None),
+            ('dashboard_export', 'staff', 'get', ['progress'], None),
+            ('dashboard_bundles', 'staff', 'get', [], None),
+            ('dashboard_add_bundle', 'staff', 'get', [], None),
+            ('dashboard_edit_bundle', 'staff', 'get', [bundle.id], None),
+            ('dashboard_bulk_access', 'staff', 'get', [], None),
+            ('creator_dashboard', 'staff', 'get', [], None),
+            ('course_lessons', 'staff', 'get', [course.slug], None),
+            ('add_lesson', 'staff', 'get', [course.slug], None),
+            ('check_transcription_status', 'staff', 'post', [lesson.id], None),
+            ('pdf_import_status', 'staff', 'get', [course.slug], None),
+        ]
+
+    def _measure(self, scale):
+        """Seed one scale, return {url name: queries} for the second request to each view"""
+        counts = {}
+        try:
+            with transaction.atomic():
+                cache.clear()
+                seed_synthetic(progress_density=0.5, prefix='contract', **scale)
+                enrollment = CourseEnrollment.objects.filter(
+                    user__username__startswith='contract_student_'
+                ).select_related('user', 'course').order_by('id').first()
+                student, course = enrollment.user, enrollment.course
+                lesson, quiz_lesson = course.lessons.order_by('order')[:2]
+                quiz = LessonQuiz.objects.create(lesson=quiz_lesson, title='Quiz')
+                LessonQuizQuestion.objects.create(quiz=quiz, text='Q', option_a='A', option_b='B', correct_option='A')
+                exam = Exam.objects.create(course=course, title='Final')
+                ExamQuestion.objects.create(exam=exam, text='Q', option_a='A', option_b='B', correct_option='A')
+                Certification.objects.update_or_create(
+                    user=student, course=course,
+                    defaults={'status': 'passed', 'issued_at': timezone.now(), 'accredible_certificate_id': f'CERT-CONTRACT-{student.id}'},
+                )
+                bundle = Bundle.objects.create(name='Contract Bundle', slug='contract-bundle')
+                bundle.courses.set(Course.objects.filter(slug__startswith='contract-'))
+                staff = User.objects.create_superuser('contract_admin', 'contract_admin@example.com', None)
+
+                clients = {'anonymous': Client(), 'student': Client(), 'staff': Client()}
+                clients['student'].force_login(student)
+                clients['staff'].force_login(staff)
+
+                for name, role, method, args, payload in self._requests(student, course, lesson, quiz_lesson, bundle):
+                    client, url = clients[role], reverse(name, args=args)
+                    for warm_up in (True, False):
+                        with CaptureQueriesContext(connection) as captured:
+                            if method == 'post':
+                                response = client.post(url, payload or {}, content_type='application/json')
+                            else:
+                                response = client.get(url)
+                            if getattr(response, 'streaming', False):
+                                b''.join(response.streaming_content)
+                    self.assertLess(response.status_code, 400, f'{name} returned {response.status_code}')
+                    counts[name] = len(captured)
+                raise _DiscardScale
+        except _DiscardScale:
+            pass
+        return counts
+
+    # (small, large) counts, shared by the tests of the class
+    _measured = None
+
+    def _counts(self):
+        if QueryCountContractTests._measured is None:
+            QueryCountContractTests._measured = tuple(self._measure(scale) for scale in self.SCALES)
+        return QueryCountContractTests._measured
+
+    def test_every_view_is_classified(self):
+        measured = {name for name, *_ in self._requests(*[mock.Mock()] * 5)}
+        named = {pattern.name for pattern in get_resolver().url_patterns if getattr(pattern, 'name', None)}
+        self.assertEqual(named - measured - set(self.NOT_MEASURED), set())
+        self.assertEqual((set(self.QUERY_COUNT_ALLOWLIST) | set(self.KNOWN_N_PLUS_ONES)) - measured, set())
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small, large = self._counts()
+        growing = {
+            name: (small[name], large[name])
+            for name in small
+            if large[name] != small[name]
+            and name not in self.QUERY_COUNT_ALLOWLIST and name not in self.KNOWN_N_PLUS_ONES
+        }
+        self.assertEqual(growing, {}, 'url name: (queries at small scale, queries at large scale)')
+
+
+def _known_n_plus_one_test(name):
+    @expectedFailure
+    def test(self):
+        small, large = self._counts()
+        self.assertEqual(small[name], large[name], QueryCountContractTests.KNOWN_N_PLUS_ONES[name])
+    return test
+
+
+for _name in QueryCountContractTests.KNOWN_N_PLUS_ONES:
+    setattr(QueryCountContractTests, f'test_known_n_plus_one_{_name}', _known_n_plus_one_test(_name))
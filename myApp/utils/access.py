@@ -5,6 +5,7 @@ Core concept: "Access is a thing, not a side effect"
 from django.utils import timezone
 from django.db.models import Q
 from ..models import CourseAccess, Course, CohortMember, BundlePurchase
+from .activity import record_activity
 
 
 def has_course_access(user, course):
@@ -63,6 +64,7 @@ def grant_course_access(user, course, access_type, granted_by=None, bundle_purch
         expires_at=expires_at,
         notes=notes
     )
+    record_activity(user, course, 'access_granted', data={'access_type': access_type})
     return access
 
 
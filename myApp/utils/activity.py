@@ -0,0 +1,212 @@
+"""
+Activity Log Utilities
+Events are recorded where the activity happens and read back newest-first
+with keyset pagination, so a feed page is a single index range scan.
+"""
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import ActivityEvent
+
+try:
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    CHANNELS_AVAILABLE = True
+except ImportError:
+    CHANNELS_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+# Channel layer group every connected staff dashboard listens on
+STAFF_ACTIVITY_GROUP = 'staff_activity'
+
+# Event types pushed live to staff dashboards
+LIVE_EVENT_TYPES = {'lesson_completed', 'quiz_attempt', 'exam_attempt', 'certification_issued'}
+
+# Live events are coalesced and flushed to each client once per window
+LIVE_BATCH_WINDOW_SECONDS = 0.25
+
+# Events held per client between flushes; older ones are dropped beyond this
+LIVE_MAX_PENDING_EVENTS = 200
+
+# Unfiltered first feed page shared by every dashboard polling without a
+# live stream (WSGI): read from the database at most once per this window
+LATEST_FEED_SIZE = 50
+LATEST_FEED_CACHE_SECONDS = 10
+
+
+# Watch percentage at which a lesson view is worth a feed entry
+PROGRESS_MILESTONE = 50
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def record_activity(user, course, event_type, lesson=None, data=None, created_at=None):
+    """
+    Append an event to the activity log.
+    Returns the created ActivityEvent.
+    """
+    event = ActivityEvent(
+        user=user,
+        course=course,
+        lesson=lesson,
+        event_type=event_type,
+        data=data or {},
+    )
+    if created_at is not None:
+        event.created_at = created_at
+    event.save()
+    publish_activity(event)
+    return event
+
+
+def serialize_event(event):
+    """JSON-safe representation shared by the feed API and the live stream"""
+    return {
+        'id': event.id,
+        'type': event.event_type,
+        'timestamp': event.created_at.isoformat(),
+        'user': {'id': event.user_id, 'name': event.user.get_full_name() or event.user.username},
+        'course': {'id': event.course_id, 'name': event.course.name},
+        'lesson': {'id': event.lesson_id, 'title': event.lesson.title} if event.lesson else None,
+        'data': event.data,
+    }
+
+
+def publish_activity(event):
+    """
+    Push an event to connected staff dashboards once the surrounding
+    transaction commits. Failures are logged, never raised: the live
+    stream is best-effort and the log stays the source of truth.
+    """
+    if not CHANNELS_AVAILABLE or event.event_type not in LIVE_EVENT_TYPES:
+        return
+    payload = serialize_event(event)
+    transaction.on_commit(lambda: _group_send(payload))
+
+
+def _group_send(payload):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(
+            STAFF_ACTIVITY_GROUP,
+            {'type': 'activity.event', 'event': payload},
+        )
+    except Exception as e:
+        logger.warning(f"Could not publish activity event {payload['id']}: {str(e)}")
+
+
+def record_progress_change(progress, was_completed, previous_watch_percentage):
+    """
+    Record the feed-worthy transitions of a UserProgress row: completing the
+    lesson, or crossing the watch milestone for the first time.
+    """
+    lesson = progress.lesson
+    if progress.completed and not was_completed:
+        return record_activity(
+            progress.user, lesson.course, 'lesson_completed', lesson=lesson,
+            data={'watch_percentage': progress.video_watch_percentage},
+        )
+    if (not progress.completed
+            and previous_watch_percentage < PROGRESS_MILESTONE <= progress.video_watch_percentage):
+        return record_activity(
+            progress.user, lesson.course, 'progress_update', lesson=lesson,
+            data={'watch_percentage': progress.video_watch_percentage, 'status': progress.status},
+        )
+    return None
+
+
+def encode_cursor(event):
+    """URL-safe keyset cursor pointing just past ``event``"""
+    micros = (event.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}_{event.pk}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    micros, _, pk = cursor.partition('_')
+    return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+
+
+def get_activity_feed(limit=20, user=None, course=None, event_types=None, cursor=None):
+    """
+    Read a page of the activity log, newest first.
+
+    Args:
+        limit: Page size
+        user: Optional user (or user id) to filter on
+        course: Optional course (or course id) to filter on
+        event_types: Optional list of ActivityEvent event types
+        cursor: Cursor returned by a previous call, to fetch the next page
+
+    Returns:
+        (events, next_cursor) - next_cursor is None on the last page
+    """
+    events = ActivityEvent.objects.select_related('user', 'course', 'lesson')
+    if user is not None:
+        events = events.filter(user=user)
+    if course is not None:
+        events = events.filter(course=course)
+    if event_types:
+        events = events.filter(event_type__in=event_types)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        events = events.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    # Fetch one extra row to know whether another page exists
+    page = list(events.order_by('-created_at', '-id')[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def get_latest_feed(limit):
+    """
+    Newest ``limit`` (at most LATEST_FEED_SIZE) events, serialized, from one
+    cache entry shared by all viewers.
+
+    Returns:
+        (serialized events, next_cursor)
+    """
+    latest = cache.get('activity-feed:latest')
+    if latest is None:
+        events, _ = get_activity_feed(limit=LATEST_FEED_SIZE + 1)
+        # Each event with the cursor of a page ending on it
+        latest = [(serialize_event(event), encode_cursor(event)) for event in events]
+        cache.set('activity-feed:latest', latest, LATEST_FEED_CACHE_SECONDS)
+    next_cursor = latest[limit - 1][1] if len(latest) > limit else None
+    return [event for event, _ in latest[:limit]], next_cursor
+
+
+class LiveActivityBuffer:
+    """
+    Per-client buffer for the live stream.
+    Bounded so a slow client cannot grow server memory: when full, the
+    oldest events are dropped and counted, and the client is told how many
+    it missed so it can re-sync from the feed API.
+    """
+
+    def __init__(self, max_pending=LIVE_MAX_PENDING_EVENTS):
+        self.pending = deque(maxlen=max_pending)
+        self.dropped = 0
+
+    def add(self, event):
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(event)
+
+    def drain(self):
+        """Return the pending batch as a message dict, or None if empty"""
+        if not self.pending and not self.dropped:
+            return None
+        batch = {'type': 'activity.batch', 'events': list(self.pending), 'dropped': self.dropped}
+        self.pending.clear()
+        self.dropped = 0
+        return batch
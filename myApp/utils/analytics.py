@@ -0,0 +1,88 @@
+"""
+Dashboard Analytics Aggregates
+Grouped-aggregate replacements for the per-row loops in dashboard_analytics.
+Each metric is one GROUP BY query; bucketing happens in numpy.
+"""
+import numpy as np
+from django.db.models import Count
+
+from ..models import Course, CourseEnrollment, CourseAccess, Lesson, UserProgress, Certification
+
+
+# (tier, minimum passed certifications) - ascending thresholds for np.digitize
+TROPHY_TIERS = [
+    ('bronze', 1),
+    ('silver', 3),
+    ('gold', 5),
+    ('platinum', 8),
+    ('diamond', 12),
+    ('ultimate', 20),
+]
+
+
+def bucket_trophies(cert_counts):
+    """
+    Bucket per-user certification counts into trophy tiers.
+
+    Args:
+        cert_counts: Iterable of passed-certification counts, one per user
+
+    Returns:
+        Dict mapping tier name to number of users in that tier
+    """
+    counts = np.fromiter(cert_counts, dtype=np.int64)
+    thresholds = np.array([minimum for _, minimum in TROPHY_TIERS], dtype=np.int64)
+    # Bin 0 holds users below bronze; bins 1..n map onto TROPHY_TIERS
+    bins = np.bincount(np.digitize(counts, thresholds), minlength=len(TROPHY_TIERS) + 1)
+    return {tier: int(bins[i + 1]) for i, (tier, _) in enumerate(TROPHY_TIERS)}
+
+
+def get_trophy_distribution():
+    """
+    Trophy distribution across non-staff students.
+    One grouped query over passed certifications; users without any
+    passed certification fall below bronze and are not fetched.
+    """
+    cert_counts = Certification.objects.filter(
+        status='passed',
+        user__is_staff=False,
+        user__is_superuser=False,
+    ).values('user').annotate(cert_count=Count('id')).values_list('cert_count', flat=True)
+    return bucket_trophies(cert_counts)
+
+
+def _count_by(queryset, field):
+    """Run one GROUP BY query and return {field value: row count}"""
+    return {
+        row[field]: row['n']
+        for row in queryset.values(field).annotate(n=Count('id')).order_by()
+    }
+
+
+def get_course_type_stats():
+    """
+    Course count, student count and completion rate per course type.
+    Issues one grouped query per metric instead of several per type.
+    """
+    courses = _count_by(Course.objects.all(), 'course_type')
+    enrollments = _count_by(CourseEnrollment.objects.all(), 'course__course_type')
+    accesses = _count_by(CourseAccess.objects.filter(status='unlocked'), 'course__course_type')
+    lessons = _count_by(Lesson.objects.all(), 'course__course_type')
+    completed = _count_by(UserProgress.objects.filter(completed=True), 'lesson__course__course_type')
+
+    course_type_stats = {}
+    for course_type, _ in Course.COURSE_TYPES:
+        total_students = enrollments.get(course_type, 0) + accesses.get(course_type, 0)
+        total_lessons = lessons.get(course_type, 0)
+        completed_lessons = completed.get(course_type, 0)
+        # Same scaling the dashboard has always reported
+        completion_rate = (
+            completed_lessons / (total_lessons * total_students * 100)
+            if total_students > 0 and total_lessons > 0 else 0
+        )
+        course_type_stats[course_type] = {
+            'total_courses': courses.get(course_type, 0),
+            'total_students': total_students,
+            'completion_rate': min(completion_rate * 100, 100),
+        }
+    return course_type_stats
@@ -6,145 +6,245 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
 from io import BytesIO
 from datetime import datetime
-import os
-import cloudinary
-import cloudinary.uploader
+from functools import lru_cache
+import hashlib
+import json
+import re
 
+from .certificate_storage import get_certificate_storage
+
+
+# Landscape A4 layout shared by the template and the full renderer
+PAGE_SIZE = landscape(A4)
+MARGIN = 40
+INNER_MARGIN = 60
+MAX_MODULES = 12  # Can fit more in landscape
+
+# Rendered course templates kept per process
+TEMPLATE_CACHE_SIZE = 64
+
+# Bump whenever the layout changes, so bulk issuance re-renders every certificate
+CERTIFICATE_LAYOUT_VERSION = 1
+
+
+def make_certificate_id(course_slug, user_id, issued_date):
+    return f"CERT-{course_slug.upper()}-{user_id}-{issued_date.strftime('%Y%m%d')}"
 
-def generate_certificate_pdf(user_name, course_name, issued_date, certificate_id=None, modules=None):
-    """
-    Generate a PDF certificate for course completion.
-    
-    Args:
-        user_name: Full name of the student
-        course_name: Name of the completed course
-        issued_date: Date when certificate was issued (datetime object)
-        certificate_id: Optional certificate ID/number
-        modules: Optional list of module names to display on certificate
-        
-    Returns:
-        BytesIO object containing the PDF certificate
-    """
-    buffer = BytesIO()
-    # Use landscape orientation - swap width and height
-    width, height = landscape(A4)
 
-    c = canvas.Canvas(buffer, pagesize=landscape(A4))
+def module_lines_for(module_names):
+    return [f"Module {i+1} - {name}" for i, name in enumerate(module_names)]
+
+
+def certificate_fingerprint(user_name, course_name, issued_date, certificate_id=None, modules=None):
+    """Identifies a rendered certificate: everything printed on it plus the layout version"""
+    source = json.dumps([
+        CERTIFICATE_LAYOUT_VERSION, user_name, course_name, issued_date.strftime('%Y-%m-%d'),
+        certificate_id or '', list(modules or []),
+    ])
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _course_title(course_name, limit):
+    title_text = course_name.upper()
+    if len(title_text) > limit:
+        title_text = title_text[:limit - 3] + "..."
+    return title_text
+
+
+def _module_lines(modules):
+    # Format: "Module X - Module Name" or just "Module Name"
+    return [module if len(module) <= 70 else module[:67] + "..." for module in (modules or [])[:MAX_MODULES]]
+
+
+def _text_color(modules):
+    """Fill colour left in effect for the date line, which follows the module block"""
+    return "#374151" if modules else "#000000"
+
+
+def _draw_layout(c, course_name, modules):
+    """Everything on the certificate that is the same for every learner of a course"""
+    width, height = PAGE_SIZE
 
     # ===== Background Border =====
-    margin = 40
     c.setStrokeColor(colors.HexColor("#d4af37"))  # gold tone
     c.setLineWidth(4)
-    c.rect(margin, margin, width - 2*margin, height - 2*margin)
+    c.rect(MARGIN, MARGIN, width - 2*MARGIN, height - 2*MARGIN)
 
-    inner_margin = 60
     c.setLineWidth(1)
-    c.rect(inner_margin, inner_margin, width - 2*inner_margin, height - 2*inner_margin)
+    c.rect(INNER_MARGIN, INNER_MARGIN, width - 2*INNER_MARGIN, height - 2*INNER_MARGIN)
 
     # ===== Title - Use course name, make it uppercase for certificate style =====
     c.setFont("Helvetica-Bold", 36)
     c.setFillColor(colors.HexColor("#1e293b"))
-    # Truncate if too long, or use a shorter version
-    title_text = course_name.upper()
-    if len(title_text) > 50:
-        # Try to use a shorter version or split
-        title_text = course_name.upper()[:47] + "..."
-    c.drawCentredString(width / 2, height - 100, title_text)
+    c.drawCentredString(width / 2, height - 100, _course_title(course_name, 50))
 
     # ===== Subtitle =====
     c.setFont("Helvetica", 18)
     c.setFillColor(colors.HexColor("#475569"))
     c.drawCentredString(width / 2, height - 140, "HAS SUCCESSFULLY COMPLETED THE")
-
-    # Course name subtitle - truncate if needed
-    course_subtitle = course_name.upper()
-    if len(course_subtitle) > 60:
-        course_subtitle = course_subtitle[:57] + "..."
-    c.drawCentredString(width / 2, height - 170, course_subtitle)
-
-    # ===== Student Name =====
-    c.setFont("Helvetica-Bold", 32)
-    c.setFillColor(colors.HexColor("#000000"))
-    c.drawCentredString(width / 2, height - 230, user_name)
+    c.drawCentredString(width / 2, height - 170, _course_title(course_name, 60))
 
     # ===== Course Content Block (Modules) =====
-    if modules and len(modules) > 0:
-        c.setFont("Helvetica", 12)
-        c.setFillColor(colors.HexColor("#374151"))
-        
-        # In landscape, we can fit more modules side by side or in columns
-        y_position = height - 280
-        max_modules = 12  # Can fit more in landscape
-        
-        for i, module in enumerate(modules[:max_modules]):
-            # Format: "Module X - Module Name" or just "Module Name"
-            module_text = module
-            if len(module_text) > 70:
-                module_text = module_text[:67] + "..."
-            c.drawCentredString(width / 2, y_position, module_text)
-            y_position -= 16
+    c.setFont("Helvetica", 12)
+    c.setFillColor(colors.HexColor("#374151"))
+    y_position = height - 280
+    for module_text in _module_lines(modules):
+        c.drawCentredString(width / 2, y_position, module_text)
+        y_position -= 16
 
-    # ===== Date & Certificate ID =====
-    date_str = issued_date.strftime("%B %d, %Y")
+    # ===== Signature Line =====
+    c.line(width - 250, INNER_MARGIN + 80, width - 100, INNER_MARGIN + 80)
+    c.setFont("Helvetica-Oblique", 10)
+    c.drawCentredString(width - 175, INNER_MARGIN + 65, "Authorized Signature")
 
-    c.setFont("Helvetica", 12)
-    c.drawString(inner_margin + 20, inner_margin + 40, f"Date: {date_str}")
 
+def _learner_lines(user_name, issued_date, certificate_id):
+    """(font, size, x, y, alignment, text) for the per-learner fields"""
+    width, height = PAGE_SIZE
+    lines = [
+        ("Helvetica-Bold", 32, width / 2, height - 230, 'centre', user_name),
+        ("Helvetica", 12, INNER_MARGIN + 20, INNER_MARGIN + 40, 'left', f"Date: {issued_date.strftime('%B %d, %Y')}"),
+    ]
     if certificate_id:
-        c.drawRightString(width - inner_margin - 20, inner_margin + 40,
-                          f"Certificate ID: {certificate_id}")
+        lines.append(("Helvetica", 12, width - INNER_MARGIN - 20, INNER_MARGIN + 40, 'right', f"Certificate ID: {certificate_id}"))
+    return lines
 
-    # ===== Signature Line =====
-    c.line(width - 250, inner_margin + 80, width - 100, inner_margin + 80)
-    c.setFont("Helvetica-Oblique", 10)
-    c.drawCentredString(width - 175, inner_margin + 65, "Authorized Signature")
 
+def render_certificate_pdf(user_name, course_name, issued_date, certificate_id=None, modules=None):
+    """
+    Draw a complete certificate with ReportLab. This is the reference
+    rendering; generate_certificate_pdf produces the same page from a
+    cached course template and is much faster.
+    """
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+    _draw_layout(c, course_name, modules)
+    for font, size, x, y, alignment, text in _learner_lines(user_name, issued_date, certificate_id):
+        c.setFont(font, size)
+        c.setFillColor(colors.HexColor("#000000" if font == "Helvetica-Bold" else _text_color(modules)))
+        draw = {'centre': c.drawCentredString, 'left': c.drawString, 'right': c.drawRightString}[alignment]
+        draw(x, y, text)
     c.save()
     buffer.seek(0)
     return buffer
 
 
-def upload_certificate_to_cloudinary(pdf_buffer, user_id, course_slug):
+def _pdf_string(text):
+    """A PDF literal string in WinAnsi, as ReportLab writes it for the standard fonts"""
+    data = text.encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class CertificateTemplate:
+    """
+    A course's certificate layout rendered once by ReportLab. Each learner's
+    certificate is the template plus a PDF incremental update that appends
+    a content stream with their name, date and certificate ID, so stamping
+    is a few string operations instead of a full document build.
+    """
+
+    def __init__(self, course_name, modules=None):
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=PAGE_SIZE, invariant=1)
+        _draw_layout(c, course_name, modules)
+        # Every font the stamp uses must be in the page resources
+        for font in ("Helvetica", "Helvetica-Bold"):
+            c.setFont(font, 12)
+            c.drawString(0, 0, "")
+        c.save()
+        self.data = buffer.getvalue()
+        self.text_color = colors.HexColor(_text_color(modules))
+        self._parse()
+
+    def _parse(self):
+        data = self.data
+        self.startxref = int(re.search(rb'startxref\s+(\d+)\s+%%EOF\s*$', data).group(1))
+        trailer = data[data.rindex(b'trailer'):]
+        self.size = int(re.search(rb'/Size (\d+)', trailer).group(1))
+        self.trailer_refs = b' '.join(
+            match.group(0) for match in re.finditer(rb'/(?:Root|Info) \d+ 0 R', trailer)
+        )
+        file_id = re.search(rb'/ID\s*\[\s*(<[0-9a-fA-F]+>\s*<[0-9a-fA-F]+>)\s*\]', trailer)
+        if file_id:
+            self.trailer_refs += b' /ID [' + file_id.group(1) + b']'
+        self.fonts = {
+            match.group(1).decode(): match.group(2).decode()
+            for match in re.finditer(rb'/BaseFont /(\S+) .*?/Name /(\S+)', data)
+        }
+        page = re.search(rb'(\d+) 0 obj\s*<<((?:(?!endobj).)*?/Type /Page\b(?:(?!endobj).)*?)>>\s*endobj', data, re.S)
+        self.page_number = int(page.group(1))
+        contents = re.search(rb'/Contents (\d+ 0 R)', page.group(2))
+        self.page_head = page.group(2)[:contents.start()]
+        self.page_tail = page.group(2)[contents.end():]
+        self.contents_ref = contents.group(1)
+
+    def _stamp_stream(self, user_name, issued_date, certificate_id):
+        ops = [b'Q']
+        for font, size, x, y, alignment, text in _learner_lines(user_name, issued_date, certificate_id):
+            if alignment != 'left':
+                text_width = pdfmetrics.stringWidth(text, font, size)
+                x -= text_width / 2 if alignment == 'centre' else text_width
+            color = colors.black if font == "Helvetica-Bold" else self.text_color
+            ops.append(b'%.4f %.4f %.4f rg BT /%s %d Tf 1 0 0 1 %.4f %.4f Tm %s Tj ET' % (
+                color.red, color.green, color.blue, self.fonts[font].encode(), size, x, y, _pdf_string(text),
+            ))
+        return b'\n'.join(ops) + b'\n'
+
+    def stamp(self, user_name, issued_date, certificate_id=None):
+        """PDF bytes of the certificate for one learner"""
+        save_ref, stamp_ref = self.size, self.size + 1
+        stamp = self._stamp_stream(user_name, issued_date, certificate_id)
+        # The template's graphics state is saved around its own content
+        contents = b'/Contents [%d 0 R %s %d 0 R]' % (save_ref, self.contents_ref, stamp_ref)
+        objects = [
+            (self.page_number, b'<<' + self.page_head + contents + self.page_tail + b'>>'),
+            (save_ref, b'<< /Length 2 >>\nstream\nq\nendstream'),
+            (stamp_ref, b'<< /Length %d >>\nstream\n%sendstream' % (len(stamp), stamp)),
+        ]
+        out = [self.data, b'\n']
+        offset = len(self.data) + 1
+        xref = [b'xref\n']
+        for number, body in objects:
+            chunk = b'%d 0 obj\n%s\nendobj\n' % (number, body)
+            xref.append(b'%d 1\n%010d 00000 n \n' % (number, offset))
+            out.append(chunk)
+            offset += len(chunk)
+        out.extend(xref)
+        out.append(b'trailer\n<< /Size %d %s /Prev %d >>\nstartxref\n%d\n%%%%EOF\n' % (
+            self.size + 2, self.trailer_refs, self.startxref, offset,
+        ))
+        return b''.join(out)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _cached_template(course_name, modules):
+    return CertificateTemplate(course_name, list(modules))
+
+
+def get_certificate_template(course_name, modules=None):
+    """The rendered template for a course layout; a renamed course or changed modules get a new one"""
+    return _cached_template(course_name, tuple(modules or ()))
+
+
+def generate_certificate_pdf(user_name, course_name, issued_date, certificate_id=None, modules=None):
     """
-    Upload certificate PDF to Cloudinary.
+    Generate a PDF certificate for course completion.
     
     Args:
-        pdf_buffer: BytesIO object containing the PDF
-        user_id: User ID for organizing files
-        course_slug: Course slug for organizing files
+        user_name: Full name of the student
+        course_name: Name of the completed course
+        issued_date: Date when certificate was issued (datetime object)
+        certificate_id: Optional certificate ID/number
+        modules: Optional list of module names to display on certificate
         
     Returns:
-        Dictionary with 'url' and 'public_id' of uploaded certificate
+        BytesIO object containing the PDF certificate
     """
-    try:
-        # Configure Cloudinary if not already configured
-        if not cloudinary.config().cloud_name:
-            cloudinary.config(
-                cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-                api_key=os.getenv('CLOUDINARY_API_KEY'),
-                api_secret=os.getenv('CLOUDINARY_API_SECRET')
-            )
-        
-        # Upload PDF to Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            pdf_buffer,
-            resource_type='raw',  # PDFs are raw files
-            folder=f'certificates/{course_slug}',
-            public_id=f'cert_{user_id}_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
-            format='pdf',
-            overwrite=False
-        )
-        
-        return {
-            'url': upload_result['secure_url'],
-            'public_id': upload_result['public_id']
-        }
-    except Exception as e:
-        print(f"Error uploading certificate to Cloudinary: {str(e)}")
-        return None
+    template = get_certificate_template(course_name, modules)
+    return BytesIO(template.stamp(user_name, issued_date, certificate_id))
 
 
-def generate_certificate(user, course, issued_date=None, upload_to_cloudinary=True):
+def generate_certificate(user, course, issued_date=None, store=True, storage=None):
     """
     Generate a certificate for a user and course.
     
@@ -152,16 +252,18 @@ def generate_certificate(user, course, issued_date=None, upload_to_cloudinary=Tr
         user: User object
         course: Course object
         issued_date: Optional datetime (defaults to now)
-        upload_to_cloudinary: Whether to upload to Cloudinary (default True)
+        store: Whether to keep the PDF in certificate storage (default True)
+        storage: Storage backend (defaults to settings.CERTIFICATE_STORAGE)
         
     Returns:
-        Dictionary with certificate URL and certificate ID, or None if error
+        Dictionary with the stored file and URL (or the PDF buffer when not
+        storing) and the certificate ID, or None if storing failed
     """
     if issued_date is None:
         issued_date = datetime.now()
     
     # Generate certificate ID
-    certificate_id = f"CERT-{course.slug.upper()}-{user.id}-{issued_date.strftime('%Y%m%d')}"
+    certificate_id = make_certificate_id(course.slug, user.id, issued_date)
     
     # Get user's full name
     user_name = user.get_full_name() or user.username
@@ -169,8 +271,7 @@ def generate_certificate(user, course, issued_date=None, upload_to_cloudinary=Tr
     # Get course modules dynamically
     modules = []
     try:
-        course_modules = course.modules.all().order_by('order', 'id')
-        modules = [f"Module {i+1} - {module.name}" for i, module in enumerate(course_modules)]
+        modules = module_lines_for(course.modules.order_by('order', 'id').values_list('name', flat=True))
     except Exception:
         # If modules don't exist or error, just use empty list
         pass
@@ -184,26 +285,22 @@ def generate_certificate(user, course, issued_date=None, upload_to_cloudinary=Tr
         modules=modules
     )
     
-    # Upload to Cloudinary if requested
-    if upload_to_cloudinary:
-        upload_result = upload_certificate_to_cloudinary(
-            pdf_buffer,
-            user.id,
-            course.slug
-        )
-        
-        if upload_result:
-            return {
-                'certificate_url': upload_result['url'],
-                'certificate_id': certificate_id,
-                'public_id': upload_result['public_id']
-            }
-        else:
-            # If upload fails, return None
-            return None
-    else:
+    if not store:
         # Return PDF buffer for direct download
         return {
             'pdf_buffer': pdf_buffer,
             'certificate_id': certificate_id
         }
+    
+    try:
+        storage = storage or get_certificate_storage()
+        name, url = storage.save(pdf_buffer.getvalue(), course.slug)
+    except Exception as e:
+        print(f"Error storing certificate: {str(e)}")
+        return None
+    return {
+        'certificate_file': name,
+        'certificate_url': url,
+        'certificate_id': certificate_id,
+        'certificate_hash': certificate_fingerprint(user_name, course.name, issued_date, certificate_id, modules),
+    }
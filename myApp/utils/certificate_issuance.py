@@ -0,0 +1,162 @@
+"""
+Bulk Certificate Issuance
+(Re)issues certificate PDFs for every passed certification of one or more
+courses. PDFs are rendered in a process pool from the cached course
+templates, stored from a bounded thread pool as they come back (see
+certificate_storage; identical re-renders are not uploaded again), and the
+Certification rows are updated in bulk once per batch.
+
+Each row stores a fingerprint of what was printed on its PDF, so a run
+only picks up rows whose certificate is missing or out of date (a renamed
+course, a changed module list or layout). An interrupted run therefore
+resumes where it stopped.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.urls import reverse
+
+from ..models import Certification, Module
+from .certificate_generator import (
+    certificate_fingerprint,
+    generate_certificate_pdf,
+    make_certificate_id,
+    module_lines_for,
+)
+from .certificate_storage import content_name, get_certificate_storage
+
+
+logger = logging.getLogger(__name__)
+
+ISSUE_BATCH_SIZE = 500
+
+# Each render task carries this many certificates to a worker process
+RENDER_CHUNK_SIZE = 25
+
+
+def _course_modules(course_ids):
+    names = {course_id: [] for course_id in course_ids}
+    for course_id, name in Module.objects.filter(course_id__in=course_ids).order_by('order', 'id').values_list('course_id', 'name'):
+        names[course_id].append(name)
+    return {course_id: module_lines_for(module_names) for course_id, module_names in names.items()}
+
+
+def pending_certificates(courses=None, force=False):
+    """
+    Certificate jobs for passed certifications whose stored PDF is missing
+    or no longer matches what would be printed. One query for the
+    (user, course) pairs plus one for the module lists.
+
+    Returns:
+        List of job dicts: certification, user_name, course_name, issued_date,
+        certificate_id, modules and fingerprint
+    """
+    certifications = (
+        Certification.objects.filter(status='passed')
+        .select_related('user', 'course')
+        .only(
+            'id', 'issued_at', 'created_at', 'accredible_certificate_id', 'accredible_certificate_url',
+            'certificate_file', 'certificate_hash', 'user__id', 'user__username', 'user__first_name', 'user__last_name',
+            'course__id', 'course__name', 'course__slug',
+        )
+        .order_by('id')
+    )
+    if courses is not None:
+        certifications = certifications.filter(course__in=courses)
+    certifications = list(certifications)
+    modules = _course_modules({certification.course_id for certification in certifications})
+
+    jobs = []
+    for certification in certifications:
+        user, course = certification.user, certification.course
+        issued_date = certification.issued_at or certification.created_at
+        job = {
+            'certification': certification,
+            'user_name': user.get_full_name() or user.username,
+            'course_name': course.name,
+            'issued_date': issued_date,
+            'certificate_id': certification.accredible_certificate_id or make_certificate_id(course.slug, user.id, issued_date),
+            'modules': modules[course.id],
+        }
+        job['fingerprint'] = certificate_fingerprint(
+            job['user_name'], job['course_name'], issued_date, job['certificate_id'], job['modules'],
+        )
+        if force or not certification.certificate_file or certification.certificate_hash != job['fingerprint']:
+            jobs.append(job)
+    return jobs
+
+
+def render_job(args):
+    """Worker entry point: PDF bytes for one (user_name, course_name, issued_date, certificate_id, modules)"""
+    return generate_certificate_pdf(*args).getvalue()
+
+
+def issue_certificates(jobs, storage=None, workers=4, upload_workers=8,
+                       batch_size=ISSUE_BATCH_SIZE, progress=None):
+    """
+    Render and store the certificates for ``jobs`` (from pending_certificates)
+    in ``storage`` (default: settings.CERTIFICATE_STORAGE).
+    ``workers=0`` renders in this process. Rows are saved once per batch, so
+    an interruption loses at most one batch of work; ``progress`` is called
+    with the running stats after each batch.
+
+    Returns:
+        Dict with 'issued', 'failed', 'seconds' and 'failures' (certification ids)
+    """
+    stats = {'issued': 0, 'failed': 0, 'seconds': 0.0, 'failures': []}
+    storage = storage or get_certificate_storage()
+    started = time.perf_counter()
+    renderer = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, upload_workers)) as uploader:
+            for offset in range(0, len(jobs), batch_size):
+                batch = jobs[offset:offset + batch_size]
+                args = [
+                    (job['user_name'], job['course_name'], job['issued_date'], job['certificate_id'], job['modules'])
+                    for job in batch
+                ]
+                pdfs = renderer.map(render_job, args, chunksize=RENDER_CHUNK_SIZE) if renderer else map(render_job, args)
+                # Uploads start as soon as each PDF comes back from the renderers
+                uploads = [uploader.submit(_store, storage, pdf, job) for job, pdf in zip(batch, pdfs)]
+                _save_batch(batch, [upload.result() for upload in uploads], stats)
+                stats['seconds'] = time.perf_counter() - started
+                if progress:
+                    progress(stats)
+    finally:
+        if renderer:
+            renderer.shutdown(cancel_futures=True)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def _store(storage, pdf, job):
+    certification = job['certification']
+    if certification.certificate_file == content_name(pdf, certification.course.slug):
+        # Re-rendered identically: the stored file is already this one
+        return certification.certificate_file, certification.accredible_certificate_url
+    try:
+        return storage.save(pdf, certification.course.slug)
+    except Exception:
+        logger.exception('Storing certificate for certification %s failed', certification.id)
+        return None
+
+
+def _save_batch(batch, stored, stats):
+    changed = []
+    for job, result in zip(batch, stored):
+        certification = job['certification']
+        if not result:
+            stats['failed'] += 1
+            stats['failures'].append(certification.id)
+            continue
+        name, url = result
+        certification.certificate_file = name
+        certification.accredible_certificate_url = url or reverse('view_certificate', args=[certification.course.slug])
+        certification.accredible_certificate_id = job['certificate_id']
+        certification.certificate_hash = job['fingerprint']
+        changed.append(certification)
+    Certification.objects.bulk_update(
+        changed, ['certificate_file', 'accredible_certificate_url', 'accredible_certificate_id', 'certificate_hash'],
+    )
+    stats['issued'] += len(changed)
@@ -0,0 +1,172 @@
+"""
+Certificate Storage
+Where certificate PDFs are kept. Files are named by the SHA-256 of their
+content, so storing a re-render that came out identical finds the existing
+file and skips the upload (on Cloudinary, the upload is not overwritten).
+
+The backend is chosen by settings.CERTIFICATE_STORAGE: 'local' keeps files
+in default_storage under MEDIA_ROOT and serves them through view_certificate;
+'cloudinary' uploads them and links to Cloudinary.
+"""
+import hashlib
+import os
+import re
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header
+
+try:
+    import cloudinary
+    import cloudinary.uploader
+    import cloudinary.utils
+    CLOUDINARY_AVAILABLE = True
+except ImportError:
+    CLOUDINARY_AVAILABLE = False
+
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class CertificateStorageError(Exception):
+    pass
+
+
+def content_name(data, course_slug):
+    """Storage name for a certificate: its content hash under the course folder"""
+    return f'certificates/{course_slug}/{hashlib.sha256(data).hexdigest()}.pdf'
+
+
+def content_hash(name):
+    """The content hash a storage name was derived from"""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class LocalCertificateStorage:
+    """Files in Django's default storage (MEDIA_ROOT), streamed by view_certificate"""
+    can_stream = True
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    def save(self, data, course_slug):
+        """
+        Returns:
+            (storage name, public URL or None when only view_certificate serves it)
+        """
+        name = content_name(data, course_slug)
+        if not self.storage.exists(name):
+            saved = self.storage.save(name, ContentFile(data))
+            if saved != name:
+                # Written concurrently under the same hash: the copy is identical
+                self.storage.delete(saved)
+        return name, None
+
+    def exists(self, name):
+        return self.storage.exists(name)
+
+    def open(self, name):
+        return self.storage.open(name, 'rb')
+
+    def size(self, name):
+        return self.storage.size(name)
+
+
+class CloudinaryCertificateStorage:
+    """Raw uploads to Cloudinary, linked to directly"""
+    can_stream = False
+
+    def __init__(self):
+        if not CLOUDINARY_AVAILABLE:
+            raise CertificateStorageError('Cloudinary is not available. Please install the cloudinary package.')
+        # Configure Cloudinary if not already configured
+        if not cloudinary.config().cloud_name:
+            cloudinary.config(
+                cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+                api_key=os.getenv('CLOUDINARY_API_KEY'),
+                api_secret=os.getenv('CLOUDINARY_API_SECRET')
+            )
+
+    def save(self, data, course_slug):
+        # No lookup first: the Admin API is rate limited, and with overwrite=False
+        # an upload under an existing content hash leaves the stored file as is
+        name = content_name(data, course_slug)
+        result = cloudinary.uploader.upload(BytesIO(data), resource_type='raw', public_id=name, overwrite=False)
+        return name, result['secure_url']
+
+    def exists(self, name):
+        url, _ = cloudinary.utils.cloudinary_url(name, resource_type='raw', secure=True)
+        return requests.head(url, timeout=10).status_code == 200
+
+
+CERTIFICATE_STORAGES = {
+    'local': LocalCertificateStorage,
+    'cloudinary': CloudinaryCertificateStorage,
+}
+
+
+def get_certificate_storage(name=None):
+    name = name or getattr(settings, 'CERTIFICATE_STORAGE', 'local')
+    if name not in CERTIFICATE_STORAGES:
+        raise CertificateStorageError(f"Unknown certificate storage '{name}'")
+    return CERTIFICATE_STORAGES[name]()
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single-range header, None to send everything, or False if unsatisfiable"""
+    match = _RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def certificate_file_response(request, storage, name, filename):
+    """
+    Stream a stored certificate with a strong ETag (its content hash) and
+    single byte-range support, answering If-None-Match with 304.
+    """
+    etag = f'"{content_hash(name)}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    size = storage.size(name)
+    byte_range = _byte_range(request.headers.get('Range', ''), size)
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range:
+        start, end = byte_range
+        with storage.open(name) as pdf:
+            pdf.seek(start)
+            response = HttpResponse(pdf.read(end - start + 1), status=206, content_type='application/pdf')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(storage.open(name), content_type='application/pdf')
+        response['Content-Length'] = size
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    # Per-learner and replaced on reissue: always revalidate, cheaply via the ETag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
@@ -0,0 +1,315 @@
+"""
+Exam Engine
+Timed final exams with server-side deadlines. Answers are autosaved in
+batches: the page collects changes and flushes them every
+EXAM_AUTOSAVE_INTERVAL_SECONDS as one partial JSON merge (a single UPDATE
+with no reads), so a cohort starting together costs one small write per
+learner per interval rather than one per click. Attempts left open past
+their deadline are graded in bulk by the sweep_exam_attempts command.
+Grading uses a cached answer key, and the question paper is cached without
+the correct options, so the exam page needs no question queries.
+"""
+import re
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Func, Q, Value
+from django.utils import timezone
+
+from ..models import ActivityEvent, Certification, ExamAttempt, ExamQuestion, ExamSummary
+from .activity import publish_activity
+from .quiz_grading import ANSWER_KEY_CACHE_TIMEOUT, VALID_OPTIONS, AnswerKey, grade
+
+
+# How often the exam page flushes changed answers; the first flush is
+# offset by up to the jitter so a cohort that starts together spreads out
+EXAM_AUTOSAVE_INTERVAL_SECONDS = 15
+EXAM_AUTOSAVE_JITTER_SECONDS = 10
+
+# Saves and submissions are accepted this long after the deadline to absorb
+# network latency; the attempt is still completed at its deadline
+EXAM_SUBMIT_GRACE_SECONDS = 10
+
+# Largest number of answers one autosave may carry
+MAX_AUTOSAVE_ANSWERS = 500
+
+SWEEP_BATCH_SIZE = 500
+
+_ANSWER_FIELD = re.compile(r'^q_\d+$')
+
+
+class ExamError(Exception):
+    pass
+
+
+class JSONMerge(Func):
+    """``expression`` with the keys of a JSON object merged in (RFC 7396 merge patch)"""
+    function = 'JSON_MERGE_PATCH'
+    output_field = models.JSONField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='JSON_PATCH', **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' || ', **extra_context)
+
+
+def _exam_answer_key_cache_key(exam_id):
+    return f'exam-answer-key:{exam_id}'
+
+
+def _exam_paper_cache_key(exam_id):
+    return f'exam-paper:{exam_id}'
+
+
+def get_exam_answer_key(exam_id):
+    """Cached AnswerKey for an exam's questions; dropped whenever one of them changes"""
+    key = cache.get(_exam_answer_key_cache_key(exam_id))
+    if key is None:
+        rows = list(
+            ExamQuestion.objects.filter(exam_id=exam_id)
+            .order_by('order', 'id')
+            .values_list('id', 'correct_option')
+        )
+        key = AnswerKey(exam_id, [row[0] for row in rows], ''.join(row[1] for row in rows))
+        cache.set(_exam_answer_key_cache_key(exam_id), key, ANSWER_KEY_CACHE_TIMEOUT)
+    return key
+
+
+def get_exam_paper(exam_id):
+    """Cached questions as shown to learners: id, text and the filled options, no answers"""
+    paper = cache.get(_exam_paper_cache_key(exam_id))
+    if paper is None:
+        paper = [
+            {
+                'id': question.id,
+                'field': f'q_{question.id}',
+                'text': question.text,
+                'options': [
+                    (letter, text) for letter, text in zip('ABCD', (
+                        question.option_a, question.option_b, question.option_c, question.option_d,
+                    )) if text
+                ],
+            }
+            for question in ExamQuestion.objects.filter(exam_id=exam_id).order_by('order', 'id')
+        ]
+        cache.set(_exam_paper_cache_key(exam_id), paper, ANSWER_KEY_CACHE_TIMEOUT)
+    return paper
+
+
+def invalidate_exam(exam_id):
+    cache.delete_many([_exam_answer_key_cache_key(exam_id), _exam_paper_cache_key(exam_id)])
+
+
+def is_expired(attempt, now=None):
+    """True once the deadline plus the grace period has passed"""
+    if attempt.deadline_at is None:
+        return False
+    return (now or timezone.now()) > attempt.deadline_at + timedelta(seconds=EXAM_SUBMIT_GRACE_SECONDS)
+
+
+def remaining_seconds(attempt, now=None):
+    """Seconds until the deadline, or None for untimed exams"""
+    if attempt.deadline_at is None:
+        return None
+    return max(0, int((attempt.deadline_at - (now or timezone.now())).total_seconds()))
+
+
+def clean_answers(data):
+    """Keep ``q_<id>`` -> option letter pairs; an empty value becomes null, which clears the answer"""
+    answers = {}
+    for field, value in data.items():
+        if not _ANSWER_FIELD.match(str(field)):
+            continue
+        if value in VALID_OPTIONS:
+            answers[field] = value
+        elif value in (None, ''):
+            answers[field] = None
+    if len(answers) > MAX_AUTOSAVE_ANSWERS:
+        raise ExamError(f'At most {MAX_AUTOSAVE_ANSWERS} answers can be saved at once.')
+    return answers
+
+
+def start_attempt(user, exam, now=None):
+    """
+    The user's open attempt for ``exam``, or a new one. Expired open
+    attempts are graded first. Raises ExamError when the exam is inactive,
+    already passed or out of attempts.
+    """
+    now = now or timezone.now()
+    if not exam.is_active:
+        raise ExamError('This exam is not open.')
+    open_attempts = ExamAttempt.objects.filter(user=user, exam=exam, completed_at__isnull=True).order_by('-attempt_number')
+    with transaction.atomic():
+        # Attempt before summary, the same lock order as submitting and sweeping
+        open_attempt = open_attempts.select_for_update().first()
+        summary = ExamSummary.lock(user.id, exam.id)
+        if open_attempt is None:
+            # Started by a concurrent request while this one waited for the summary
+            open_attempt = open_attempts.first()
+        if open_attempt and not is_expired(open_attempt, now):
+            return open_attempt
+        if open_attempt:
+            open_attempt.user, open_attempt.exam = user, exam
+            finalize_attempts([open_attempt], now)
+            summary.refresh_from_db()
+
+        if summary.passed:
+            raise ExamError('You have already passed this exam.')
+        if exam.max_attempts and summary.attempts_used >= exam.max_attempts:
+            raise ExamError('You have used all your attempts for this exam.')
+
+        deadline = now + timedelta(minutes=exam.time_limit_minutes) if exam.time_limit_minutes else None
+        return ExamAttempt.objects.create(user=user, exam=exam, deadline_at=deadline)
+
+
+def save_answers(attempt_id, user, answers, now=None):
+    """
+    Merge changed answers into an open attempt with one UPDATE. The filter
+    enforces ownership and the deadline, so nothing is read first.
+
+    Returns:
+        False if the attempt is submitted, expired or not the user's
+    """
+    now = now or timezone.now()
+    answers = clean_answers(answers)
+    if not answers:
+        return True
+    cutoff = now - timedelta(seconds=EXAM_SUBMIT_GRACE_SECONDS)
+    updated = ExamAttempt.objects.filter(
+        Q(deadline_at__isnull=True) | Q(deadline_at__gte=cutoff),
+        id=attempt_id, user=user, completed_at__isnull=True,
+    ).update(answers=JSONMerge(F('answers'), Value(answers, output_field=models.JSONField())))
+    return updated == 1
+
+
+def submit_attempt(attempt_id, user, answers=None, now=None):
+    """
+    Grade the user's open attempt, merging any final answers first unless
+    the attempt has already expired.
+
+    Returns:
+        The graded ExamAttempt
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        attempt = (
+            ExamAttempt.objects.select_for_update()
+            .select_related('exam__course', 'user')
+            .filter(id=attempt_id, user=user)
+            .first()
+        )
+        if attempt is None:
+            raise ExamError('Exam attempt not found.')
+        if attempt.completed_at is not None:
+            return attempt
+        if answers and not is_expired(attempt, now):
+            merged = {**attempt.answers, **clean_answers(answers)}
+            attempt.answers = {field: value for field, value in merged.items() if value is not None}
+        finalize_attempts([attempt], now)
+    return attempt
+
+
+def finalize_attempts(attempts, now=None):
+    """
+    Grade open attempts and record the results in bulk: the attempt rows,
+    the exam summaries, certifications and activity events. Call inside a
+    transaction with the attempts locked. Attempts graded after their
+    deadline are completed at the deadline.
+    """
+    now = now or timezone.now()
+    if not attempts:
+        return
+    for attempt in attempts:
+        key = get_exam_answer_key(attempt.exam_id)
+        attempt.responses = key.pack(attempt.answers)
+        attempt.answer_key_version = key.version
+        _, _, attempt.score = grade(key.correct_options, attempt.responses)
+        attempt.passed = len(key) > 0 and attempt.score >= attempt.exam.passing_score
+        attempt.completed_at = min(now, attempt.deadline_at) if attempt.deadline_at else now
+        attempt.time_taken_seconds = max(0, int((attempt.completed_at - attempt.started_at).total_seconds()))
+    ExamAttempt.objects.bulk_update(
+        attempts,
+        ['answers', 'responses', 'answer_key_version', 'score', 'passed', 'completed_at', 'time_taken_seconds'],
+        batch_size=SWEEP_BATCH_SIZE,
+    )
+    _record_results(attempts, now)
+
+
+def _record_results(attempts, now):
+    user_ids = {attempt.user_id for attempt in attempts}
+    exam_ids = {attempt.exam_id for attempt in attempts}
+    course_ids = {attempt.exam.course_id for attempt in attempts}
+
+    summaries = {
+        (summary.user_id, summary.exam_id): summary
+        for summary in ExamSummary.objects.select_for_update().filter(user_id__in=user_ids, exam_id__in=exam_ids)
+    }
+    certifications = {
+        (certification.user_id, certification.course_id): certification
+        for certification in Certification.objects.filter(user_id__in=user_ids, course_id__in=course_ids)
+    }
+    new_certifications, changed_certifications, events = [], [], []
+    for attempt in attempts:
+        summary = summaries[(attempt.user_id, attempt.exam_id)]
+        if summary.best_score is None or attempt.score > summary.best_score:
+            summary.best_score = attempt.score
+        summary.passed = summary.passed or attempt.passed
+
+        course = attempt.exam.course
+        events.append(ActivityEvent(
+            user=attempt.user, course=course, event_type='exam_attempt', created_at=attempt.completed_at,
+            data={'score': attempt.score, 'passed': attempt.passed, 'attempt_number': attempt.attempt_number},
+        ))
+        certification = certifications.get((attempt.user_id, course.id))
+        if certification is None:
+            certification = Certification(user_id=attempt.user_id, course_id=course.id, status='not_eligible')
+            certifications[(attempt.user_id, course.id)] = certification
+            new_certifications.append(certification)
+        elif certification.status != 'passed':
+            changed_certifications.append(certification)
+        if certification.status == 'passed':
+            continue
+        certification.updated_at = now
+        if attempt.passed:
+            certification.status = 'passed'
+            certification.issued_at = certification.issued_at or attempt.completed_at
+            certification.passing_exam_attempt = attempt
+            events.append(ActivityEvent(
+                user=attempt.user, course=course, event_type='certification_issued', created_at=attempt.completed_at,
+                data={'certificate_id': certification.accredible_certificate_id},
+            ))
+        else:
+            certification.status = 'failed'
+
+    ExamSummary.objects.bulk_update(summaries.values(), ['best_score', 'passed'])
+    Certification.objects.bulk_create(new_certifications)
+    Certification.objects.bulk_update(changed_certifications, ['status', 'issued_at', 'passing_exam_attempt', 'updated_at'])
+    for event in ActivityEvent.objects.bulk_create(events):
+        publish_activity(event)
+
+
+def sweep_expired_attempts(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Grade every open attempt past its deadline and grace period, one locked
+    batch per transaction. Rows locked by a concurrent submit are skipped.
+
+    Returns:
+        Number of attempts graded
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=EXAM_SUBMIT_GRACE_SECONDS)
+    swept = 0
+    while True:
+        with transaction.atomic():
+            attempts = list(
+                ExamAttempt.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('exam__course', 'user')
+                .filter(completed_at__isnull=True, deadline_at__lt=cutoff)
+                .order_by('deadline_at')[:batch_size]
+            )
+            finalize_attempts(attempts, now)
+        swept += len(attempts)
+        if len(attempts) < batch_size:
+            return swept
@@ -0,0 +1,234 @@
+"""
+Streaming Data Exports
+Bulk exports of progress, access and attempt records as CSV or Parquet.
+Rows are read with values_list().iterator() and written out in chunks,
+so memory stays flat however many rows are exported.
+"""
+import csv
+from datetime import datetime, time
+
+from asgiref.sync import sync_to_async
+from django.db import models
+from django.utils import timezone
+
+from ..models import (
+    UserProgress,
+    CourseAccess,
+    LessonQuizAttempt,
+    ExamAttempt,
+    Certification,
+    CohortMember,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+# Rows fetched per database round trip (server-side cursor on PostgreSQL)
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows per Parquet row group; each group is flushed to the client as written
+PARQUET_ROW_GROUP_SIZE = 10000
+
+# name -> model, exported columns, and the lookups the filters apply to
+EXPORTS = {
+    'progress': {
+        'label': 'Lesson Progress',
+        'model': UserProgress,
+        'fields': [
+            'id', 'user_id', 'user__username', 'user__email', 'lesson__course_id', 'lesson__course__slug',
+            'lesson_id', 'lesson__title', 'status', 'completed', 'video_watch_percentage',
+            'started_at', 'completed_at', 'last_accessed',
+        ],
+        'course_field': 'lesson__course_id',
+        'date_field': 'last_accessed',
+    },
+    'access': {
+        'label': 'Course Access',
+        'model': CourseAccess,
+        'fields': [
+            'id', 'user_id', 'user__username', 'user__email', 'course_id', 'course__slug', 'access_type',
+            'status', 'cohort_id', 'bundle_purchase_id', 'purchase_id', 'granted_at', 'expires_at',
+            'revoked_at', 'revocation_reason',
+        ],
+        'course_field': 'course_id',
+        'date_field': 'granted_at',
+    },
+    'quiz_attempts': {
+        'label': 'Lesson Quiz Attempts',
+        'model': LessonQuizAttempt,
+        'fields': [
+            'id', 'user_id', 'user__username', 'quiz__lesson__course_id', 'quiz__lesson_id',
+            'quiz__lesson__title', 'score', 'passed', 'responses', 'answer_key_version', 'completed_at',
+        ],
+        'course_field': 'quiz__lesson__course_id',
+        'date_field': 'completed_at',
+    },
+    'exam_attempts': {
+        'label': 'Exam Attempts',
+        'model': ExamAttempt,
+        'fields': [
+            'id', 'user_id', 'user__username', 'exam__course_id', 'exam_id', 'attempt_number', 'score', 'passed',
+            'started_at', 'completed_at', 'time_taken_seconds', 'is_final',
+        ],
+        'course_field': 'exam__course_id',
+        'date_field': 'started_at',
+    },
+    'certifications': {
+        'label': 'Certifications',
+        'model': Certification,
+        'fields': [
+            'id', 'user_id', 'user__username', 'user__email', 'course_id', 'course__slug', 'status',
+            'accredible_certificate_id', 'accredible_certificate_url', 'issued_at', 'created_at',
+        ],
+        'course_field': 'course_id',
+        'date_field': 'created_at',
+    },
+}
+
+
+def export_queryset(name, course_id=None, date_from=None, date_to=None, cohort_id=None):
+    """
+    Build the values_list queryset for an export.
+
+    Args:
+        name: Key of EXPORTS
+        course_id: Optional course id
+        date_from: Optional date; rows on or after it by the export's date field
+        date_to: Optional date; rows on or before it (inclusive)
+        cohort_id: Optional cohort id; only rows for its members
+
+    Returns:
+        (column names, queryset of tuples)
+    """
+    spec = EXPORTS[name]
+    queryset = spec['model'].objects.all()
+    if course_id:
+        queryset = queryset.filter(**{spec['course_field']: course_id})
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        queryset = queryset.filter(**{f"{spec['date_field']}__gte": start})
+    if date_to:
+        end = timezone.make_aware(datetime.combine(date_to, time.max))
+        queryset = queryset.filter(**{f"{spec['date_field']}__lte": end})
+    if cohort_id:
+        members = CohortMember.objects.filter(cohort_id=cohort_id).values('user_id')
+        queryset = queryset.filter(user_id__in=members)
+    return spec['fields'], queryset.order_by('pk').values_list(*spec['fields'])
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, queryset):
+    """Yield the export as CSV text, one chunk of rows at a time"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    chunk = []
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _arrow_type(model, lookup):
+    """pyarrow type for a values_list lookup such as 'lesson__course__slug'"""
+    *relations, attname = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    field = next(f for f in model._meta.concrete_fields if attname in (f.name, f.attname))
+    if isinstance(field, models.ForeignKey):
+        field = field.target_field
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()
+
+
+class _ChunkSink:
+    """Write target for ParquetWriter that hands back what was written so far"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(name, columns, queryset):
+    """Yield the export as Parquet bytes, one row group at a time"""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError('pyarrow is not installed')
+
+    model = EXPORTS[name]['model']
+    schema = pa.schema([(column, _arrow_type(model, column)) for column in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write_group(rows):
+        table = pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+            schema=schema,
+        )
+        writer.write_table(table)
+
+    rows = []
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        rows.append(row)
+        if len(rows) >= PARQUET_ROW_GROUP_SIZE:
+            write_group(rows)
+            rows = []
+            yield sink.take()
+    if rows:
+        write_group(rows)
+    writer.close()
+    yield sink.take()
+
+
+async def iterate_async(iterator):
+    """
+    Drive a sync export generator from an async response.
+    Under ASGI, Django buffers sync streaming content in full; pulling one
+    chunk at a time in the database thread keeps the stream incremental.
+    """
+    iterator = iter(iterator)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(iterator, None)
+        if chunk is None:
+            break
+        yield chunk
@@ -0,0 +1,202 @@
+"""
+Course Funnel and Retention Analytics
+Per-lesson funnels, time-to-complete distributions and weekly cohort
+retention, computed with pandas from one extraction of a course's
+UserProgress rows. The extraction is cached per course and refreshed
+incrementally: only rows touched since the last watermark are re-read.
+"""
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from ..models import UserProgress
+
+
+PROGRESS_COLUMNS = [
+    'id', 'user_id', 'lesson_id', 'completed', 'video_watch_percentage',
+    'started_at', 'completed_at', 'last_accessed',
+]
+
+FRAME_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Weeks after a learner's first activity shown on the retention curves
+RETENTION_WEEKS = 12
+
+# (label, upper bound in days) for the course time-to-complete histogram
+COMPLETION_TIME_BUCKETS = [
+    ('< 1 day', 1),
+    ('1-3 days', 3),
+    ('3-7 days', 7),
+    ('1-2 weeks', 14),
+    ('2-4 weeks', 28),
+    ('4+ weeks', float('inf')),
+]
+
+
+def _frame(rows):
+    frame = pd.DataFrame.from_records(list(rows), columns=PROGRESS_COLUMNS)
+    frame['completed'] = frame['completed'].astype(bool)
+    frame['video_watch_percentage'] = frame['video_watch_percentage'].astype(float)
+    for column in ('started_at', 'completed_at', 'last_accessed'):
+        frame[column] = pd.to_datetime(frame[column], utc=True)
+    return frame
+
+
+def _progress_rows(course):
+    return UserProgress.objects.filter(lesson__course=course).values_list(*PROGRESS_COLUMNS)
+
+
+def get_progress_frame(course):
+    """
+    UserProgress rows for ``course`` as a DataFrame, refreshed incrementally.
+
+    The cached frame is merged with rows whose last_accessed is at or after
+    its watermark. If the merged frame's row count or id sum then differs
+    from the table's, rows were deleted (or replaced) and the frame is
+    reloaded in full.
+    """
+    cache_key = f'progress-frame:{course.pk}'
+    cached = cache.get(cache_key)
+    progress = UserProgress.objects.filter(lesson__course=course)
+
+    if cached is None:
+        frame = _frame(_progress_rows(course))
+    else:
+        frame, watermark = cached
+        if watermark is None:
+            changed = _frame(_progress_rows(course))
+        else:
+            changed = _frame(_progress_rows(course).filter(last_accessed__gte=watermark))
+        if len(changed):
+            frame = pd.concat([frame[~frame['id'].isin(changed['id'])], changed], ignore_index=True)
+        fingerprint = progress.aggregate(rows=Count('id'), id_sum=Sum('id'))
+        if (len(frame), int(frame['id'].sum())) != (fingerprint['rows'], fingerprint['id_sum'] or 0):
+            frame = _frame(_progress_rows(course))
+
+    watermark = frame['last_accessed'].max() if len(frame) else None
+    cache.set(cache_key, (frame, None if pd.isna(watermark) else watermark.to_pydatetime()), FRAME_CACHE_TIMEOUT)
+    return frame
+
+
+def lesson_funnel(frame, lessons):
+    """
+    Share of learners who reached and completed each lesson, in course order.
+
+    A learner is anyone with progress in the course; a lesson is reached once
+    any of it has been watched. ``completed_through`` is the strict funnel:
+    learners who completed this lesson and every lesson before it.
+    """
+    lesson_ids = [lesson.id for lesson in lessons]
+    learners = frame['user_id'].nunique()
+    if not learners or not lesson_ids:
+        return [
+            {'lesson': lesson, 'reached_rate': 0, 'completed_rate': 0, 'completed_through_rate': 0}
+            for lesson in lessons
+        ]
+
+    reached = frame[(frame['video_watch_percentage'] > 0) | frame['completed']]
+    reached_counts = reached.groupby('lesson_id')['user_id'].nunique().reindex(lesson_ids, fill_value=0)
+    completed = frame[frame['completed']]
+    completed_counts = completed.groupby('lesson_id')['user_id'].nunique().reindex(lesson_ids, fill_value=0)
+
+    # users x lessons completion grid, then a running AND along the course order
+    grid = (
+        completed.assign(done=1)
+        .pivot_table(index='user_id', columns='lesson_id', values='done', aggfunc='max', fill_value=0)
+        .reindex(columns=lesson_ids, fill_value=0)
+    )
+    through_counts = grid.cumprod(axis=1).sum(axis=0)
+
+    return [
+        {
+            'lesson': lesson,
+            'reached_rate': round(reached_counts[lesson.id] * 100 / learners, 1),
+            'completed_rate': round(completed_counts[lesson.id] * 100 / learners, 1),
+            'completed_through_rate': round(through_counts[lesson.id] * 100 / learners, 1),
+        }
+        for lesson in lessons
+    ]
+
+
+def lesson_completion_times(frame, lessons):
+    """Median and 90th percentile hours from starting to completing each lesson"""
+    finished = frame.dropna(subset=['started_at', 'completed_at'])
+    hours = (finished['completed_at'] - finished['started_at']).dt.total_seconds() / 3600
+    stats = hours.clip(lower=0).groupby(finished['lesson_id']).quantile([0.5, 0.9]).unstack()
+
+    results = []
+    for lesson in lessons:
+        if lesson.id in stats.index:
+            median, p90 = stats.loc[lesson.id, 0.5], stats.loc[lesson.id, 0.9]
+            results.append({'lesson': lesson, 'median_hours': round(median, 1), 'p90_hours': round(p90, 1)})
+        else:
+            results.append({'lesson': lesson, 'median_hours': None, 'p90_hours': None})
+    return results
+
+
+def course_completion_times(frame, lessons):
+    """
+    Distribution of days from first start to last completion, for learners
+    who completed every lesson. Returns (buckets, median_days).
+    """
+    lesson_ids = [lesson.id for lesson in lessons]
+    done = frame[frame['completed'] & frame['lesson_id'].isin(lesson_ids)]
+    per_user = done.groupby('user_id').agg(
+        lessons_done=('lesson_id', 'nunique'),
+        first_start=('started_at', 'min'),
+        last_completion=('completed_at', 'max'),
+    )
+    finishers = per_user[per_user['lessons_done'] == len(lesson_ids)].dropna()
+    days = ((finishers['last_completion'] - finishers['first_start']).dt.total_seconds() / 86400).clip(lower=0)
+
+    edges = [0] + [upper for _, upper in COMPLETION_TIME_BUCKETS]
+    counts = pd.cut(days, bins=edges, right=False).value_counts(sort=False)
+    buckets = [
+        {'label': label, 'count': int(count), 'share': round(count * 100 / len(days), 1) if len(days) else 0}
+        for (label, _), count in zip(COMPLETION_TIME_BUCKETS, counts)
+    ]
+    median = round(float(days.median()), 1) if len(days) else None
+    return buckets, median
+
+
+def weekly_retention(frame, weeks=RETENTION_WEEKS):
+    """
+    Weekly cohort retention curves.
+    Learners are grouped by the week of their first activity; for each later
+    week, the share of the cohort with any activity (start, completion or
+    last access) that week.
+
+    Returns:
+        List of {'cohort': week start date, 'size': n, 'retention': [pct per week]};
+        weeks that have not happened yet are None
+    """
+    events = pd.concat([
+        frame[['user_id', column]].rename(columns={column: 'at'})
+        for column in ('started_at', 'completed_at', 'last_accessed')
+    ]).dropna()
+    if events.empty:
+        return []
+
+    # Monday 00:00 UTC of each event's week
+    events['week'] = events['at'].dt.normalize() - pd.to_timedelta(events['at'].dt.weekday, unit='D')
+    cohort_week = events.groupby('user_id')['week'].min().rename('cohort')
+    events = events.join(cohort_week, on='user_id')
+    events['offset'] = (events['week'] - events['cohort']).dt.days // 7
+    events = events[events['offset'] < weeks]
+
+    active = events.groupby(['cohort', 'offset'])['user_id'].nunique().unstack(fill_value=0)
+    active = active.reindex(columns=range(weeks), fill_value=0)
+    sizes = cohort_week.value_counts()
+    now = pd.Timestamp.now(tz='UTC')
+
+    return [
+        {
+            'cohort': cohort.date(),
+            'size': int(sizes[cohort]),
+            'retention': [
+                round(n * 100 / sizes[cohort], 1) if cohort + pd.Timedelta(weeks=offset) <= now else None
+                for offset, n in row.items()
+            ],
+        }
+        for cohort, row in active.sort_index().iterrows()
+    ]
@@ -0,0 +1,161 @@
+"""
+Quiz Item Analysis
+Classical test statistics for a lesson quiz from the packed responses stored
+on LessonQuizAttempt: per-question difficulty, discrimination and distractor
+selection rates, and Cronbach's alpha for the quiz.
+
+Only running sums are kept (attempts, correct answers per question, total
+scores and their squares, question x total products and option counts), so
+the cached statistics absorb new attempts without re-reading old ones.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+
+from ..models import LessonQuizAttempt
+from .quiz_grading import BLANK, get_answer_key
+
+
+# Columns of the option-count matrix; BLANK counts unanswered questions
+OPTIONS = 'ABCD' + BLANK
+
+ITEM_STATS_CACHE_TIMEOUT = 24 * 60 * 60
+
+RESPONSE_CHUNK_SIZE = 20000
+
+# Questions outside these bounds are flagged for review
+MIN_DIFFICULTY = 0.2
+MAX_DIFFICULTY = 0.95
+MIN_DISCRIMINATION = 0.2
+
+
+def response_matrix(responses, question_count):
+    """Packed response strings as an (attempts x questions) uint8 array of option letters"""
+    if not responses:
+        return np.zeros((0, question_count), dtype=np.uint8)
+    matrix = np.frombuffer(''.join(responses).encode('ascii'), dtype=np.uint8)
+    return matrix.reshape(len(responses), question_count)
+
+
+class ItemStatistics:
+    """
+    Sufficient statistics for item analysis of one answer key.
+    ``add`` folds in a response matrix; ``summary`` derives the figures.
+    """
+
+    def __init__(self, correct_options):
+        k = len(correct_options)
+        self.correct_options = correct_options
+        self.attempts = 0
+        self.last_attempt_id = 0
+        self.item_correct = np.zeros(k, dtype=np.int64)
+        self.item_total = np.zeros(k, dtype=np.int64)
+        self.total_sum = 0
+        self.total_squares = 0
+        self.option_counts = np.zeros((k, len(OPTIONS)), dtype=np.int64)
+
+    def add(self, matrix):
+        if not len(matrix):
+            return
+        expected = np.frombuffer(self.correct_options.encode('ascii'), dtype=np.uint8)
+        correct = (matrix == expected).astype(np.int64)
+        totals = correct.sum(axis=1)
+
+        self.attempts += len(matrix)
+        self.item_correct += correct.sum(axis=0)
+        self.item_total += correct.T @ totals
+        self.total_sum += int(totals.sum())
+        self.total_squares += int((totals * totals).sum())
+        codes = np.frombuffer(OPTIONS.encode('ascii'), dtype=np.uint8)
+        self.option_counts += (matrix[:, :, None] == codes).sum(axis=0)
+
+    def summary(self):
+        """
+        Returns:
+            Dict with 'attempts', 'alpha' and per-question 'items' lists of
+            difficulty (share correct), discrimination (point-biserial
+            correlation with the score on the other questions) and option
+            selection rates. Undefined figures are None.
+        """
+        k, n = len(self.correct_options), self.attempts
+        if not n or not k:
+            return {'attempts': n, 'alpha': None, 'items': []}
+
+        difficulty = self.item_correct / n
+        item_var = difficulty * (1 - difficulty)
+        mean_total = self.total_sum / n
+        total_var = self.total_squares / n - mean_total ** 2
+        item_total_cov = self.item_total / n - difficulty * mean_total
+
+        # Correlate each question with the rest score so it is not correlated with itself
+        rest_cov = item_total_cov - item_var
+        rest_var = total_var + item_var - 2 * item_total_cov
+        denominator = np.sqrt(item_var * rest_var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discrimination = np.where(denominator > 1e-12, rest_cov / denominator, np.nan)
+
+        alpha = None
+        if k > 1 and total_var > 1e-12:
+            alpha = round(float(k / (k - 1) * (1 - item_var.sum() / total_var)), 3)
+
+        rates = self.option_counts / n
+        items = []
+        for i in range(k):
+            correct_option = self.correct_options[i]
+            option_rates = {
+                ('blank' if option == BLANK else option): round(float(rates[i, j]), 3)
+                for j, option in enumerate(OPTIONS)
+            }
+            item = {
+                'correct_option': correct_option,
+                'difficulty': round(float(difficulty[i]), 3),
+                'discrimination': None if np.isnan(discrimination[i]) else round(float(discrimination[i]), 3),
+                'option_rates': option_rates,
+                'flags': [],
+            }
+            if item['difficulty'] < MIN_DIFFICULTY:
+                item['flags'].append('Very hard')
+            elif item['difficulty'] > MAX_DIFFICULTY:
+                item['flags'].append('Very easy')
+            if item['discrimination'] is not None and item['discrimination'] < MIN_DISCRIMINATION:
+                item['flags'].append('Low discrimination')
+            if any(rate > option_rates[correct_option] for option, rate in option_rates.items()
+                   if option not in (correct_option, 'blank')):
+                item['flags'].append('Distractor chosen more than the answer')
+            items.append(item)
+        return {'attempts': n, 'alpha': alpha, 'items': items}
+
+
+def _item_stats_cache_key(quiz_id, answer_key):
+    digest = hashlib.md5(f'{answer_key.version}:{answer_key.correct_options}'.encode()).hexdigest()
+    return f'quiz-item-stats:{quiz_id}:{digest}'
+
+
+def get_item_statistics(quiz):
+    """
+    Item statistics over every attempt recorded under the quiz's current
+    answer key version, cached and topped up with attempts newer than the
+    last one folded in. An attempt count mismatch (deletions) rebuilds.
+    """
+    answer_key = get_answer_key(quiz.id)
+    cache_key = _item_stats_cache_key(quiz.id, answer_key)
+    attempts = LessonQuizAttempt.objects.filter(quiz=quiz, answer_key_version=answer_key.version)
+
+    stats = cache.get(cache_key)
+    if stats is None or stats.attempts != attempts.filter(id__lte=stats.last_attempt_id).count():
+        stats = ItemStatistics(answer_key.correct_options)
+
+    if len(answer_key):
+        pending = attempts.filter(id__gt=stats.last_attempt_id).order_by('id').values_list('id', 'responses')
+        chunk = []
+        for attempt_id, responses in pending.iterator(chunk_size=RESPONSE_CHUNK_SIZE):
+            chunk.append(responses)
+            stats.last_attempt_id = attempt_id
+            if len(chunk) == RESPONSE_CHUNK_SIZE:
+                stats.add(response_matrix(chunk, len(answer_key)))
+                chunk = []
+        stats.add(response_matrix(chunk, len(answer_key)))
+
+    cache.set(cache_key, stats, ITEM_STATS_CACHE_TIMEOUT)
+    return stats
@@ -1,11 +1,21 @@
 """
 PDF Text Extraction Utility
 Extracts text from PDF files for processing into lesson content.
+
+Text is streamed one page at a time, so memory stays flat however long the
+manual is. PyMuPDF reads every page; pages that look like ruled tables are
+re-read with pdfplumber, which keeps table rows on one line.
 """
 import os
 import re
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
 
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
 
 try:
     import PyPDF2
@@ -15,76 +25,211 @@ except ImportError:
 
 try:
     import pdfplumber
+    from pdfminer.pdfpage import PDFPage
     PDFPLUMBER_AVAILABLE = True
 except ImportError:
     PDFPLUMBER_AVAILABLE = False
 
 
+# A page is table-heavy when its ruling lines sit at this many distinct
+# heights and this many distinct x positions (a 2x2 ruled table has 3 of each)
+TABLE_MIN_RULINGS = 3
+MIN_RULING_LENGTH = 12
+
+
+def format_page(page_num: int, text: str) -> str:
+    """Page text with the marker insert_images_contextually places images by"""
+    return f"--- Page {page_num} ---\n{text}\n"
+
+
+def extract_page_range(pdf_path: str, first_page: int, last_page: int) -> str:
+    """Marked text of pages first_page..last_page; a unit of work for process pools"""
+    return "\n".join(
+        format_page(page_num, text)
+        for page_num, text in PDFExtractor().iter_pages(pdf_path, first_page, last_page)
+        if text
+    )
+
+
+def is_table_heavy(page) -> bool:
+    """Whether a PyMuPDF page has ruled-table line work, from its vector drawings only"""
+    rows, columns = set(), set()
+    for drawing in page.get_cdrawings():
+        for item in drawing['items']:
+            if item[0] == 'l':
+                (x0, y0), (x1, y1) = item[1], item[2]
+            elif item[0] == 're':
+                x0, y0, x1, y1 = item[1]
+                if x1 - x0 > 2 and y1 - y0 > 2:
+                    # A bordered cell: its four edges are rulings
+                    if 's' in drawing['type']:
+                        rows.update((round(y0), round(y1)))
+                        columns.update((round(x0), round(x1)))
+                    continue
+            else:
+                continue
+            if abs(y1 - y0) <= 2 and abs(x1 - x0) >= MIN_RULING_LENGTH:
+                rows.add(round(y0))
+            elif abs(x1 - x0) <= 2 and abs(y1 - y0) >= MIN_RULING_LENGTH:
+                columns.add(round(x0))
+    return len(rows) >= TABLE_MIN_RULINGS and len(columns) >= TABLE_MIN_RULINGS
+
+
+def _pdfplumber_pages(pdf):
+    """
+    (page_num, page) for a pdfplumber PDF, built one at a time: pdf.pages
+    would build and keep every page of the document up front
+    """
+    for page_num, page in enumerate(PDFPage.create_pages(pdf.doc), 1):
+        yield page_num, pdfplumber.page.Page(pdf, page, page_number=page_num, initial_doctop=0)
+        # pdfminer caches every object it parses, decoded content streams included
+        pdf.doc._cached_objs.clear()
+
+
+def _pdfplumber_text(page):
+    try:
+        return page.extract_text()
+    finally:
+        # Drop the page's parsed characters, which pdfplumber otherwise keeps
+        page.close()
+
+
 class PDFExtractor:
     """Extract text from PDF files"""
     
-    def __init__(self, prefer_pdfplumber=True):
+    def __init__(self, prefer_pdfplumber=False, table_fallback=True):
         """
         Initialize PDF extractor
         
         Args:
-            prefer_pdfplumber: If True, use pdfplumber (better formatting), 
-                             else use PyPDF2 (simpler)
+            prefer_pdfplumber: If True, read every page with pdfplumber (slow);
+                             else PyMuPDF, falling back to pdfplumber or PyPDF2
+                             when PyMuPDF is not installed
+            table_fallback: Read table-heavy pages with pdfplumber when using PyMuPDF
         """
-        if not PYPDF2_AVAILABLE and not PDFPLUMBER_AVAILABLE:
+        if not (PYMUPDF_AVAILABLE or PDFPLUMBER_AVAILABLE or PYPDF2_AVAILABLE):
             raise ImportError(
-                "Neither PyPDF2 nor pdfplumber is installed. "
-                "Install one: pip install PyPDF2 pdfplumber"
+                "None of PyMuPDF, pdfplumber or PyPDF2 is installed. "
+                "Install one: pip install PyMuPDF"
             )
         
-        self.prefer_pdfplumber = prefer_pdfplumber and PDFPLUMBER_AVAILABLE
-        self.use_pdfplumber = self.prefer_pdfplumber and PDFPLUMBER_AVAILABLE
+        if PDFPLUMBER_AVAILABLE and (prefer_pdfplumber or not PYMUPDF_AVAILABLE):
+            self.backend = 'pdfplumber'
+        elif PYMUPDF_AVAILABLE:
+            self.backend = 'pymupdf'
+        else:
+            self.backend = 'pypdf2'
+        self.table_fallback = table_fallback and PDFPLUMBER_AVAILABLE
     
-    def extract_text(self, pdf_path: str) -> str:
+    def iter_pages(self, pdf_path: str, first_page: int = 1,
+                   last_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
         """
-        Extract all text from a PDF file
+        Stream the text of a PDF one page at a time
         
         Args:
             pdf_path: Path to PDF file
+            first_page: First page to read (1-based)
+            last_page: Last page to read (default: the last page)
             
-        Returns:
-            Extracted text as string
+        Yields:
+            (page_num, text) for every page in range; text is '' for pages without any
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
-        if self.use_pdfplumber:
-            return self._extract_with_pdfplumber(pdf_path)
+        if self.backend == 'pymupdf':
+            pages = self._iter_with_pymupdf(pdf_path, first_page, last_page)
+        elif self.backend == 'pdfplumber':
+            pages = self._iter_with_pdfplumber(pdf_path, first_page, last_page)
         else:
-            return self._extract_with_pypdf2(pdf_path)
+            pages = self._iter_with_pypdf2(pdf_path, first_page, last_page)
+        for page_num, text in pages:
+            yield page_num, (text or '').strip()
     
-    def _extract_with_pdfplumber(self, pdf_path: str) -> str:
+    def _iter_with_pymupdf(self, pdf_path, first_page, last_page):
+        """PyMuPDF for text pages, pdfplumber (opened on first use) for table-heavy ones"""
+        plumber = plumber_pages = None
+        try:
+            with fitz.open(pdf_path) as document:
+                last_page = min(last_page or document.page_count, document.page_count)
+                for page_num in range(first_page, last_page + 1):
+                    page = document.load_page(page_num - 1)
+                    if self.table_fallback and is_table_heavy(page):
+                        if plumber is None:
+                            plumber = pdfplumber.open(pdf_path)
+                            plumber_pages = _pdfplumber_pages(plumber)
+                        # Pages come in order, so the pdfplumber walk only moves forward
+                        for plumber_num, plumber_page in plumber_pages:
+                            if plumber_num == page_num:
+                                yield page_num, _pdfplumber_text(plumber_page)
+                                break
+                    else:
+                        yield page_num, page.get_text()
+        finally:
+            if plumber is not None:
+                plumber.close()
+    
+    def _iter_with_pdfplumber(self, pdf_path, first_page, last_page):
         """Extract text using pdfplumber (better formatting)"""
-        text_parts = []
-        
         with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                text = page.extract_text()
-                if text:
-                    text_parts.append(f"--- Page {page_num} ---\n{text}\n")
-        
-        return "\n".join(text_parts)
+            for page_num, page in _pdfplumber_pages(pdf):
+                if last_page and page_num > last_page:
+                    break
+                if page_num >= first_page:
+                    yield page_num, _pdfplumber_text(page)
     
-    def _extract_with_pypdf2(self, pdf_path: str) -> str:
+    def _iter_with_pypdf2(self, pdf_path, first_page, last_page):
         """Extract text using PyPDF2 (simpler, but less formatting)"""
-        text_parts = []
-        
         with open(pdf_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             num_pages = len(pdf_reader.pages)
+            last_page = min(last_page or num_pages, num_pages)
+            for page_num in range(first_page, last_page + 1):
+                yield page_num, pdf_reader.pages[page_num - 1].extract_text()
+    
+    def extract_text(self, pdf_path: str) -> str:
+        """
+        Extract all text from a PDF file
+        
+        Args:
+            pdf_path: Path to PDF file
+            
+        Returns:
+            Extracted text as string, each page preceded by its page marker
+        """
+        return "\n".join(
+            format_page(page_num, text) for page_num, text in self.iter_pages(pdf_path) if text
+        )
+    
+    def iter_chunks(self, pdf_path: str, pages_per_chunk: int = 10) -> Iterator[Dict[str, any]]:
+        """
+        Stream the text in chunks of consecutive pages; only the current chunk is held
+        
+        Args:
+            pdf_path: Path to PDF file
+            pages_per_chunk: Number of pages per chunk
             
-            for page_num in range(num_pages):
-                page = pdf_reader.pages[page_num]
-                text = page.extract_text()
-                if text:
-                    text_parts.append(f"--- Page {page_num + 1} ---\n{text}\n")
+        Yields:
+            Dicts with 'text', 'start_page', 'end_page'; chunks without text are skipped
+        """
+        parts = []
+        start_page = page_num = 1
+        found_text = False
+        for page_num, text in self.iter_pages(pdf_path):
+            if text:
+                parts.append(format_page(page_num, text))
+            if page_num - start_page + 1 == pages_per_chunk:
+                if parts:
+                    found_text = True
+                    yield {'text': "\n".join(parts).strip(), 'start_page': start_page, 'end_page': page_num}
+                parts = []
+                start_page = page_num + 1
         
-        return "\n".join(text_parts)
+        if parts:
+            yield {'text': "\n".join(parts).strip(), 'start_page': start_page, 'end_page': page_num}
+        elif not found_text:
+            # No text at all (e.g. a scanned PDF): one empty chunk for the whole document
+            yield {'text': '', 'start_page': 1, 'end_page': page_num}
     
     def extract_by_pages(self, pdf_path: str, pages_per_chunk: int = 10) -> List[Dict[str, any]]:
         """
@@ -97,44 +242,7 @@ class PDFExtractor:
         Returns:
             List of dicts with 'text', 'start_page', 'end_page'
         """
-        full_text = self.extract_text(pdf_path)
-        
-        # Split by page markers
-        page_markers = re.finditer(r'--- Page (\d+) ---', full_text)
-        pages = []
-        current_page_start = 0
-        
-        for match in page_markers:
-            if pages:
-                pages[-1]['end'] = match.start()
-            pages.append({
-                'start': match.start(),
-                'end': len(full_text),
-                'page_num': int(match.group(1))
-            })
-        
-        if not pages:
-            # No page markers found, return entire text as one chunk
-            return [{
-                'text': full_text,
-                'start_page': 1,
-                'end_page': 1
-            }]
-        
-        # Group pages into chunks
-        chunks = []
-        for i in range(0, len(pages), pages_per_chunk):
-            chunk_pages = pages[i:i + pages_per_chunk]
-            start_idx = chunk_pages[0]['start']
-            end_idx = chunk_pages[-1]['end']
-            
-            chunks.append({
-                'text': full_text[start_idx:end_idx].strip(),
-                'start_page': chunk_pages[0]['page_num'],
-                'end_page': chunk_pages[-1]['page_num']
-            })
-        
-        return chunks
+        return list(self.iter_chunks(pdf_path, pages_per_chunk))
     
     def extract_by_headings(self, pdf_path: str, heading_pattern: str = r'^[A-Z][A-Z\s]{10,}$') -> List[Dict[str, any]]:
         """
@@ -179,11 +287,13 @@ class PDFExtractor:
     
     def get_page_count(self, pdf_path: str) -> int:
         """Get total number of pages in PDF"""
-        if self.use_pdfplumber:
+        if self.backend == 'pymupdf':
+            with fitz.open(pdf_path) as document:
+                return document.page_count
+        elif self.backend == 'pdfplumber':
             with pdfplumber.open(pdf_path) as pdf:
                 return len(pdf.pages)
         else:
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 return len(pdf_reader.pages)
-
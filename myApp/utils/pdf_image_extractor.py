@@ -2,6 +2,7 @@
 PDF Image Extraction and Cloudinary Upload Utility
 Extracts images from PDF files, converts them to WebP format, and uploads to Cloudinary.
 """
+import hashlib
 import os
 import tempfile
 from typing import List, Dict, Optional
@@ -27,6 +28,13 @@ except ImportError:
     CLOUDINARY_AVAILABLE = False
 
 
+def place_image(uploaded: Dict[str, any], placement: Dict[str, any]) -> Dict[str, any]:
+    """An uploaded image at one of its placements: its URL and metadata with that page and position"""
+    image = {key: value for key, value in uploaded.items() if key != 'placements'}
+    image.update(placement)
+    return image
+
+
 class PDFImageExtractor:
     """Extract images from PDF files and upload to Cloudinary"""
     
@@ -75,71 +83,91 @@ class PDFImageExtractor:
     
     def extract_images(self, pdf_path: str, min_size: int = 1000) -> List[Dict[str, any]]:
         """
-        Extract images from PDF file
+        Extract the distinct images of a PDF file
+        
+        Sizes come from the PDF's image metadata, so small images are skipped
+        without being read. An image used on several pages (a logo, a header)
+        is extracted once, whether the pages share it or embed identical copies.
         
         Args:
             pdf_path: Path to PDF file
             min_size: Minimum image size in pixels (width or height) to include
             
         Returns:
-            List of dicts with 'image_data', 'page_num', 'x0', 'y0', 'x1', 'y1', 'width', 'height'
+            List of dicts with 'image_data', 'image_format', 'width', 'height' and
+            'placements' (dicts with 'page_num', 'x0', 'y0', 'x1', 'y1'), plus the
+            first placement's keys at the top level
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
         images = []
+        by_xref = {}      # xref -> image dict, or None when too small or unreadable
+        by_content = {}   # hash of the raw image stream -> image dict
         
         try:
             pdf_document = fitz.open(pdf_path)
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-                image_list = page.get_images(full=True)
+            for page_num, page in enumerate(pdf_document, 1):
+                placements = None
+                placed = set()
                 
-                for img_index, img in enumerate(image_list):
-                    try:
-                        # Get image data
-                        xref = img[0]
-                        base_image = pdf_document.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        image_ext = base_image["ext"]
-                        
-                        # Get image position on page
-                        image_rects = page.get_image_rects(xref)
-                        if image_rects:
-                            rect = image_rects[0]
-                        else:
-                            # Fallback: use page dimensions
-                            rect = page.rect
-                        
-                        # Convert to PIL Image to get dimensions
-                        image = Image.open(BytesIO(image_bytes))
-                        width, height = image.size
-                        
+                for img in page.get_images(full=True):
+                    xref, width, height = img[0], img[2], img[3]
+                    if xref in placed:
+                        continue
+                    placed.add(xref)
+                    
+                    if xref not in by_xref:
+                        by_xref[xref] = None
                         # Filter by minimum size
-                        if width >= min_size or height >= min_size:
-                            images.append({
-                                'image_data': image_bytes,
-                                'image_format': image_ext,
-                                'page_num': page_num + 1,
-                                'x0': rect.x0,
-                                'y0': rect.y0,
-                                'x1': rect.x1,
-                                'y1': rect.y1,
-                                'width': width,
-                                'height': height,
-                                'image': image,  # PIL Image object
-                            })
-                    except Exception as e:
-                        # Skip images that can't be processed
-                        print(f"Warning: Could not process image {img_index} on page {page_num + 1}: {str(e)}")
+                        if width < min_size and height < min_size:
+                            continue
+                        try:
+                            digest = hashlib.sha256(pdf_document.xref_stream_raw(xref)).hexdigest()
+                            image = by_content.get(digest)
+                            if image is None:
+                                base_image = pdf_document.extract_image(xref)
+                                image = {
+                                    'image_data': base_image["image"],
+                                    'image_format': base_image["ext"],
+                                    'width': width,
+                                    'height': height,
+                                    'placements': [],
+                                }
+                                by_content[digest] = image
+                                images.append(image)
+                            by_xref[xref] = image
+                        except Exception as e:
+                            # Skip images that can't be processed
+                            print(f"Warning: Could not process image {xref} on page {page_num}: {str(e)}")
+                            continue
+                    
+                    image = by_xref[xref]
+                    if image is None:
                         continue
+                    if placements is None:
+                        # Every image position on the page, from one pass over its content
+                        placements = {}
+                        for info in page.get_image_info(xrefs=True):
+                            placements.setdefault(info['xref'], []).append(fitz.Rect(info['bbox']))
+                    # Fallback: use page dimensions
+                    for rect in placements.get(xref) or [page.rect]:
+                        image['placements'].append({
+                            'page_num': page_num,
+                            'x0': rect.x0,
+                            'y0': rect.y0,
+                            'x1': rect.x1,
+                            'y1': rect.y1,
+                        })
             
             pdf_document.close()
             
         except Exception as e:
             raise Exception(f"Error extracting images from PDF: {str(e)}")
         
+        for image in images:
+            image.update(image['placements'][0])
         return images
     
     def convert_to_webp(self, image: Image.Image, quality: int = 85) -> bytes:
@@ -219,6 +247,49 @@ class PDFImageExtractor:
         except Exception as e:
             raise Exception(f"Error uploading image to Cloudinary: {str(e)}")
     
+    def prepare_images(self, pdf_path: str, min_size: int = 1000, quality: int = 85) -> List[Dict[str, any]]:
+        """
+        Extract the distinct images of a PDF and convert each to WebP once,
+        ready to upload. CPU-bound and picklable, so it can run in a worker process.
+        
+        Returns:
+            List of dicts with 'webp' and 'placements', plus the first placement's keys
+        """
+        prepared = []
+        for img_data in self.extract_images(pdf_path, min_size=min_size):
+            try:
+                webp_bytes = self.convert_to_webp(Image.open(BytesIO(img_data['image_data'])), quality=quality)
+            except Exception as e:
+                print(f"Warning: Could not convert image from page {img_data['page_num']}: {str(e)}")
+                continue
+            prepared.append({
+                'webp': webp_bytes,
+                'placements': img_data['placements'],
+                **img_data['placements'][0],
+            })
+        return prepared
+    
+    def upload_prepared(
+        self,
+        image: Dict[str, any],
+        folder: str = 'pdf-lessons',
+        public_id_prefix: Optional[str] = None
+    ) -> Dict[str, any]:
+        """Upload one image from prepare_images; returns its Cloudinary URL, metadata and placements"""
+        upload_result = self.upload_to_cloudinary(
+            image['webp'],
+            folder=folder,
+            public_id_prefix=public_id_prefix
+        )
+        return {
+            'url': upload_result['secure_url'],
+            'public_id': upload_result['public_id'],
+            'width': upload_result['width'],
+            'height': upload_result['height'],
+            'placements': image['placements'],
+            **image['placements'][0],
+        }
+    
     def extract_and_upload_images(
         self, 
         pdf_path: str, 
@@ -238,39 +309,17 @@ class PDFImageExtractor:
             quality: WebP quality (1-100)
             
         Returns:
-            List of dicts with Cloudinary URLs and metadata
+            List of dicts with Cloudinary URLs and metadata, one per image placement
         """
-        extracted_images = self.extract_images(pdf_path, min_size=min_size)
         uploaded_images = []
         
-        for img_data in extracted_images:
+        for image in self.prepare_images(pdf_path, min_size=min_size, quality=quality):
             try:
-                # Convert to WebP
-                webp_bytes = self.convert_to_webp(img_data['image'], quality=quality)
-                
-                # Upload to Cloudinary
-                upload_result = self.upload_to_cloudinary(
-                    webp_bytes,
-                    folder=folder,
-                    public_id_prefix=public_id_prefix
-                )
-                
-                # Combine metadata
-                uploaded_images.append({
-                    'url': upload_result['secure_url'],
-                    'public_id': upload_result['public_id'],
-                    'page_num': img_data['page_num'],
-                    'width': upload_result['width'],
-                    'height': upload_result['height'],
-                    'x0': img_data['x0'],
-                    'y0': img_data['y0'],
-                    'x1': img_data['x1'],
-                    'y1': img_data['y1'],
-                })
-                
+                uploaded = self.upload_prepared(image, folder=folder, public_id_prefix=public_id_prefix)
             except Exception as e:
-                print(f"Warning: Could not upload image from page {img_data['page_num']}: {str(e)}")
+                print(f"Warning: Could not upload image from page {image['page_num']}: {str(e)}")
                 continue
+            # Uploaded once, listed at every position it appears
+            uploaded_images.extend(place_image(uploaded, placement) for placement in uploaded['placements'])
         
         return uploaded_images
-
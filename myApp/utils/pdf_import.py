@@ -0,0 +1,696 @@
+"""
+PDF Lesson Import
+Turns uploaded PDFs into lessons in the background, so upload_pdf_lessons
+returns as soon as the uploads are saved. Text (in page ranges) and images
+are extracted in a process pool; image uploads and AI lesson generation,
+which mostly wait on the network, run in a thread pool. Each file's
+progress is saved on its PDFImportFile row for the creator UI to poll.
+
+A job left unfinished by a restart is picked up again by
+``python manage.py run_pdf_imports``; files already imported are skipped.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from ..models import Lesson, PDFImportFile, PDFImportJob
+from .pdf_extractor import PDFExtractor, extract_page_range
+from .pdf_image_extractor import PDFImageExtractor, place_image
+
+
+logger = logging.getLogger(__name__)
+
+# Pages of text extracted per process-pool task
+EXTRACT_RANGE_PAGES = 25
+
+# Images smaller than this (px, both sides) are skipped
+IMAGE_MIN_SIZE = 500
+IMAGE_QUALITY = 85
+IMAGE_FOLDER = 'pdf-lessons'
+
+# Import jobs shown by the status endpoint
+STATUS_JOBS = 5
+
+# A running job refreshes heartbeat_at this often (seconds); run_pdf_imports
+# only resumes running jobs whose heartbeat is older than HEARTBEAT_STALE
+HEARTBEAT_INTERVAL = 30
+HEARTBEAT_STALE = 5 * 60
+
+
+def start_pdf_import(course, module, uploaded_files, user=None, use_ai=True, split_by_pages=None):
+    """
+    Save the uploads to a temporary directory and queue an import job,
+    started in a background thread once the transaction commits.
+    """
+    directory = tempfile.mkdtemp(prefix='pdf-import-')
+    with transaction.atomic():
+        job = PDFImportJob.objects.create(
+            course=course, module=module, created_by=user, use_ai=use_ai, split_by_pages=split_by_pages or None,
+        )
+        files = []
+        for position, uploaded in enumerate(uploaded_files):
+            path = os.path.join(directory, f'{position}.pdf')
+            with open(path, 'wb') as temp_file:
+                for chunk in uploaded.chunks():
+                    temp_file.write(chunk)
+            files.append(PDFImportFile(job=job, position=position, name=uploaded.name, path=path))
+        PDFImportFile.objects.bulk_create(files)
+        transaction.on_commit(lambda: launch_pdf_import(job.id))
+    return job
+
+
+def launch_pdf_import(job_id):
+    """Run an import job in a daemon thread, like video transcription"""
+    thread = threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_in_thread(job_id):
+    try:
+        run_pdf_import(job_id)
+    finally:
+        connection.close()
+
+
+def interrupted_pdf_imports(stale_after=HEARTBEAT_STALE):
+    """
+    Jobs no process is working on: running ones whose heartbeat stopped, and
+    queued ones never started within ``stale_after`` seconds
+    """
+    cutoff = timezone.now() - timezone.timedelta(seconds=stale_after)
+    return PDFImportJob.objects.filter(
+        Q(status='queued', created_at__lt=cutoff)
+        | Q(status='running', heartbeat_at__lt=cutoff)
+        | Q(status='running', heartbeat_at__isnull=True)
+    )
+
+
+def lesson_ranges(pages, split_by_pages=None):
+    """(first, last) page of each lesson: every split_by_pages pages, or the whole PDF"""
+    if not split_by_pages:
+        return [(1, max(pages, 1))]
+    return [(first, min(first + split_by_pages - 1, pages)) for first in range(1, pages + 1, split_by_pages)] or [(1, 1)]
+
+
+def extract_ranges(first, last):
+    """A lesson's pages cut into process-pool tasks of EXTRACT_RANGE_PAGES"""
+    return [(start, min(start + EXTRACT_RANGE_PAGES - 1, last)) for start in range(first, last + 1, EXTRACT_RANGE_PAGES)]
+
+
+def run_pdf_import(job_id, workers=None, io_workers=None):
+    """
+    Import every file of a job that is not imported yet. ``workers`` extract
+    in processes and ``io_workers`` upload and generate in threads (defaults:
+    settings.PDF_IMPORT_WORKERS and PDF_IMPORT_IO_WORKERS); 0 runs that
+    stage in the calling thread.
+    """
+    workers = settings.PDF_IMPORT_WORKERS if workers is None else workers
+    io_workers = settings.PDF_IMPORT_IO_WORKERS if io_workers is None else io_workers
+    job = PDFImportJob.objects.select_related('course', 'module').get(pk=job_id)
+    now = timezone.now()
+    PDFImportJob.objects.filter(pk=job.pk).update(status='running', error='', started_at=now, heartbeat_at=now)
+    files = list(job.files.exclude(status='completed').order_by('position'))
+    heartbeat = _Heartbeat(job.pk)
+    heartbeat.start()
+
+    # Spawned, not forked: this runs beside the web server's threads
+    cpu = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) if workers else _InlineExecutor()
+    io = _ThreadPool(max_workers=io_workers) if io_workers else _InlineExecutor()
+    try:
+        plans = _plan(job, files)
+        ai_generator = _ai_generator() if job.use_ai else None
+        image_extractor = _image_extractor()
+        if io_workers:
+            # One thread per file waits on its own tasks, so files progress side by side
+            with _ThreadPool(max_workers=len(plans) or 1) as files_pool:
+                for import_file, ranges, first_order in plans:
+                    files_pool.submit(_import_file, job, import_file, ranges, first_order, cpu, io, ai_generator, image_extractor)
+        else:
+            for import_file, ranges, first_order in plans:
+                _import_file(job, import_file, ranges, first_order, cpu, io, ai_generator, image_extractor)
+    except Exception as e:
+        logger.exception('PDF import %s failed', job.pk)
+        PDFImportJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+    finally:
+        io.shutdown()
+        cpu.shutdown()
+        heartbeat.stop()
+
+    all_failed = not job.files.exclude(status='failed').exists()
+    PDFImportJob.objects.filter(pk=job.pk).update(
+        status='failed' if all_failed else 'completed', finished_at=timezone.now(),
+    )
+    for directory in {os.path.dirname(import_file.path) for import_file in files}:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes a running job's heartbeat_at every HEARTBEAT_INTERVAL seconds"""
+
+    def __init__(self, job_id):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(HEARTBEAT_INTERVAL):
+                PDFImportJob.objects.filter(pk=self.job_id, status='running').update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _plan(job, files):
+    """(file, lesson page ranges, order of its first lesson); lesson orders are reserved up front"""
+    next_order = (Lesson.objects.filter(course=job.course, module=job.module).aggregate(
+        max_order=Max('order')
+    )['max_order'] or 0) + 1
+    extractor = PDFExtractor()
+    plans = []
+    for import_file in files:
+        try:
+            pages = extractor.get_page_count(import_file.path)
+        except Exception as e:
+            _fail(import_file, f'Could not open PDF: {e}')
+            continue
+        ranges = lesson_ranges(pages, job.split_by_pages)
+        PDFImportFile.objects.filter(pk=import_file.pk).update(
+            status='extracting', pages=pages, lessons_total=len(ranges), lessons_done=0, error='',
+        )
+        plans.append((import_file, ranges, next_order))
+        next_order += len(ranges)
+    return plans
+
+
+def _import_file(job, import_file, ranges, first_order, cpu, io, ai_generator, image_extractor):
+    try:
+        texts = [
+            [cpu.submit(extract_page_range, import_file.path, first, last) for first, last in extract_ranges(*lesson)]
+            for lesson in ranges
+        ]
+        image_count, uploads = _upload_images(import_file, cpu, io, image_extractor)
+        PDFImportFile.objects.filter(pk=import_file.pk).update(status='generating', images=image_count)
+
+        title = os.path.splitext(import_file.name)[0]
+        lessons = []
+        for part, ((first, last), parts) in enumerate(zip(ranges, texts)):
+            pdf_text = "\n".join(text for text in (future.result() for future in parts) if text).strip()
+            if not pdf_text and len(ranges) > 1:
+                _lesson_done(import_file)
+                continue
+            images = list(_uploaded(uploads, first, last))
+            lessons.append(io.submit(
+                _save_lesson, job, import_file, pdf_text,
+                f'{title} - Part {part + 1}' if job.split_by_pages else title,
+                ai_generator, images, first_order + part,
+            ))
+        for lesson in lessons:
+            lesson.result()
+    except Exception as e:
+        logger.exception('Importing %s failed', import_file.name)
+        _fail(import_file, str(e))
+        return
+    PDFImportFile.objects.filter(pk=import_file.pk).update(status='completed')
+    try:
+        os.remove(import_file.path)
+    except OSError:
+        pass
+
+
+def _upload_images(import_file, cpu, io, image_extractor):
+    """
+    Upload each distinct image of the file once, as soon as it is converted
+
+    Returns:
+        (number of distinct images, [(placement, upload future)] for every placement)
+    """
+    if not image_extractor:
+        return 0, []
+    try:
+        prepared = cpu.submit(image_extractor.prepare_images, import_file.path, IMAGE_MIN_SIZE, IMAGE_QUALITY).result()
+    except Exception as e:
+        logger.warning('Could not extract images from %s: %s', import_file.name, e)
+        return 0, []
+    prefix = slugify(os.path.splitext(import_file.name)[0])
+    uploads = []
+    for image in prepared:
+        upload = io.submit(image_extractor.upload_prepared, image, IMAGE_FOLDER, prefix)
+        uploads.extend((placement, upload) for placement in image['placements'])
+    return len(prepared), uploads
+
+
+def _uploaded(uploads, first, last):
+    """Uploaded images placed on pages first..last; failed uploads are left out"""
+    for placement, upload in uploads:
+        if first <= placement['page_num'] <= last:
+            try:
+                yield place_image(upload.result(), placement)
+            except Exception as e:
+                logger.warning('Could not upload image from page %s: %s', placement['page_num'], e)
+
+
+def _save_lesson(job, import_file, pdf_text, title, ai_generator, images, order):
+    created, updated = process_pdf_chunk(
+        job.course, job.module, pdf_text, title, ai_generator, ai_generator is None,
+        job.course.name, job.module.name, images=images, order=order,
+    )
+    _lesson_done(import_file, created, updated)
+
+
+def _lesson_done(import_file, created=0, updated=0):
+    PDFImportFile.objects.filter(pk=import_file.pk).update(
+        lessons_done=F('lessons_done') + 1,
+        lessons_created=F('lessons_created') + created,
+        lessons_updated=F('lessons_updated') + updated,
+    )
+
+
+def _fail(import_file, error):
+    PDFImportFile.objects.filter(pk=import_file.pk).update(status='failed', error=error)
+
+
+def _ai_generator():
+    try:
+        from .ai_content_generator import AIContentGenerator
+        return AIContentGenerator()
+    except Exception as e:
+        logger.warning('AI generation not available, importing basic lessons: %s', e)
+        return None
+
+
+def _image_extractor():
+    try:
+        return PDFImageExtractor()
+    except Exception as e:
+        logger.warning('Image extraction not available, importing without images: %s', e)
+        return None
+
+
+def import_status(course):
+    """The course's latest import jobs with per-file progress, for the creator UI to poll"""
+    jobs = (
+        PDFImportJob.objects.filter(course=course)
+        .select_related('module')
+        .prefetch_related('files')
+        .order_by('-created_at', '-id')[:STATUS_JOBS]
+    )
+    return [
+        {
+            'id': job.id,
+            'module': job.module.name,
+            'status': job.status,
+            'finished': job.is_finished,
+            'error': job.error,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'files': [
+                {
+                    'name': import_file.name,
+                    'status': import_file.status,
+                    'status_display': import_file.get_status_display(),
+                    'percent': import_file.percent,
+                    'pages': import_file.pages,
+                    'images': import_file.images,
+                    'lessons_done': import_file.lessons_done,
+                    'lessons_total': import_file.lessons_total,
+                    'lessons_created': import_file.lessons_created,
+                    'lessons_updated': import_file.lessons_updated,
+                    'error': import_file.error,
+                }
+                for import_file in job.files.all()
+            ],
+        }
+        for job in jobs
+    ]
+
+
+class _ThreadPool(ThreadPoolExecutor):
+    """Thread pool whose tasks close the database connection they opened"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(_closing_connection, fn, *args, **kwargs)
+
+
+def _closing_connection(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        connection.close()
+
+
+class _InlineExecutor:
+    """Runs each task as it is submitted (0 workers)"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def insert_images_contextually(content_blocks, images, pdf_text):
+    """
+    Insert images into content blocks at logical positions based on page numbers.
+    Images are inserted after headers or distributed evenly throughout content.
+    """
+    if not images or not content_blocks:
+        return content_blocks
+    
+    # Extract page numbers from PDF text to estimate content distribution
+    page_markers = re.findall(r'--- Page (\d+) ---', pdf_text)
+    total_pages = int(page_markers[-1]) if page_markers else 1
+    
+    # Calculate approximate position for each image based on page number
+    # Position is a ratio (0.0 to 1.0) indicating where in the content the image should appear
+    image_positions = []
+    for img in images:
+        page_num = img.get('page_num', 1)
+        position_ratio = (page_num - 1) / max(total_pages, 1)
+        image_positions.append({
+            'image': img,
+            'position_ratio': position_ratio,
+            'page_num': page_num
+        })
+    
+    # Sort by position ratio
+    image_positions.sort(key=lambda x: x['position_ratio'])
+    
+    # Special handling: If we only have one paragraph block, split it and insert images
+    if len(content_blocks) == 1 and content_blocks[0].get('type') == 'paragraph':
+        # Split long paragraphs at logical points and insert images
+        text = content_blocks[0]['data'].get('text', '')
+        if len(text) > 500 and len(images) > 0:
+            # Split text into chunks and insert images between chunks
+            chunks = _split_text_with_images(text, images, total_pages)
+            result_blocks = []
+            for chunk in chunks:
+                if isinstance(chunk, dict) and chunk.get('type') == 'image':
+                    result_blocks.append(chunk)
+                else:
+                    result_blocks.append({
+                        'type': 'paragraph',
+                        'data': {'text': chunk}
+                    })
+            return result_blocks
+    
+    # Find header positions in content blocks for better image placement
+    header_positions = []
+    for i, block in enumerate(content_blocks):
+        if block.get('type') == 'header':
+            header_positions.append(i)
+    
+    # Insert images at appropriate positions
+    result_blocks = []
+    images_inserted = 0
+    
+    for i, block in enumerate(content_blocks):
+        result_blocks.append(block)
+        
+        # Check if we should insert an image after this block
+        while images_inserted < len(image_positions):
+            current_image = image_positions[images_inserted]
+            current_position_ratio = (i + 1) / max(len(content_blocks), 1)
+            
+            # Insert image if we've reached or passed the target position
+            if current_position_ratio >= current_image['position_ratio']:
+                # Prefer inserting after headers, but insert anywhere if we've passed the position
+                is_header = block.get('type') == 'header'
+                is_good_position = is_header or current_position_ratio >= current_image['position_ratio'] + 0.1
+                
+                if is_good_position or i == len(content_blocks) - 1:
+                    # Create image block
+                    image_block = {
+                        'type': 'image',
+                        'data': {
+                            'file': {
+                                'url': current_image['image']['url']
+                            },
+                            'caption': f"Image from page {current_image['page_num']}",
+                            'withBorder': False,
+                            'withBackground': False,
+                            'stretched': False
+                        }
+                    }
+                    result_blocks.append(image_block)
+                    images_inserted += 1
+                else:
+                    # Wait for a better position (like after next header)
+                    break
+            else:
+                # Haven't reached this image's position yet
+                break
+    
+    # Add any remaining images at the end (shouldn't happen, but safety check)
+    while images_inserted < len(image_positions):
+        current_image = image_positions[images_inserted]
+        image_block = {
+            'type': 'image',
+            'data': {
+                'file': {
+                    'url': current_image['image']['url']
+                },
+                'caption': f"Image from page {current_image['page_num']}",
+                'withBorder': False,
+                'withBackground': False,
+                'stretched': False
+            }
+        }
+        result_blocks.append(image_block)
+        images_inserted += 1
+    
+    return result_blocks
+
+
+def _split_text_with_images(text, images, total_pages):
+    """
+    Split text into chunks and return list of text chunks and image blocks
+    positioned based on page numbers.
+    """
+    if not images:
+        return [text]
+    
+    # Find page markers in text
+    page_markers = list(re.finditer(r'--- Page (\d+) ---', text))
+    
+    result = []
+    current_pos = 0
+    
+    for img_idx, img in enumerate(sorted(images, key=lambda x: x.get('page_num', 0))):
+        page_num = img.get('page_num', 1)
+        
+        # Find the position in text corresponding to this page
+        target_pos = len(text)
+        for marker in page_markers:
+            marker_page = int(marker.group(1))
+            if marker_page >= page_num:
+                target_pos = marker.start()
+                break
+        
+        # If we haven't reached the target position yet, add text up to it
+        if current_pos < target_pos:
+            chunk = text[current_pos:target_pos].strip()
+            if chunk:
+                result.append(chunk)
+            current_pos = target_pos
+        
+        # Add the image
+        result.append({
+            'type': 'image',
+            'data': {
+                'file': {'url': img['url']},
+                'caption': f"Image from page {page_num}",
+                'withBorder': False,
+                'withBackground': False,
+                'stretched': False
+            }
+        })
+    
+    # Add remaining text
+    if current_pos < len(text):
+        chunk = text[current_pos:].strip()
+        if chunk:
+            result.append(chunk)
+    
+    return result if result else [text]
+
+
+def process_pdf_chunk(course, module, pdf_text, suggested_title, ai_generator, skip_ai, course_name, module_name, images=None, order=None):
+    """
+    Create or update the lesson for one PDF chunk
+    
+    Returns:
+        (lessons created, lessons updated)
+    """
+    if images is None:
+        images = []
+    
+    created = 0
+    updated = 0
+    
+    # Generate lesson slug
+    lesson_slug = slugify(suggested_title)
+    
+    # Get next order number, unless the caller reserved one
+    if order is None:
+        order = (Lesson.objects.filter(course=course, module=module).aggregate(
+            max_order=Max('order')
+        )['max_order'] or 0) + 1
+    
+    if skip_ai or not ai_generator:
+        # Create basic lesson without AI generation
+        # Create basic content blocks with images if available
+        import uuid
+        import time
+        
+        basic_blocks = [
+            {
+                'type': 'paragraph',
+                'data': {
+                    'text': pdf_text[:1000] + '...' if len(pdf_text) > 1000 else pdf_text
+                }
+            }
+        ]
+        
+        # Add images if available - insert contextually
+        if images:
+            sorted_images = sorted(images, key=lambda x: x.get('page_num', 0))
+            basic_blocks = insert_images_contextually(basic_blocks, sorted_images, pdf_text)
+        
+        # Convert to Editor.js format
+        editorjs_blocks = []
+        for block in basic_blocks:
+            editorjs_blocks.append({
+                'id': str(uuid.uuid4()),
+                'type': block['type'],
+                'data': block['data']
+            })
+        
+        basic_content = {
+            'time': int(time.time() * 1000),
+            'blocks': editorjs_blocks,
+            'version': '2.28.2'
+        }
+        
+        lesson, was_created = Lesson.objects.get_or_create(
+            course=course,
+            module=module,
+            slug=lesson_slug,
+            defaults={
+                'title': suggested_title,
+                'description': pdf_text[:500] + '...' if len(pdf_text) > 500 else pdf_text,
+                'order': order,
+                'lesson_type': 'video',
+                'ai_generation_status': 'pending',
+                'content': basic_content,
+            }
+        )
+        
+        if was_created:
+            created = 1
+        else:
+            updated = 1
+    else:
+        # Generate AI content
+        try:
+            ai_content = ai_generator.generate_lesson_content(
+                pdf_text=pdf_text,
+                course_name=course_name,
+                module_name=module_name,
+                suggested_title=suggested_title
+            )
+            
+            # Add image blocks to content blocks
+            content_blocks_with_images = list(ai_content['content_blocks'])
+            
+            # Insert images into content blocks based on page numbers and content structure
+            if images:
+                sorted_images = sorted(images, key=lambda x: x.get('page_num', 0))
+                content_blocks_with_images = insert_images_contextually(
+                    content_blocks_with_images, 
+                    sorted_images,
+                    pdf_text
+                )
+            
+            # Convert content blocks to Editor.js format
+            editorjs_content = ai_generator.convert_to_editorjs_format(
+                content_blocks_with_images
+            )
+            
+            # Create or update lesson
+            lesson, was_created = Lesson.objects.get_or_create(
+                course=course,
+                module=module,
+                slug=lesson_slug,
+                defaults={
+                    'title': ai_content['clean_title'],
+                    'description': ai_content['full_description'],
+                    'order': order,
+                    'lesson_type': 'video',
+                    'content': editorjs_content,
+                    'ai_generation_status': 'generated',
+                    'ai_clean_title': ai_content['clean_title'],
+                    'ai_short_summary': ai_content['short_summary'],
+                    'ai_full_description': ai_content['full_description'],
+                    'ai_outcomes': ai_content['outcomes'],
+                    'ai_coach_actions': ai_content['coach_actions'],
+                }
+            )
+            
+            if was_created:
+                created = 1
+            else:
+                # Update existing lesson
+                lesson.title = ai_content['clean_title']
+                lesson.description = ai_content['full_description']
+                lesson.content = editorjs_content
+                lesson.ai_generation_status = 'generated'
+                lesson.ai_clean_title = ai_content['clean_title']
+                lesson.ai_short_summary = ai_content['short_summary']
+                lesson.ai_full_description = ai_content['full_description']
+                lesson.ai_outcomes = ai_content['outcomes']
+                lesson.ai_coach_actions = ai_content['coach_actions']
+                lesson.save()
+                updated = 1
+                
+        except Exception as e:
+            # Fall back to basic lesson creation
+            lesson, was_created = Lesson.objects.get_or_create(
+                course=course,
+                module=module,
+                slug=lesson_slug,
+                defaults={
+                    'title': suggested_title,
+                    'description': pdf_text[:500] + '...' if len(pdf_text) > 500 else pdf_text,
+                    'order': order,
+                    'lesson_type': 'video',
+                    'ai_generation_status': 'pending',
+                }
+            )
+            if was_created:
+                created = 1
+            else:
+                updated = 1
+    
+    return created, updated
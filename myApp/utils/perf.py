@@ -0,0 +1,189 @@
+"""
+Request Performance Aggregates
+In-process, per-view counters fed by PerformanceMiddleware: request count,
+latency histogram, database query count and time, repeated query
+fingerprints and template render time. Each server process keeps its own
+aggregates; they reset on restart.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open-ended
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf')]
+
+# Same statement executed this many times in one request counts as repeated
+REPEATED_QUERY_THRESHOLD = 3
+
+# Repeated-query fingerprints kept per view
+MAX_FINGERPRINTS_PER_VIEW = 10
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Normalise a statement so calls differing only in parameters match"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _LITERALS.sub('?', sql)[:300]
+
+
+class QueryRecorder:
+    """connection.execute_wrapper that counts and times every query in a request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self):
+        return {sql: n for sql, n in self.fingerprints.items() if n >= REPEATED_QUERY_THRESHOLD}
+
+
+# Template render seconds accumulated for the current request
+_template_time = ContextVar('template_time', default=None)
+_template_timer_installed = False
+
+
+def install_template_timer():
+    """Wrap the Django template backend's render() to time it per request. Idempotent."""
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    from django.template.backends.django import Template
+
+    original_render = Template.render
+
+    def render(self, *args, **kwargs):
+        totals = _template_time.get()
+        if totals is None:
+            return original_render(self, *args, **kwargs)
+        # Templates rendered from inside another (inclusion tags etc.) count once
+        totals['depth'] += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, *args, **kwargs)
+        finally:
+            totals['depth'] -= 1
+            if totals['depth'] == 0:
+                totals['seconds'] += time.perf_counter() - start
+
+    Template.render = render
+    _template_timer_installed = True
+
+
+def start_template_timer():
+    return _template_time.set({'seconds': 0.0, 'depth': 0})
+
+
+def stop_template_timer(token):
+    seconds = _template_time.get()['seconds']
+    _template_time.reset(token)
+    return seconds
+
+
+class ViewStats:
+    """Running aggregates for one view"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * len(LATENCY_BUCKETS_MS)
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.over_budget = 0
+        self.repeated = Counter()
+
+    def record(self, elapsed_ms, status_code, queries, db_ms, template_ms, repeated, over_budget):
+        self.requests += 1
+        self.errors += status_code >= 500
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.histogram[next(i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound)] += 1
+        self.queries += queries
+        self.max_queries = max(self.max_queries, queries)
+        self.db_ms += db_ms
+        self.template_ms += template_ms
+        self.over_budget += over_budget
+        for sql, n in repeated.items():
+            # Keep the worst repeat count seen for each fingerprint
+            if n > self.repeated[sql]:
+                self.repeated[sql] = n
+        if len(self.repeated) > MAX_FINGERPRINTS_PER_VIEW:
+            self.repeated = Counter(dict(self.repeated.most_common(MAX_FINGERPRINTS_PER_VIEW)))
+
+    def percentile_ms(self, fraction):
+        """Upper bound of the histogram bucket holding the given percentile"""
+        target = fraction * self.requests
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS_MS, self.histogram):
+            seen += n
+            if seen >= target:
+                return bound if bound != float('inf') else self.max_ms
+        return self.max_ms
+
+    def summary(self, view_name):
+        n = self.requests or 1
+        return {
+            'view': view_name,
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / n, 1),
+            'p50_ms': self.percentile_ms(0.5),
+            'p95_ms': self.percentile_ms(0.95),
+            'max_ms': round(self.max_ms, 1),
+            'total_ms': round(self.total_ms, 1),
+            'avg_queries': round(self.queries / n, 1),
+            'max_queries': self.max_queries,
+            'avg_db_ms': round(self.db_ms / n, 1),
+            'avg_template_ms': round(self.template_ms / n, 1),
+            'over_budget': self.over_budget,
+            'repeated_queries': self.repeated.most_common(),
+            'histogram': list(zip(LATENCY_BUCKETS_MS, self.histogram)),
+        }
+
+
+class PerfRegistry:
+    """Thread-safe map of view name to ViewStats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.started_at = time.time()
+
+    def record(self, view_name, **measurements):
+        with self._lock:
+            stats = self._views.get(view_name)
+            if stats is None:
+                stats = self._views[view_name] = ViewStats()
+            stats.record(**measurements)
+
+    def snapshot(self):
+        """Per-view summaries, slowest total time first"""
+        with self._lock:
+            summaries = [stats.summary(name) for name, stats in self._views.items()]
+        return sorted(summaries, key=lambda row: row['total_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+            self.started_at = time.time()
+
+
+registry = PerfRegistry()
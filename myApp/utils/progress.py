@@ -0,0 +1,179 @@
+"""
+Course Progress Matrix
+Pivots a course's UserProgress rows into dense students x lessons arrays
+with one query, so per-lesson and per-student figures are numpy reductions
+instead of one query per cell.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from ..models import CourseEnrollment, CourseAccess, UserProgress
+
+
+# UserProgress.status -> matrix cell value; a row with completed=True is
+# always 'completed', whatever its status (update_status can move a lesson
+# completed below the watch threshold back to in_progress)
+STATUS_CODES = {
+    'not_started': 0,
+    'in_progress': 1,
+    'completed': 2,
+}
+
+MATRIX_CACHE_TIMEOUT = 60 * 60
+
+
+class ProgressMatrix:
+    """
+    Dense progress grid for one course.
+    Rows follow ``user_ids`` and columns follow ``lesson_ids``; ``status``
+    holds STATUS_CODES values, ``watch`` the video watch percentage and
+    ``has_row`` whether a UserProgress row exists for the cell.
+    """
+
+    def __init__(self, user_ids, lesson_ids, status, watch, has_row):
+        self.user_ids = user_ids
+        self.lesson_ids = lesson_ids
+        self.status = status
+        self.watch = watch
+        self.has_row = has_row
+
+    @property
+    def shape(self):
+        return self.status.shape
+
+    def completed_counts(self):
+        """Completed lessons per student"""
+        return (self.status == STATUS_CODES['completed']).sum(axis=1)
+
+    def average_watch(self):
+        """Mean watch percentage per student over the lessons they have opened"""
+        opened = self.has_row.sum(axis=1)
+        total = np.where(self.has_row, self.watch, 0).sum(axis=1)
+        return np.divide(total, opened, out=np.zeros(len(self.user_ids)), where=opened > 0)
+
+    def lesson_stats(self):
+        """
+        Per-lesson completion and drop-off, as percentages of the roster.
+        A student drops off at the furthest lesson they started when they
+        have not completed every lesson.
+        """
+        n_students, n_lessons = self.shape
+        if n_students == 0 or n_lessons == 0:
+            return [
+                {'lesson_id': int(lesson_id), 'completion_rate': 0, 'started_rate': 0, 'drop_off_rate': 0}
+                for lesson_id in self.lesson_ids
+            ]
+
+        started = self.status > STATUS_CODES['not_started']
+        completed = self.status == STATUS_CODES['completed']
+
+        # Index of the furthest started lesson per student, -1 if none
+        furthest = np.where(started.any(axis=1), n_lessons - 1 - np.argmax(started[:, ::-1], axis=1), -1)
+        unfinished = completed.sum(axis=1) < n_lessons
+        drop_offs = np.bincount(furthest[unfinished & (furthest >= 0)], minlength=n_lessons)
+
+        completion = completed.sum(axis=0) * 100 / n_students
+        started_rate = started.sum(axis=0) * 100 / n_students
+        drop_off = drop_offs * 100 / n_students
+        return [
+            {
+                'lesson_id': int(lesson_id),
+                'completion_rate': round(float(completion[i]), 1),
+                'started_rate': round(float(started_rate[i]), 1),
+                'drop_off_rate': round(float(drop_off[i]), 1),
+            }
+            for i, lesson_id in enumerate(self.lesson_ids)
+        ]
+
+
+def build_progress_matrix(user_ids, lesson_ids, rows):
+    """
+    Pivot progress rows into a ProgressMatrix.
+
+    Args:
+        user_ids: Student ids, one per matrix row
+        lesson_ids: Lesson ids in display order, one per matrix column
+        rows: Iterable of (user_id, lesson_id, status, completed, watch_percentage);
+            rows for users or lessons outside the grid are ignored
+
+    Returns:
+        ProgressMatrix
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    lesson_ids = np.asarray(lesson_ids, dtype=np.int64)
+    shape = (len(user_ids), len(lesson_ids))
+    status = np.zeros(shape, dtype=np.int8)
+    watch = np.zeros(shape, dtype=np.float32)
+    has_row = np.zeros(shape, dtype=bool)
+
+    rows = list(rows)
+    if rows and all(shape):
+        row_users, row_lessons, row_status, row_completed, row_watch = zip(*rows)
+        row_users = np.fromiter(row_users, dtype=np.int64, count=len(rows))
+        row_lessons = np.fromiter(row_lessons, dtype=np.int64, count=len(rows))
+
+        # Map ids to positions via sorted lookups; misses are dropped
+        user_order = np.argsort(user_ids)
+        lesson_order = np.argsort(lesson_ids)
+        u = np.searchsorted(user_ids, row_users, sorter=user_order).clip(max=len(user_ids) - 1)
+        l = np.searchsorted(lesson_ids, row_lessons, sorter=lesson_order).clip(max=len(lesson_ids) - 1)
+        u, l = user_order[u], lesson_order[l]
+        keep = (user_ids[u] == row_users) & (lesson_ids[l] == row_lessons)
+        u, l = u[keep], l[keep]
+
+        status[u, l] = np.fromiter(
+            (STATUS_CODES['completed'] if done else STATUS_CODES.get(s, 0) for s, done in zip(row_status, row_completed)),
+            dtype=np.int8, count=len(rows),
+        )[keep]
+        watch[u, l] = np.fromiter(row_watch, dtype=np.float32, count=len(rows))[keep]
+        has_row[u, l] = True
+
+    return ProgressMatrix(user_ids, lesson_ids, status, watch, has_row)
+
+
+def get_course_roster(course):
+    """Ids of students with an enrollment or unlocked access to ``course``, ascending"""
+    enrolled = CourseEnrollment.objects.filter(course=course).values_list('user_id', flat=True)
+    accessed = CourseAccess.objects.filter(course=course, status='unlocked').values_list('user_id', flat=True)
+    return sorted(set(enrolled) | set(accessed))
+
+
+def _matrix_cache_key(course, user_ids, lesson_ids):
+    # Course version: the course row, its lessons in order, and the roster
+    # Progress watermark: row count and newest last_accessed
+    watermark = UserProgress.objects.filter(lesson__course=course).aggregate(
+        rows=Count('id'), latest=Max('last_accessed'),
+    )
+    latest = watermark['latest'].isoformat() if watermark['latest'] else ''
+    digest = hashlib.md5(
+        f"{course.updated_at.isoformat()}|{lesson_ids}|{user_ids}|{watermark['rows']}|{latest}".encode()
+    ).hexdigest()
+    return f'progress-matrix:{course.pk}:{digest}'
+
+
+def get_course_progress_matrix(course, lessons):
+    """
+    Cached ProgressMatrix for ``course``.
+
+    Args:
+        course: Course instance
+        lessons: The course's lessons in display order
+
+    Returns:
+        ProgressMatrix
+    """
+    user_ids = get_course_roster(course)
+    lesson_ids = [lesson.id for lesson in lessons]
+    cache_key = _matrix_cache_key(course, user_ids, lesson_ids)
+
+    matrix = cache.get(cache_key)
+    if matrix is None:
+        rows = UserProgress.objects.filter(lesson__course=course).values_list(
+            'user_id', 'lesson_id', 'status', 'completed', 'video_watch_percentage',
+        )
+        matrix = build_progress_matrix(user_ids, lesson_ids, rows)
+        cache.set(cache_key, matrix, MATRIX_CACHE_TIMEOUT)
+    return matrix
@@ -0,0 +1,343 @@
+"""
+AI Quiz Generation
+Generates lesson quiz questions with an LLM, one lesson or a whole course at
+a time. Course runs call the model from a bounded thread pool under a shared
+rate limit, skip lessons whose prompt content is unchanged since their quiz
+was generated, and write all questions in one transaction.
+
+The backend is chosen by settings.QUIZ_GENERATION_BACKEND: 'openai', or
+'fake' for deterministic questions built from the lesson text without any
+network access.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from ..models import LessonQuiz, LessonQuizQuestion
+from .quiz_grading import invalidate_answer_keys
+from .quiz_import import clean_question
+
+try:
+    from openai import OpenAI, APIConnectionError, APITimeoutError, RateLimitError
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+
+# Bump whenever the prompt or model changes, so every lesson is regenerated
+QUIZ_PROMPT_VERSION = 1
+QUIZ_MODEL = 'gpt-4o-mini'
+
+GENERATION_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+
+MAX_ATTEMPTS = 4
+RETRY_BASE_SECONDS = 2.0
+
+SYSTEM_PROMPT = 'You are a helpful assistant that creates educational quiz questions. Always return valid JSON only.'
+
+
+class QuizGenerationError(Exception):
+    pass
+
+
+def lesson_quiz_content(lesson):
+    """The lesson text fed to the prompt"""
+    parts = []
+    if lesson.title:
+        parts.append(f"Lesson Title: {lesson.title}")
+    if lesson.description:
+        parts.append(f"Description: {lesson.description}")
+    if lesson.transcription:
+        parts.append(f"Transcription: {lesson.transcription[:2000]}")  # Limit transcription length
+    if lesson.ai_full_description:
+        parts.append(f"Full Description: {lesson.ai_full_description}")
+    return "\n\n".join(parts)
+
+
+def build_quiz_prompt(content_text, num_questions):
+    return f"""Based on the following lesson content, generate {num_questions} multiple-choice quiz questions.
+
+Lesson Content:
+{content_text}
+
+Generate {num_questions} quiz questions with the following format:
+- Each question should test understanding of key concepts from the lesson
+- Each question should have 4 options (A, B, C, D)
+- One option should be clearly correct
+- The other options should be plausible but incorrect
+- Questions should vary in difficulty
+
+Return the questions in JSON format:
+{{
+  "questions": [
+    {{
+      "question": "Question text here",
+      "option_a": "Option A text",
+      "option_b": "Option B text",
+      "option_c": "Option C text",
+      "option_d": "Option D text",
+      "correct_answer": "A"
+    }}
+  ]
+}}
+
+Only return valid JSON, no additional text."""
+
+
+def generation_hash(content_text, num_questions):
+    """Identifies a generation: same content, question count, prompt version and model"""
+    source = f'{QUIZ_PROMPT_VERSION}:{QUIZ_MODEL}:{num_questions}:{content_text}'
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def parse_quiz_response(response_text):
+    """Validated question fields from the model's JSON answer"""
+    response_text = response_text.strip()
+    # Clean up response (remove markdown code blocks if present)
+    if response_text.startswith('```'):
+        response_text = response_text.split('```')[1]
+        if response_text.startswith('json'):
+            response_text = response_text[4:]
+        response_text = response_text.strip()
+    if response_text.endswith('```'):
+        response_text = response_text.rsplit('```', 1)[0].strip()
+
+    try:
+        quiz_data = json.loads(response_text)
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if not json_match:
+            raise QuizGenerationError('Failed to parse AI response as JSON.')
+        try:
+            quiz_data = json.loads(json_match.group())
+        except json.JSONDecodeError:
+            raise QuizGenerationError('Failed to parse AI response as JSON.')
+
+    questions = []
+    for item in quiz_data.get('questions', []):
+        if not isinstance(item, dict):
+            continue
+        question, _ = clean_question(
+            item.get('question'),
+            {letter: item.get(f'option_{letter.lower()}') for letter in 'ABCD'},
+            item.get('correct_answer'),
+            default_answer='A',
+        )
+        if question:
+            questions.append(question)
+    return questions
+
+
+class OpenAIQuizBackend:
+    """Chat completion through the OpenAI API; safe to share between threads"""
+
+    def __init__(self, api_key=None):
+        if not OPENAI_AVAILABLE:
+            raise QuizGenerationError('OpenAI is not available. Please install the openai package.')
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise QuizGenerationError('OPENAI_API_KEY not found in environment variables.')
+        self.client = OpenAI(api_key=api_key)
+
+    def is_retryable(self, error):
+        return isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError))
+
+    def complete(self, prompt):
+        response = self.client.chat.completions.create(
+            model=QUIZ_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.7,
+            max_tokens=2000,
+        )
+        return response.choices[0].message.content
+
+
+class FakeQuizBackend:
+    """
+    Offline backend for development and tests: builds questions from the
+    sentences of the lesson content in the prompt, deterministically.
+    """
+
+    def is_retryable(self, error):
+        return False
+
+    def complete(self, prompt):
+        num_questions = int(re.search(r'generate (\d+) multiple-choice', prompt).group(1))
+        content = prompt.split('Lesson Content:', 1)[1].split('Generate ', 1)[0]
+        sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+|\n+', content) if len(s.strip()) > 3]
+        questions = []
+        for i in range(num_questions):
+            sentence = sentences[i % len(sentences)] if sentences else f'Point {i + 1}'
+            correct = 'ABCD'[int(hashlib.md5(sentence.encode()).hexdigest(), 16) % 4]
+            options = {letter: f'Not stated ({letter})' for letter in 'ABCD'}
+            options[correct] = sentence[:290]
+            questions.append({
+                'question': f'Which statement appears in the lesson? ({i + 1})',
+                **{f'option_{letter.lower()}': text for letter, text in options.items()},
+                'correct_answer': correct,
+            })
+        return json.dumps({'questions': questions})
+
+
+QUIZ_BACKENDS = {
+    'openai': OpenAIQuizBackend,
+    'fake': FakeQuizBackend,
+}
+
+
+def get_quiz_backend(name=None):
+    name = name or getattr(settings, 'QUIZ_GENERATION_BACKEND', 'openai')
+    if name not in QUIZ_BACKENDS:
+        raise QuizGenerationError(f"Unknown quiz generation backend '{name}'")
+    return QUIZ_BACKENDS[name]()
+
+
+class RateLimiter:
+    """Spaces calls at least 60 / requests_per_minute seconds apart across threads"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def generate_questions(backend, content_text, num_questions, limiter=None, use_cache=True):
+    """
+    Questions for one lesson's content, from the cache when the same content
+    was generated before (unless ``use_cache`` is False, to ask the model for
+    new questions). Retries rate-limit and connection errors with
+    exponential backoff.
+
+    Returns:
+        (questions, served from cache)
+    """
+    digest = generation_hash(content_text, num_questions)
+    cache_key = f'quiz-generation:{digest}'
+    cached = cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        return cached, True
+
+    prompt = build_quiz_prompt(content_text, num_questions)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if limiter:
+            limiter.wait()
+        try:
+            questions = parse_quiz_response(backend.complete(prompt))
+            break
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS or not backend.is_retryable(e):
+                raise QuizGenerationError(f'AI generation failed: {e}') from e
+            time.sleep(RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+
+    if questions:
+        cache.set(cache_key, questions, GENERATION_CACHE_TIMEOUT)
+    return questions, False
+
+
+def generate_course_quizzes(course, num_questions=5, workers=4, requests_per_minute=60,
+                            backend=None, force=False):
+    """
+    Generate quizzes for every lesson of ``course``. A lesson is skipped when
+    it has no content, or (unless ``force``) when its quiz was generated from
+    the same content and prompt version or has questions that were not
+    generated here, such as hand-written or imported ones. Regenerated
+    quizzes have their questions replaced; ``force`` also skips the
+    generation cache, so the model writes new questions.
+
+    Returns:
+        List of per-lesson dicts with 'lesson', 'status' (generated, cached,
+        unchanged, manual, no content, failed), 'questions' and 'error'
+    """
+    backend = backend or get_quiz_backend()
+    lessons = list(course.lessons.order_by('order', 'id'))
+    quizzes = {
+        quiz.lesson_id: quiz
+        for quiz in LessonQuiz.objects.filter(lesson__in=lessons).annotate(question_count=Count('questions'))
+    }
+
+    results, pending = {}, {}
+    for lesson in lessons:
+        content_text = lesson_quiz_content(lesson)
+        digest = generation_hash(content_text, num_questions)
+        quiz = quizzes.get(lesson.id)
+        result = {'lesson': lesson, 'status': None, 'questions': 0, 'error': None, 'hash': digest}
+        results[lesson.id] = result
+        if not content_text:
+            result['status'] = 'no content'
+        elif quiz and quiz.generation_hash == digest and not force:
+            result['status'] = 'unchanged'
+        elif quiz and not quiz.generation_hash and quiz.question_count and not force:
+            result['status'] = 'manual'
+        else:
+            pending[lesson.id] = content_text
+
+    # Worker threads only talk to the model; all database writes happen here
+    limiter = RateLimiter(requests_per_minute)
+    generated = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(generate_questions, backend, content_text, num_questions, limiter, not force): lesson_id
+            for lesson_id, content_text in pending.items()
+        }
+        for future in as_completed(futures):
+            result = results[futures[future]]
+            try:
+                questions, from_cache = future.result()
+            except QuizGenerationError as e:
+                result['status'], result['error'] = 'failed', str(e)
+                continue
+            if not questions:
+                result['status'], result['error'] = 'failed', 'The model returned no usable questions.'
+                continue
+            result['status'] = 'cached' if from_cache else 'generated'
+            result['questions'] = len(questions)
+            generated[futures[future]] = questions
+
+    if generated:
+        _save_generated(lessons, quizzes, generated, results)
+    return [results[lesson.id] for lesson in lessons]
+
+
+def _save_generated(lessons, quizzes, generated, results):
+    """Replace the questions of every regenerated quiz in one transaction"""
+    lessons_by_id = {lesson.id: lesson for lesson in lessons}
+    with transaction.atomic():
+        new_quizzes = LessonQuiz.objects.bulk_create([
+            LessonQuiz(lesson=lessons_by_id[lesson_id], title=f'{lessons_by_id[lesson_id].title} Quiz', passing_score=70)
+            for lesson_id in generated
+            if lesson_id not in quizzes
+        ])
+        quizzes.update((quiz.lesson_id, quiz) for quiz in new_quizzes)
+        targets = [quizzes[lesson_id] for lesson_id in generated]
+
+        LessonQuizQuestion.objects.filter(quiz__in=targets).delete()
+        LessonQuizQuestion.objects.bulk_create([
+            LessonQuizQuestion(quiz=quizzes[lesson_id], order=n, **question)
+            for lesson_id, questions in generated.items()
+            for n, question in enumerate(questions, start=1)
+        ], batch_size=1000)
+
+        for lesson_id in generated:
+            quizzes[lesson_id].generation_hash = results[lesson_id]['hash']
+        LessonQuiz.objects.bulk_update(targets, ['generation_hash'])
+        invalidate_answer_keys(quiz.id for quiz in targets)
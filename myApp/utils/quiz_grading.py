@@ -0,0 +1,144 @@
+"""
+Quiz Grading
+Compiles a lesson quiz into a cached answer key (question order plus one
+correct-option letter per question) and grades packed responses against it
+in a single pass, so a submission is graded without database queries once
+the key is cached. Attempts store their responses in the same packed form,
+which lets corrected keys be re-applied to past attempts in bulk.
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import LessonQuizAttempt, LessonQuizQuestion, LessonQuizSummary
+
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Packed response character for an unanswered question
+BLANK = '-'
+
+VALID_OPTIONS = frozenset(option for option, _ in LessonQuizQuestion.OPTION_CHOICES)
+
+
+class AnswerKey:
+    """
+    Compiled answer key for one quiz.
+    ``question_ids`` fixes the order of the packed strings and
+    ``correct_options`` holds one option letter per question in that order.
+    ``version`` identifies the question order: responses recorded under a
+    version can be graded by any key with the same version, including one
+    whose correct options were later corrected.
+    """
+
+    def __init__(self, quiz_id, question_ids, correct_options):
+        self.quiz_id = quiz_id
+        self.question_ids = tuple(question_ids)
+        self.correct_options = correct_options
+        self.version = hashlib.md5(
+            ','.join(map(str, self.question_ids)).encode()
+        ).hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def pack(self, data):
+        """Pack submitted answers (``q_<question id>`` -> letter) into a response string"""
+        packed = []
+        for question_id in self.question_ids:
+            answer = data.get(f'q_{question_id}')
+            packed.append(answer if answer in VALID_OPTIONS else BLANK)
+        return ''.join(packed)
+
+
+def _answer_key_cache_key(quiz_id):
+    return f'quiz-answer-key:{quiz_id}'
+
+
+def compile_answer_key(quiz_id):
+    """Build the answer key for a quiz from its questions (one query)"""
+    rows = list(
+        LessonQuizQuestion.objects.filter(quiz_id=quiz_id)
+        .order_by('order', 'id')
+        .values_list('id', 'correct_option')
+    )
+    return AnswerKey(quiz_id, [row[0] for row in rows], ''.join(row[1] for row in rows))
+
+
+def get_answer_key(quiz_id):
+    """Cached answer key for a quiz; dropped whenever one of its questions changes"""
+    key = cache.get(_answer_key_cache_key(quiz_id))
+    if key is None:
+        key = compile_answer_key(quiz_id)
+        cache.set(_answer_key_cache_key(quiz_id), key, ANSWER_KEY_CACHE_TIMEOUT)
+    return key
+
+
+def invalidate_answer_key(quiz_id):
+    cache.delete(_answer_key_cache_key(quiz_id))
+
+
+def invalidate_answer_keys(quiz_ids):
+    """For bulk writes, which skip the signal receivers: drop the keys now and after commit"""
+    quiz_ids = list(quiz_ids)
+    cache.delete_many([_answer_key_cache_key(quiz_id) for quiz_id in quiz_ids])
+    transaction.on_commit(lambda: cache.delete_many([_answer_key_cache_key(quiz_id) for quiz_id in quiz_ids]))
+
+
+def grade(correct_options, responses):
+    """
+    Grade one packed response string against packed correct options.
+
+    Returns:
+        (correct answers, question count, score percentage)
+    """
+    total = len(correct_options)
+    correct = sum(1 for given, expected in zip(responses, correct_options) if given == expected)
+    return correct, total, (correct / total * 100) if total else 0.0
+
+
+def grade_many(correct_options, responses):
+    """
+    Vectorised ``grade`` for many response strings of the same key version.
+
+    Returns:
+        Array of correct-answer counts, one per response string
+    """
+    if not responses or not correct_options:
+        return np.zeros(len(responses), dtype=np.int64)
+    matrix = np.frombuffer(''.join(responses).encode('ascii'), dtype=np.uint8)
+    matrix = matrix.reshape(len(responses), len(correct_options))
+    expected = np.frombuffer(correct_options.encode('ascii'), dtype=np.uint8)
+    return (matrix == expected).sum(axis=1)
+
+
+def regrade_attempts(quiz):
+    """
+    Re-apply the quiz's current answer key and passing score to every
+    attempt recorded under the same key version.
+
+    Returns:
+        Number of attempts whose score or pass status changed
+    """
+    key = get_answer_key(quiz.id)
+    attempts = list(
+        LessonQuizAttempt.objects.filter(quiz=quiz, answer_key_version=key.version)
+        .only('id', 'user_id', 'responses', 'score', 'passed')
+    )
+    if not attempts or not len(key):
+        return 0
+
+    scores = grade_many(key.correct_options, [attempt.responses for attempt in attempts]) / len(key) * 100
+    changed = []
+    for attempt, score in zip(attempts, scores.tolist()):
+        passed = score >= quiz.passing_score
+        if attempt.score != score or attempt.passed != passed:
+            attempt.score, attempt.passed = score, passed
+            changed.append(attempt)
+    with transaction.atomic():
+        LessonQuizAttempt.objects.bulk_update(changed, ['score', 'passed'], batch_size=1000)
+        # bulk_update bypasses save(), so refresh the affected summaries here
+        LessonQuizSummary.rebuild(quiz.id, {attempt.user_id for attempt in changed})
+    return len(changed)
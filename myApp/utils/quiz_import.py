@@ -0,0 +1,271 @@
+"""
+Quiz Import
+Parses lesson quiz questions from CSV (streamed row by row) and PDF (page by
+page with PyMuPDF), and imports many files into a course at once: every file
+is validated first, then all quizzes and questions are written with
+bulk_create in one transaction.
+"""
+import csv
+import io
+import os
+import re
+import zipfile
+
+from django.db import transaction
+from django.db.models import Max
+
+from ..models import LessonQuiz, LessonQuizQuestion
+from .quiz_grading import VALID_OPTIONS, invalidate_answer_keys
+
+try:
+    import fitz  # PyMuPDF
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+
+IMPORT_EXTENSIONS = ('.csv', '.pdf')
+
+# Limits for one import, so a hostile archive cannot exhaust memory
+MAX_IMPORT_FILES = 500
+MAX_IMPORT_FILE_BYTES = 20 * 1024 * 1024
+
+_QUESTION_START = re.compile(r'^(\d+)[\.\)]\s+(.*)$')
+_OPTION_START = re.compile(r'^([A-D])[\.\)]\s*(.*)$', re.IGNORECASE)
+_ANSWER = re.compile(r'(?i:answer|correct)[:\s]+([A-D])\b')
+
+
+def clean_question(text, options, answer, default_answer=None):
+    """
+    Validated LessonQuizQuestion fields, or (None, error message).
+    ``options`` maps letters to option text; ``default_answer`` replaces a
+    missing or invalid answer instead of reporting it.
+    """
+    text = (text or '').strip()
+    options = {letter: (options.get(letter) or '').strip() for letter in 'ABCD'}
+    answer = (answer or '').strip().upper()
+    if not text:
+        return None, 'missing question text'
+    if not options['A'] or not options['B']:
+        return None, 'options A and B are required'
+    if answer not in VALID_OPTIONS or not options[answer]:
+        if default_answer is None:
+            return None, f"correct answer '{answer}' is not one of the filled options"
+        answer = default_answer
+    return {
+        'text': text,
+        'option_a': options['A'],
+        'option_b': options['B'],
+        'option_c': options['C'],
+        'option_d': options['D'],
+        'correct_option': answer,
+    }, None
+
+
+def parse_csv_questions(stream, default_answer=None):
+    """
+    Stream questions from a CSV with the columns
+    question, option_a, option_b, option_c, option_d, correct_answer.
+
+    Args:
+        stream: Binary file object
+        default_answer: Used instead of reporting a missing/invalid answer
+
+    Yields:
+        (line number, question fields or None, error message or None);
+        blank rows are skipped
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        if not any((value or '').strip() for value in row.values() if isinstance(value, str)):
+            continue
+        question, error = clean_question(
+            row.get('question'),
+            {letter: row.get(f'option_{letter.lower()}') for letter in 'ABCD'},
+            row.get('correct_answer'),
+            default_answer,
+        )
+        yield reader.line_num, question, error
+
+
+def parse_pdf_questions(pdf_bytes, default_answer=None):
+    """
+    Parse numbered questions ("1. ...") with lettered options ("A) ...") and an
+    "Answer: B" line, reading the PDF one page at a time. Questions may run
+    across page breaks.
+
+    Yields:
+        (question number, question fields or None, error message or None)
+    """
+    current = None
+
+    def finish(block):
+        return block['number'], *clean_question(
+            ' '.join(block['text']),
+            {letter: ' '.join(lines) for letter, lines in block['options'].items()},
+            block['answer'],
+            default_answer,
+        )
+
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as document:
+        for page in document:
+            for line in page.get_text().splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                start = _QUESTION_START.match(line)
+                if start:
+                    if current:
+                        yield finish(current)
+                    current = {'number': int(start.group(1)), 'text': [start.group(2)],
+                               'options': {}, 'option': None, 'answer': None}
+                    continue
+                if current is None:
+                    continue
+                answer = _ANSWER.search(line)
+                if answer and current['answer'] is None and current['options']:
+                    current['answer'] = answer.group(1)
+                    continue
+                option = _OPTION_START.match(line)
+                if option:
+                    current['option'] = option.group(1).upper()
+                    current['options'][current['option']] = [option.group(2)]
+                elif current['option']:
+                    current['options'][current['option']].append(line)
+                else:
+                    current['text'].append(line)
+    if current:
+        yield finish(current)
+
+
+def parse_questions(name, stream, default_answer=None):
+    """Dispatch on the file extension; PDFs are read into memory for PyMuPDF"""
+    if name.lower().endswith('.pdf'):
+        if not PDF_AVAILABLE:
+            raise ValueError('PDF parsing is not available. Please install PyMuPDF.')
+        return parse_pdf_questions(stream.read(), default_answer)
+    return parse_csv_questions(stream, default_answer)
+
+
+def _upload_entries(uploaded_files):
+    """
+    (file name, size, opener, error) for every file in the uploads; zip
+    archives are expanded in memory without extracting them to disk.
+    """
+    for uploaded in uploaded_files:
+        if not uploaded.name.lower().endswith('.zip'):
+            yield uploaded.name, uploaded.size, (lambda uploaded=uploaded: uploaded.open('rb')), None
+            continue
+        try:
+            archive = zipfile.ZipFile(uploaded)
+        except zipfile.BadZipFile:
+            yield uploaded.name, uploaded.size, None, 'not a valid zip archive'
+            continue
+        for info in archive.infolist():
+            base = os.path.basename(info.filename)
+            if info.is_dir() or base.startswith('.') or '__MACOSX' in info.filename:
+                continue
+            yield base, info.file_size, (lambda archive=archive, info=info: archive.open(info)), None
+
+
+def add_questions(quiz, questions):
+    """bulk_create validated question fields after the quiz's existing questions"""
+    max_order = quiz.questions.aggregate(Max('order'))['order__max'] or 0
+    created = LessonQuizQuestion.objects.bulk_create([
+        LessonQuizQuestion(quiz=quiz, order=max_order + n, **question)
+        for n, question in enumerate(questions, start=1)
+    ])
+    invalidate_answer_keys([quiz.id])
+    return len(created)
+
+
+def import_quizzes(course, uploaded_files, dry_run=False, replace=False):
+    """
+    Import quiz questions for many lessons of ``course``. Each file (or zip
+    member) is named after the lesson slug it belongs to, e.g.
+    ``intro-to-breathing.csv``.
+
+    Nothing is written unless every file validates. Questions are appended
+    after a lesson's existing ones, or replace them with ``replace``.
+
+    Returns:
+        Dict with per-file 'files' results, 'questions' and 'imported'
+    """
+    lessons = {lesson.slug: lesson for lesson in course.lessons.all()}
+    files, parsed, seen = [], {}, {}
+
+    for count, (name, size, opener, error) in enumerate(_upload_entries(uploaded_files), start=1):
+        stem, extension = os.path.splitext(name)
+        result = {'name': name, 'lesson': lessons.get(stem), 'questions': 0, 'errors': []}
+        files.append(result)
+        if error:
+            result['errors'].append(error)
+            continue
+        if count > MAX_IMPORT_FILES:
+            result['errors'].append(f'more than {MAX_IMPORT_FILES} files in one import')
+            continue
+        if extension.lower() not in IMPORT_EXTENSIONS:
+            result['errors'].append('not a CSV or PDF file')
+            continue
+        if size > MAX_IMPORT_FILE_BYTES:
+            result['errors'].append(f'larger than {MAX_IMPORT_FILE_BYTES // (1024 * 1024)} MB')
+            continue
+        if result['lesson'] is None:
+            result['errors'].append(f"no lesson with slug '{stem}' in {course.name}")
+            continue
+        if stem in seen:
+            result['errors'].append(f'{seen[stem]} is already imported into this lesson')
+            continue
+        seen[stem] = name
+
+        questions = []
+        try:
+            with opener() as stream:
+                for position, question, error in parse_questions(name, stream):
+                    if error:
+                        result['errors'].append(f'{position}: {error}')
+                    else:
+                        questions.append(question)
+        except (ValueError, UnicodeDecodeError, csv.Error, RuntimeError, zipfile.BadZipFile) as e:
+            result['errors'].append(f'could not be read: {e}')
+        if not questions and not result['errors']:
+            result['errors'].append('no questions found')
+        result['questions'] = len(questions)
+        parsed[result['lesson'].id] = questions
+
+    report = {
+        'files': files,
+        'questions': sum(result['questions'] for result in files),
+        'imported': False,
+    }
+    if dry_run or not files or any(result['errors'] for result in files):
+        return report
+
+    with transaction.atomic():
+        quizzes = {quiz.lesson_id: quiz for quiz in LessonQuiz.objects.filter(lesson_id__in=parsed)}
+        new_quizzes = LessonQuiz.objects.bulk_create([
+            LessonQuiz(lesson=lesson, title=f'{lesson.title} Quiz')
+            for lesson in (result['lesson'] for result in files)
+            if lesson.id not in quizzes
+        ])
+        quizzes.update((quiz.lesson_id, quiz) for quiz in new_quizzes)
+
+        if replace:
+            LessonQuizQuestion.objects.filter(quiz__in=quizzes.values()).delete()
+            max_orders = {}
+        else:
+            max_orders = dict(
+                LessonQuizQuestion.objects.filter(quiz__in=quizzes.values())
+                .values('quiz_id').annotate(max_order=Max('order')).values_list('quiz_id', 'max_order')
+            )
+
+        LessonQuizQuestion.objects.bulk_create([
+            LessonQuizQuestion(quiz=quizzes[lesson_id], order=(max_orders.get(quizzes[lesson_id].id) or 0) + n, **question)
+            for lesson_id, questions in parsed.items()
+            for n, question in enumerate(questions, start=1)
+        ], batch_size=1000)
+
+        invalidate_answer_keys([quiz.id for quiz in quizzes.values()])
+
+    report['imported'] = True
+    return report
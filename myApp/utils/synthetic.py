@@ -0,0 +1,114 @@
+"""
+Synthetic Data Generator
+Bulk-creates students, courses, lessons, enrollments and progress at a
+chosen scale, for benchmarks and load tests. Deterministic for a given seed.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from ..models import Course, Lesson, CourseEnrollment, UserProgress, Certification
+
+
+BATCH_SIZE = 5000
+
+
+def seed_synthetic(users=100, courses=5, lessons_per_course=10, progress_density=0.3,
+                   courses_per_student=2, seed=42, prefix='synthetic', password=None):
+    """
+    Create a synthetic learning platform.
+
+    Args:
+        users: Number of students
+        courses: Number of courses
+        lessons_per_course: Lessons in every course
+        progress_density: Share of (enrolled student, lesson) pairs with a
+            UserProgress row; about two thirds of those are completed
+        courses_per_student: Courses each student is enrolled in
+        seed: Random seed
+        prefix: Prefix for usernames and course slugs
+        password: Shared login password for the students; unusable if None
+
+    Returns:
+        Dict with the created 'courses' and 'student_ids', and row counts
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    types = [course_type for course_type, _ in Course.COURSE_TYPES]
+
+    course_objs = Course.objects.bulk_create([
+        Course(
+            name=f'{prefix.title()} Course {i}',
+            slug=f'{prefix}-course-{i}',
+            course_type=types[i % len(types)],
+            description='Synthetic course',
+            short_description='Synthetic course',
+        )
+        for i in range(courses)
+    ])
+    Lesson.objects.bulk_create([
+        Lesson(
+            course=course,
+            title=f'Lesson {n + 1}',
+            slug=f'lesson-{n + 1}',
+            description='Synthetic lesson',
+            order=n + 1,
+        )
+        for course in course_objs
+        for n in range(lessons_per_course)
+    ], batch_size=BATCH_SIZE)
+    lessons_by_course = {}
+    for lesson_id, course_id in Lesson.objects.filter(course__in=course_objs).order_by('order').values_list('id', 'course_id'):
+        lessons_by_course.setdefault(course_id, []).append(lesson_id)
+
+    # Hash once; every student shares the same password
+    password_hash = make_password(password)
+    User.objects.bulk_create(
+        [User(username=f'{prefix}_student_{i}', email=f'{prefix}_student_{i}@example.com', password=password_hash)
+         for i in range(users)],
+        batch_size=BATCH_SIZE,
+    )
+    student_ids = list(
+        User.objects.filter(username__startswith=f'{prefix}_student_').order_by('id').values_list('id', flat=True)
+    )
+
+    enrollments, progress, certifications = [], [], []
+    per_student = min(courses_per_student, courses)
+    for user_id in student_ids:
+        for course in rng.sample(course_objs, per_student):
+            enrollments.append(CourseEnrollment(user_id=user_id, course=course, payment_type='full'))
+            lesson_ids = lessons_by_course.get(course.id, [])
+            completed_all = bool(lesson_ids)
+            for lesson_id in lesson_ids:
+                if rng.random() >= progress_density:
+                    completed_all = False
+                    continue
+                completed = rng.random() < 2 / 3
+                completed_all &= completed
+                started_at = now - timezone.timedelta(days=rng.uniform(0, 90))
+                progress.append(UserProgress(
+                    user_id=user_id,
+                    lesson_id=lesson_id,
+                    status='completed' if completed else 'in_progress',
+                    completed=completed,
+                    completed_at=started_at + timezone.timedelta(hours=rng.uniform(0.2, 72)) if completed else None,
+                    started_at=started_at,
+                    video_watch_percentage=100.0 if completed else round(rng.uniform(1, 89), 1),
+                ))
+            if completed_all:
+                certifications.append(Certification(user_id=user_id, course=course, status='passed', issued_at=now))
+
+    CourseEnrollment.objects.bulk_create(enrollments, batch_size=BATCH_SIZE)
+    UserProgress.objects.bulk_create(progress, batch_size=BATCH_SIZE)
+    Certification.objects.bulk_create(certifications, batch_size=BATCH_SIZE)
+
+    return {
+        'courses': course_objs,
+        'student_ids': student_ids,
+        'lessons': sum(len(ids) for ids in lessons_by_course.values()),
+        'enrollments': len(enrollments),
+        'progress': len(progress),
+        'certifications': len(certifications),
+    }
@@ -0,0 +1,106 @@
+"""
+Certificate Verification
+Public lookups of certificate IDs for employers. Every lookup, single or
+bulk, is one query on the unique certificate ID index; issued
+certificates rarely change, so their responses carry strong ETags and can
+be cached for a long time. Bulk lookups are rate limited per client and
+leave out the holder's name, so they cannot be used to harvest names by
+enumerating IDs.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Certification
+
+
+MAX_BULK_VERIFY = 1000
+
+# Bulk requests one client address may make per window
+BULK_VERIFY_RATE = 10
+BULK_VERIFY_WINDOW_SECONDS = 60
+
+# Issued certificates are cached for a day; unknown or revoked IDs briefly,
+# so a certificate issued (or reinstated) shortly after a miss shows up soon
+VERIFY_CACHE_SECONDS = 24 * 60 * 60
+VERIFY_MISS_CACHE_SECONDS = 5 * 60
+
+
+def _lookup():
+    # The exclude repeats the unique index's condition so the partial index is used
+    return (
+        Certification.objects.exclude(accredible_certificate_id='')
+        .select_related('user', 'course')
+        .only(
+            'accredible_certificate_id', 'status', 'issued_at',
+            'user__username', 'user__first_name', 'user__last_name', 'course__name',
+        )
+        .order_by()
+    )
+
+
+def verification_payload(certificate_id, certification=None, include_holder=True):
+    """What is disclosed about a certificate ID; ``valid`` only for issued certificates"""
+    if certification is None:
+        return {'certificate_id': certificate_id, 'valid': False, 'found': False}
+    payload = {
+        'certificate_id': certificate_id,
+        'valid': certification.status == 'passed',
+        'found': True,
+        'course': certification.course.name,
+        'issued_on': certification.issued_at.date().isoformat() if certification.issued_at else None,
+    }
+    if include_holder:
+        payload['holder'] = certification.user.get_full_name() or certification.user.username
+    return payload
+
+
+def verify_certificate(certificate_id):
+    certification = _lookup().filter(accredible_certificate_id=certificate_id).first()
+    return verification_payload(certificate_id, certification)
+
+
+def verify_certificates(certificate_ids):
+    """Payloads, without the holder, for up to MAX_BULK_VERIFY IDs in the order given, with one query"""
+    if len(certificate_ids) > MAX_BULK_VERIFY:
+        raise ValueError(f'At most {MAX_BULK_VERIFY} certificate IDs can be verified at once.')
+    found = {
+        certification.accredible_certificate_id: certification
+        for certification in _lookup().filter(accredible_certificate_id__in=set(certificate_ids))
+    }
+    return [
+        verification_payload(certificate_id, found.get(certificate_id), include_holder=False)
+        for certificate_id in certificate_ids
+    ]
+
+
+def client_address(request):
+    """
+    The client's address as seen by the outermost of settings.TRUSTED_PROXY_COUNT
+    proxies; entries further left in X-Forwarded-For are client-supplied.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def bulk_verify_allowed(client):
+    """Count a bulk request from ``client``; False once it is over BULK_VERIFY_RATE in the window"""
+    key = f'verify-bulk:{client}'
+    cache.add(key, 0, BULK_VERIFY_WINDOW_SECONDS)
+    try:
+        return cache.incr(key) <= BULK_VERIFY_RATE
+    except ValueError:
+        # The window expired between add and incr
+        cache.set(key, 1, BULK_VERIFY_WINDOW_SECONDS)
+        return True
+
+
+def payload_etag(payload, representation):
+    """Strong ETag for one representation (json or html) of a payload"""
+    source = json.dumps([representation, payload], sort_keys=True)
+    return '"%s"' % hashlib.sha256(source.encode()).hexdigest()[:32]
@@ -3,7 +3,8 @@ from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
-from django.http import JsonResponse
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.conf import settings
@@ -22,16 +23,34 @@ from .models import (
     CourseEnrollment,
     Exam,
     ExamAttempt,
+    ExamSummary,
     Certification,
     LessonQuiz,
     LessonQuizQuestion,
     LessonQuizAttempt,
+    LessonQuizSummary,
 )
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Max, Q
 from django.db import models
 from django.utils import timezone
 from .utils.transcription import transcribe_video
 from .utils.access import has_course_access
+from .utils.activity import record_activity, record_progress_change
+from .utils.quiz_grading import get_answer_key, grade
+from .utils import pdf_import, verification
+from .utils.certificate_storage import CertificateStorageError, certificate_file_response, get_certificate_storage
+from .utils.exam_engine import (
+    EXAM_AUTOSAVE_INTERVAL_SECONDS,
+    EXAM_AUTOSAVE_JITTER_SECONDS,
+    ExamError,
+    get_exam_answer_key,
+    get_exam_paper,
+    is_expired,
+    remaining_seconds,
+    save_answers,
+    start_attempt,
+    submit_attempt,
+)
 
 
 def home(request):
@@ -407,7 +426,7 @@ def course_detail(request, course_slug):
 def lesson_detail(request, course_slug, lesson_slug):
     """Lesson detail page with three-column layout"""
     course = get_object_or_404(Course, slug=course_slug)
-    lesson = get_object_or_404(Lesson, course=course, slug=lesson_slug)
+    lesson = get_object_or_404(Lesson.objects.select_related('quiz'), course=course, slug=lesson_slug)
     
     # Get user progress
     enrollment = CourseEnrollment.objects.filter(
@@ -482,29 +501,31 @@ def lesson_detail(request, course_slug, lesson_slug):
     
     # Work out next lesson (for auto-advance after completion)
     next_lesson = None
+    lessons_list = []
     if all_lessons.exists():
-        lessons_list = list(all_lessons)
+        lessons_list = list(all_lessons.annotate(
+            has_quiz=models.Exists(LessonQuiz.objects.filter(lesson=models.OuterRef('pk')))
+        ))
         for idx, l in enumerate(lessons_list):
             if l.id == lesson.id and idx + 1 < len(lessons_list):
                 next_lesson = lessons_list[idx + 1]
                 break
 
-    # Get quiz and quiz attempts for this user
+    # Quiz state for this lesson and the sidebar badges, from the per-user summaries
     lesson_quiz = getattr(lesson, 'quiz', None)
-    quiz_attempts = None
-    latest_quiz_attempt = None
-    quiz_passed = False
-    if lesson_quiz:
-        quiz_attempts = LessonQuizAttempt.objects.filter(
-            user=request.user,
-            quiz=lesson_quiz
-        ).order_by('-completed_at')
-        latest_quiz_attempt = quiz_attempts.first() if quiz_attempts.exists() else None
-        quiz_passed = LessonQuizAttempt.objects.filter(
-            user=request.user,
-            quiz=lesson_quiz,
-            passed=True
-        ).exists()
+    # Only courses with quizzes can have summaries
+    quiz_summaries = (
+        LessonQuizSummary.for_course(request.user, course)
+        if any(l.has_quiz for l in lessons_list) else {}
+    )
+    quiz_summary = quiz_summaries.get(lesson.id) if lesson_quiz else None
+    latest_quiz_attempt = quiz_summary.last_attempt if quiz_summary else None
+    quiz_passed = bool(quiz_summary and quiz_summary.passed)
+    passed_quiz_lessons = [lesson_id for lesson_id, summary in quiz_summaries.items() if summary.passed]
+    failed_quiz_lessons = [
+        lesson_id for lesson_id, summary in quiz_summaries.items()
+        if summary.attempts and not summary.passed
+    ]
 
     return render(request, 'lesson.html', {
         'course': course,
@@ -519,9 +540,11 @@ def lesson_detail(request, course_slug, lesson_slug):
         'lesson_status': lesson_status,
         'next_lesson': next_lesson,
         'lesson_quiz': lesson_quiz,
-        'quiz_attempts': quiz_attempts,
+        'quiz_summary': quiz_summary,
         'latest_quiz_attempt': latest_quiz_attempt,
         'quiz_passed': quiz_passed,
+        'passed_quiz_lessons': passed_quiz_lessons,
+        'failed_quiz_lessons': failed_quiz_lessons,
     })
 
 
@@ -552,14 +575,9 @@ def lesson_quiz_view(request, course_slug, lesson_slug):
                 break
 
     if request.method == 'POST':
-        total = questions.count()
-        correct = 0
-        for q in questions:
-            answer = request.POST.get(f'q_{q.id}')
-            if answer and answer == q.correct_option:
-                correct += 1
-
-        score = (correct / total * 100) if total > 0 else 0
+        answer_key = get_answer_key(quiz.id)
+        responses = answer_key.pack(request.POST)
+        correct, total, score = grade(answer_key.correct_options, responses)
         passed = score >= quiz.passing_score
 
         LessonQuizAttempt.objects.create(
@@ -567,6 +585,12 @@ def lesson_quiz_view(request, course_slug, lesson_slug):
             quiz=quiz,
             score=score,
             passed=passed,
+            responses=responses,
+            answer_key_version=answer_key.version,
+        )
+        record_activity(
+            request.user, course, 'quiz_attempt', lesson=lesson,
+            data={'score': score, 'passed': passed},
         )
 
         result = {
@@ -774,30 +798,26 @@ def upload_pdf_lessons(request, course_slug):
                 'course': course,
             })
         
-        # Import utilities
         try:
             from myApp.utils.pdf_extractor import PDFExtractor
-            from myApp.utils.ai_content_generator import AIContentGenerator
-            from myApp.utils.pdf_image_extractor import PDFImageExtractor
-            from django.db.models import Max
+            PDFExtractor()
         except ImportError as e:
             messages.error(request, f'Required packages not installed: {str(e)}')
             return render(request, 'creator/upload_pdf_lessons.html', {
                 'course': course,
             })
         
-        # Initialize extractor and AI generator
-        pdf_extractor = PDFExtractor()
-        image_extractor = None
+        # Check what the background import will be able to do, so the creator hears now
         try:
-            image_extractor = PDFImageExtractor()
+            from myApp.utils.pdf_image_extractor import PDFImageExtractor
+            PDFImageExtractor()
         except Exception as e:
             messages.warning(request, f'Image extraction not available: {str(e)}. PDFs will be processed without images.')
         
-        ai_generator = None
         if use_ai:
             try:
-                ai_generator = AIContentGenerator()
+                from myApp.utils.ai_content_generator import AIContentGenerator
+                AIContentGenerator()
             except Exception as e:
                 messages.warning(request, f'AI generation not available: {str(e)}. Using basic text extraction.')
                 use_ai = False
@@ -815,102 +835,26 @@ def upload_pdf_lessons(request, course_slug):
         if module_created:
             messages.success(request, f'Created module: {module_name}')
         
-        # Process each PDF
-        lessons_created = 0
-        lessons_updated = 0
-        errors = []
-        
-        for pdf_file in pdf_files:
-            try:
-                # Save uploaded file temporarily
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    for chunk in pdf_file.chunks():
-                        temp_file.write(chunk)
-                    temp_path = temp_file.name
-                
-                try:
-                    # Extract images from PDF (if image extractor is available)
-                    pdf_images = []
-                    if image_extractor:
-                        try:
-                            # Generate a prefix for image public_ids based on PDF filename
-                            pdf_name_slug = slugify(os.path.splitext(pdf_file.name)[0])
-                            pdf_images = image_extractor.extract_and_upload_images(
-                                temp_path,
-                                folder='pdf-lessons',
-                                public_id_prefix=pdf_name_slug,
-                                min_size=500,  # Minimum 500px width or height
-                                quality=85
-                            )
-                            if pdf_images:
-                                messages.info(request, f'Extracted and uploaded {len(pdf_images)} image(s) from {pdf_file.name}')
-                        except Exception as e:
-                            messages.warning(request, f'Could not extract images from {pdf_file.name}: {str(e)}')
-                    
-                    if split_by_pages and split_by_pages > 0:
-                        # Split PDF into multiple lessons
-                        chunks = pdf_extractor.extract_by_pages(temp_path, split_by_pages)
-                        
-                        for i, chunk in enumerate(chunks, 1):
-                            suggested_title = f"{os.path.splitext(pdf_file.name)[0]} - Part {i}"
-                            # Filter images for this chunk's page range
-                            chunk_images = [
-                                img for img in pdf_images 
-                                if chunk['start_page'] <= img['page_num'] <= chunk['end_page']
-                            ]
-                            created, updated = _process_pdf_chunk(
-                                course, module, chunk['text'], suggested_title,
-                                ai_generator, not use_ai, course.name, module_name,
-                                images=chunk_images
-                            )
-                            lessons_created += created
-                            lessons_updated += updated
-                    else:
-                        # Process entire PDF as single lesson
-                        pdf_text = pdf_extractor.extract_text(temp_path)
-                        suggested_title = os.path.splitext(pdf_file.name)[0]
-                        
-                        created, updated = _process_pdf_chunk(
-                            course, module, pdf_text, suggested_title,
-                            ai_generator, not use_ai, course.name, module_name,
-                            images=pdf_images
-                        )
-                        lessons_created += created
-                        lessons_updated += updated
-                        
-                finally:
-                    # Clean up temporary file
-                    if os.path.exists(temp_path):
-                        try:
-                            os.remove(temp_path)
-                        except:
-                            pass
-                            
-            except Exception as e:
-                errors.append(f"Error processing {pdf_file.name}: {str(e)}")
-                continue
-        
-        # Show results
-        if lessons_created > 0:
-            messages.success(request, f'Successfully created {lessons_created} lesson(s)!')
-        if lessons_updated > 0:
-            messages.info(request, f'Updated {lessons_updated} existing lesson(s).')
-        if errors:
-            for error in errors:
-                messages.error(request, error)
-        
-        # Redirect back to appropriate page based on referrer
-        referrer = request.META.get('HTTP_REFERER', '')
-        if 'dashboard' in referrer:
-            return redirect('dashboard_course_lessons', course_slug=course_slug)
-        return redirect('course_lessons', course_slug=course_slug)
+        # Extraction, uploads and AI generation run in the background; the page polls pdf_import_status
+        pdf_import.start_pdf_import(
+            course, module, pdf_files, user=request.user, use_ai=use_ai, split_by_pages=split_by_pages,
+        )
+        messages.info(request, f'Importing {len(pdf_files)} PDF(s) in the background. Progress is shown below.')
+        return redirect(request.resolver_match.url_name, course_slug=course_slug)
     
     return render(request, 'creator/upload_pdf_lessons.html', {
         'course': course,
+        'import_jobs': pdf_import.import_status(course),
     })
 
 
+@staff_member_required
+def pdf_import_status(request, course_slug):
+    """AJAX endpoint polled by the upload page for background PDF import progress"""
+    course = get_object_or_404(Course, slug=course_slug)
+    return JsonResponse({'jobs': pdf_import.import_status(course)})
+
+
 @staff_member_required
 def clear_course_lessons(request, course_slug):
     """Clear all lessons from a course (for testing/re-uploading)"""
@@ -943,328 +887,6 @@ def clear_course_lessons(request, course_slug):
     return redirect('upload_pdf_lessons', course_slug=course_slug)
 
 
-def _insert_images_contextually(content_blocks, images, pdf_text):
-    """
-    Insert images into content blocks at logical positions based on page numbers.
-    Images are inserted after headers or distributed evenly throughout content.
-    """
-    if not images or not content_blocks:
-        return content_blocks
-    
-    # Extract page numbers from PDF text to estimate content distribution
-    page_markers = re.findall(r'--- Page (\d+) ---', pdf_text)
-    total_pages = int(page_markers[-1]) if page_markers else 1
-    
-    # Calculate approximate position for each image based on page number
-    # Position is a ratio (0.0 to 1.0) indicating where in the content the image should appear
-    image_positions = []
-    for img in images:
-        page_num = img.get('page_num', 1)
-        position_ratio = (page_num - 1) / max(total_pages, 1)
-        image_positions.append({
-            'image': img,
-            'position_ratio': position_ratio,
-            'page_num': page_num
-        })
-    
-    # Sort by position ratio
-    image_positions.sort(key=lambda x: x['position_ratio'])
-    
-    # Special handling: If we only have one paragraph block, split it and insert images
-    if len(content_blocks) == 1 and content_blocks[0].get('type') == 'paragraph':
-        # Split long paragraphs at logical points and insert images
-        text = content_blocks[0]['data'].get('text', '')
-        if len(text) > 500 and len(images) > 0:
-            # Split text into chunks and insert images between chunks
-            chunks = _split_text_with_images(text, images, total_pages)
-            result_blocks = []
-            for chunk in chunks:
-                if isinstance(chunk, dict) and chunk.get('type') == 'image':
-                    result_blocks.append(chunk)
-                else:
-                    result_blocks.append({
-                        'type': 'paragraph',
-                        'data': {'text': chunk}
-                    })
-            return result_blocks
-    
-    # Find header positions in content blocks for better image placement
-    header_positions = []
-    for i, block in enumerate(content_blocks):
-        if block.get('type') == 'header':
-            header_positions.append(i)
-    
-    # Insert images at appropriate positions
-    result_blocks = []
-    images_inserted = 0
-    
-    for i, block in enumerate(content_blocks):
-        result_blocks.append(block)
-        
-        # Check if we should insert an image after this block
-        while images_inserted < len(image_positions):
-            current_image = image_positions[images_inserted]
-            current_position_ratio = (i + 1) / max(len(content_blocks), 1)
-            
-            # Insert image if we've reached or passed the target position
-            if current_position_ratio >= current_image['position_ratio']:
-                # Prefer inserting after headers, but insert anywhere if we've passed the position
-                is_header = block.get('type') == 'header'
-                is_good_position = is_header or current_position_ratio >= current_image['position_ratio'] + 0.1
-                
-                if is_good_position or i == len(content_blocks) - 1:
-                    # Create image block
-                    image_block = {
-                        'type': 'image',
-                        'data': {
-                            'file': {
-                                'url': current_image['image']['url']
-                            },
-                            'caption': f"Image from page {current_image['page_num']}",
-                            'withBorder': False,
-                            'withBackground': False,
-                            'stretched': False
-                        }
-                    }
-                    result_blocks.append(image_block)
-                    images_inserted += 1
-                else:
-                    # Wait for a better position (like after next header)
-                    break
-            else:
-                # Haven't reached this image's position yet
-                break
-    
-    # Add any remaining images at the end (shouldn't happen, but safety check)
-    while images_inserted < len(image_positions):
-        current_image = image_positions[images_inserted]
-        image_block = {
-            'type': 'image',
-            'data': {
-                'file': {
-                    'url': current_image['image']['url']
-                },
-                'caption': f"Image from page {current_image['page_num']}",
-                'withBorder': False,
-                'withBackground': False,
-                'stretched': False
-            }
-        }
-        result_blocks.append(image_block)
-        images_inserted += 1
-    
-    return result_blocks
-
-
-def _split_text_with_images(text, images, total_pages):
-    """
-    Split text into chunks and return list of text chunks and image blocks
-    positioned based on page numbers.
-    """
-    if not images:
-        return [text]
-    
-    # Find page markers in text
-    page_markers = list(re.finditer(r'--- Page (\d+) ---', text))
-    
-    result = []
-    current_pos = 0
-    
-    for img_idx, img in enumerate(sorted(images, key=lambda x: x.get('page_num', 0))):
-        page_num = img.get('page_num', 1)
-        
-        # Find the position in text corresponding to this page
-        target_pos = len(text)
-        for marker in page_markers:
-            marker_page = int(marker.group(1))
-            if marker_page >= page_num:
-                target_pos = marker.start()
-                break
-        
-        # If we haven't reached the target position yet, add text up to it
-        if current_pos < target_pos:
-            chunk = text[current_pos:target_pos].strip()
-            if chunk:
-                result.append(chunk)
-            current_pos = target_pos
-        
-        # Add the image
-        result.append({
-            'type': 'image',
-            'data': {
-                'file': {'url': img['url']},
-                'caption': f"Image from page {page_num}",
-                'withBorder': False,
-                'withBackground': False,
-                'stretched': False
-            }
-        })
-    
-    # Add remaining text
-    if current_pos < len(text):
-        chunk = text[current_pos:].strip()
-        if chunk:
-            result.append(chunk)
-    
-    return result if result else [text]
-
-
-def _process_pdf_chunk(course, module, pdf_text, suggested_title, ai_generator, skip_ai, course_name, module_name, images=None):
-    """Helper method to process PDF chunk and create/update lesson"""
-    from django.db.models import Max
-    
-    if images is None:
-        images = []
-    
-    created = 0
-    updated = 0
-    
-    # Generate lesson slug
-    lesson_slug = slugify(suggested_title)
-    
-    # Get next order number
-    max_order = Lesson.objects.filter(course=course, module=module).aggregate(
-        max_order=Max('order')
-    )['max_order'] or 0
-    
-    if skip_ai or not ai_generator:
-        # Create basic lesson without AI generation
-        # Create basic content blocks with images if available
-        import uuid
-        import time
-        
-        basic_blocks = [
-            {
-                'type': 'paragraph',
-                'data': {
-                    'text': pdf_text[:1000] + '...' if len(pdf_text) > 1000 else pdf_text
-                }
-            }
-        ]
-        
-        # Add images if available - insert contextually
-        if images:
-            sorted_images = sorted(images, key=lambda x: x.get('page_num', 0))
-            basic_blocks = _insert_images_contextually(basic_blocks, sorted_images, pdf_text)
-        
-        # Convert to Editor.js format
-        editorjs_blocks = []
-        for block in basic_blocks:
-            editorjs_blocks.append({
-                'id': str(uuid.uuid4()),
-                'type': block['type'],
-                'data': block['data']
-            })
-        
-        basic_content = {
-            'time': int(time.time() * 1000),
-            'blocks': editorjs_blocks,
-            'version': '2.28.2'
-        }
-        
-        lesson, was_created = Lesson.objects.get_or_create(
-            course=course,
-            module=module,
-            slug=lesson_slug,
-            defaults={
-                'title': suggested_title,
-                'description': pdf_text[:500] + '...' if len(pdf_text) > 500 else pdf_text,
-                'order': max_order + 1,
-                'lesson_type': 'video',
-                'ai_generation_status': 'pending',
-                'content': basic_content,
-            }
-        )
-        
-        if was_created:
-            created = 1
-        else:
-            updated = 1
-    else:
-        # Generate AI content
-        try:
-            ai_content = ai_generator.generate_lesson_content(
-                pdf_text=pdf_text,
-                course_name=course_name,
-                module_name=module_name,
-                suggested_title=suggested_title
-            )
-            
-            # Add image blocks to content blocks
-            content_blocks_with_images = list(ai_content['content_blocks'])
-            
-            # Insert images into content blocks based on page numbers and content structure
-            if images:
-                sorted_images = sorted(images, key=lambda x: x.get('page_num', 0))
-                content_blocks_with_images = _insert_images_contextually(
-                    content_blocks_with_images, 
-                    sorted_images,
-                    pdf_text
-                )
-            
-            # Convert content blocks to Editor.js format
-            editorjs_content = ai_generator.convert_to_editorjs_format(
-                content_blocks_with_images
-            )
-            
-            # Create or update lesson
-            lesson, was_created = Lesson.objects.get_or_create(
-                course=course,
-                module=module,
-                slug=lesson_slug,
-                defaults={
-                    'title': ai_content['clean_title'],
-                    'description': ai_content['full_description'],
-                    'order': max_order + 1,
-                    'lesson_type': 'video',
-                    'content': editorjs_content,
-                    'ai_generation_status': 'generated',
-                    'ai_clean_title': ai_content['clean_title'],
-                    'ai_short_summary': ai_content['short_summary'],
-                    'ai_full_description': ai_content['full_description'],
-                    'ai_outcomes': ai_content['outcomes'],
-                    'ai_coach_actions': ai_content['coach_actions'],
-                }
-            )
-            
-            if was_created:
-                created = 1
-            else:
-                # Update existing lesson
-                lesson.title = ai_content['clean_title']
-                lesson.description = ai_content['full_description']
-                lesson.content = editorjs_content
-                lesson.ai_generation_status = 'generated'
-                lesson.ai_clean_title = ai_content['clean_title']
-                lesson.ai_short_summary = ai_content['short_summary']
-                lesson.ai_full_description = ai_content['full_description']
-                lesson.ai_outcomes = ai_content['outcomes']
-                lesson.ai_coach_actions = ai_content['coach_actions']
-                lesson.save()
-                updated = 1
-                
-        except Exception as e:
-            # Fall back to basic lesson creation
-            lesson, was_created = Lesson.objects.get_or_create(
-                course=course,
-                module=module,
-                slug=lesson_slug,
-                defaults={
-                    'title': suggested_title,
-                    'description': pdf_text[:500] + '...' if len(pdf_text) > 500 else pdf_text,
-                    'order': max_order + 1,
-                    'lesson_type': 'video',
-                    'ai_generation_status': 'pending',
-                }
-            )
-            if was_created:
-                created = 1
-            else:
-                updated = 1
-    
-    return created, updated
-
-
 @require_http_methods(["POST"])
 @staff_member_required
 def verify_vimeo_url(request):
@@ -1508,6 +1130,9 @@ def update_video_progress(request, lesson_id):
             }
         )
         
+        was_completed = False if created else user_progress.completed
+        previous_watch_percentage = 0.0 if created else user_progress.video_watch_percentage
+        
         # Update progress
         if not created:
             user_progress.video_watch_percentage = watch_percentage
@@ -1516,6 +1141,7 @@ def update_video_progress(request, lesson_id):
         
         # Auto-update status based on watch progress
         user_progress.update_status()
+        record_progress_change(user_progress, was_completed, previous_watch_percentage)
         
         return JsonResponse({
             'success': True,
@@ -1541,7 +1167,7 @@ def complete_lesson(request, lesson_id):
         quiz = lesson.quiz
         if quiz.is_required:
             # Check if user has passed the quiz
-            passed_attempt = LessonQuizAttempt.objects.filter(
+            passed_attempt = LessonQuizSummary.objects.filter(
                 user=request.user,
                 quiz=quiz,
                 passed=True
@@ -1563,6 +1189,8 @@ def complete_lesson(request, lesson_id):
         user=request.user,
         lesson=lesson
     )
+    was_completed = user_progress.completed
+    previous_watch_percentage = user_progress.video_watch_percentage
 
     # Mark as completed
     user_progress.completed = True
@@ -1570,6 +1198,7 @@ def complete_lesson(request, lesson_id):
     user_progress.completed_at = datetime.now()
     user_progress.progress_percentage = 100
     user_progress.save()
+    record_progress_change(user_progress, was_completed, previous_watch_percentage)
     
     # Check if this is the last lesson in the course
     course = lesson.course
@@ -1602,25 +1231,29 @@ def complete_lesson(request, lesson_id):
                 
                 # If there's no exam, automatically issue the certificate
                 if not has_exam:
+                    newly_issued = certification.status != 'passed'
                     certification.status = 'passed'
                     if not certification.issued_at:
                         certification.issued_at = timezone.now()
                     
-                    # Generate certificate PDF and upload to Cloudinary
+                    # Generate certificate PDF and keep it in certificate storage
                     try:
                         from .utils.certificate_generator import generate_certificate
                         cert_result = generate_certificate(
                             user=request.user,
                             course=course,
                             issued_date=certification.issued_at,
-                            upload_to_cloudinary=True
                         )
                         
-                        if cert_result and cert_result.get('certificate_url'):
-                            # Store the generated certificate URL
-                            certification.accredible_certificate_url = cert_result['certificate_url']
+                        if cert_result and cert_result.get('certificate_file'):
+                            # Local files have no public URL and are served by view_certificate
+                            certification.certificate_file = cert_result['certificate_file']
+                            certification.accredible_certificate_url = (
+                                cert_result['certificate_url'] or reverse('view_certificate', args=[course.slug])
+                            )
                             if cert_result.get('certificate_id'):
                                 certification.accredible_certificate_id = cert_result['certificate_id']
+                            certification.certificate_hash = cert_result.get('certificate_hash', '')
                     except Exception as e:
                         # Log error but don't fail certificate issuance
                         import logging
@@ -1628,6 +1261,11 @@ def complete_lesson(request, lesson_id):
                         logger.error(f"Error generating certificate: {str(e)}")
                     
                     certification.save()
+                    if newly_issued:
+                        record_activity(
+                            request.user, course, 'certification_issued',
+                            data={'certificate_id': certification.accredible_certificate_id},
+                        )
                 
                 # Determine certificate URL
                 if certification.accredible_certificate_url:
@@ -1662,8 +1300,19 @@ def view_certificate(request, course_slug):
         messages.warning(request, 'Certificate not yet issued.')
         return redirect('student_course_progress', course_slug=course_slug)
     
-    # If certificate URL exists, redirect to it
-    if certification.accredible_certificate_url:
+    filename = f"certificate_{course.slug}_{request.user.id}.pdf"
+    
+    # Stream a locally stored certificate
+    if certification.certificate_file:
+        try:
+            storage = get_certificate_storage()
+        except CertificateStorageError:
+            storage = None
+        if storage and storage.can_stream and storage.exists(certification.certificate_file):
+            return certificate_file_response(request, storage, certification.certificate_file, filename)
+    
+    # If certificate URL exists elsewhere, redirect to it
+    if certification.accredible_certificate_url and certification.accredible_certificate_url != request.path:
         return redirect(certification.accredible_certificate_url)
     
     # Otherwise, generate on-the-fly
@@ -1673,7 +1322,7 @@ def view_certificate(request, course_slug):
             user=request.user,
             course=course,
             issued_date=certification.issued_at or timezone.now(),
-            upload_to_cloudinary=False  # Generate for direct download
+            store=False  # Generate for direct download
         )
         
         if cert_result and cert_result.get('pdf_buffer'):
@@ -1682,7 +1331,7 @@ def view_certificate(request, course_slug):
                 cert_result['pdf_buffer'].getvalue(),
                 content_type='application/pdf'
             )
-            response['Content-Disposition'] = f'inline; filename="certificate_{course.slug}_{request.user.id}.pdf"'
+            response['Content-Disposition'] = f'inline; filename="{filename}"'
             return response
         else:
             messages.error(request, 'Error generating certificate.')
@@ -1695,6 +1344,51 @@ def view_certificate(request, course_slug):
         return redirect('student_certifications')
 
 
+@require_http_methods(["GET", "HEAD"])
+def verify_certificate(request, certificate_id):
+    """Public check of a certificate ID, as HTML or (with Accept: application/json or ?format=json) JSON"""
+    payload = verification.verify_certificate(certificate_id)
+    wants_json = request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+    etag = verification.payload_etag(payload, 'json' if wants_json else 'html')
+    
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    elif wants_json:
+        response = JsonResponse(payload, status=200 if payload['found'] else 404)
+    else:
+        response = render(request, 'verify_certificate.html', {'result': payload}, status=200 if payload['found'] else 404)
+    
+    max_age = verification.VERIFY_CACHE_SECONDS if payload['valid'] else verification.VERIFY_MISS_CACHE_SECONDS
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={max_age}'
+    response['Vary'] = 'Accept'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def verify_certificates_bulk(request):
+    """
+    Verify up to MAX_BULK_VERIFY certificate IDs at once: {"ids": [...]} -> {"results": [...]}.
+    Rate limited per client address; results leave out the holder's name.
+    """
+    if not verification.bulk_verify_allowed(verification.client_address(request)):
+        response = JsonResponse({'error': 'Too many verification requests. Please try again later.'}, status=429)
+        response['Retry-After'] = str(verification.BULK_VERIFY_WINDOW_SECONDS)
+        return response
+    try:
+        ids = json.loads(request.body).get('ids')
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'error': 'Expected a JSON object with an "ids" list.'}, status=400)
+    if not isinstance(ids, list) or not all(isinstance(certificate_id, str) for certificate_id in ids):
+        return JsonResponse({'error': 'Expected a JSON object with an "ids" list.'}, status=400)
+    try:
+        results = verification.verify_certificates(ids)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'results': results})
+
+
 @require_http_methods(["POST"])
 @login_required
 def toggle_favorite_course(request, course_id):
@@ -1872,6 +1566,14 @@ def student_dashboard(request):
             CourseEnrollment.objects.get_or_create(user=user, course=course)
         enrollments = CourseEnrollment.objects.filter(user=user).select_related('course')
     
+    # Exams and the student's exam summaries for every listed course, in two queries
+    course_ids = {course.id for course in my_courses} | {enrollment.course_id for enrollment in enrollments}
+    exams_by_course = {exam.course_id: exam for exam in Exam.objects.filter(course_id__in=course_ids)}
+    exam_summaries = {
+        summary.exam_id: summary
+        for summary in ExamSummary.objects.filter(user=user, exam__course_id__in=course_ids).select_related('last_attempt')
+    }
+    
     # Process My Courses (courses with access)
     my_courses_data = []
     for course in my_courses:
@@ -1908,20 +1610,18 @@ def student_dashboard(request):
         ).aggregate(avg=Avg('video_watch_percentage'))['avg'] or 0
         
         # Get exam info
-        exam_info = None
-        try:
-            exam = Exam.objects.get(course=course)
-            exam_attempts = ExamAttempt.objects.filter(user=user, exam=exam).order_by('-started_at')
-            latest_attempt = exam_attempts.first()
+        exam = exams_by_course.get(course.id)
+        if exam:
+            summary = exam_summaries.get(exam.id)
             exam_info = {
                 'exists': True,
-                'attempts_count': exam_attempts.count(),
+                'attempts_count': summary.attempts_used if summary else 0,
                 'max_attempts': exam.max_attempts,
-                'latest_attempt': latest_attempt,
-                'passed': exam_attempts.filter(passed=True).exists(),
+                'latest_attempt': summary.last_attempt if summary else None,
+                'passed': summary.passed if summary else False,
                 'is_available': enrollment.is_exam_available(),
             }
-        except Exam.DoesNotExist:
+        else:
             exam_info = {'exists': False}
         
         # Get certification status
@@ -1987,20 +1687,18 @@ def student_dashboard(request):
         ).aggregate(avg=Avg('video_watch_percentage'))['avg'] or 0
         
         # Get exam info
-        exam_info = None
-        try:
-            exam = Exam.objects.get(course=course)
-            exam_attempts = ExamAttempt.objects.filter(user=user, exam=exam).order_by('-started_at')
-            latest_attempt = exam_attempts.first()
+        exam = exams_by_course.get(course.id)
+        if exam:
+            summary = exam_summaries.get(exam.id)
             exam_info = {
                 'exists': True,
-                'attempts_count': exam_attempts.count(),
+                'attempts_count': summary.attempts_used if summary else 0,
                 'max_attempts': exam.max_attempts,
-                'latest_attempt': latest_attempt,
-                'passed': exam_attempts.filter(passed=True).exists(),
+                'latest_attempt': summary.last_attempt if summary else None,
+                'passed': summary.passed if summary else False,
                 'is_available': enrollment.is_exam_available(),
             }
-        except Exam.DoesNotExist:
+        else:
             exam_info = {'exists': False}
         
         # Get certification
@@ -2182,6 +1880,105 @@ def student_certifications(request):
     })
 
 
+@login_required
+def student_exam(request, course_slug):
+    """Final exam: the open attempt with its countdown, or the exam overview and last result"""
+    course = get_object_or_404(Course, slug=course_slug)
+    exam = get_object_or_404(Exam, course=course)
+    user = request.user
+    now = timezone.now()
+    
+    attempt = ExamAttempt.objects.filter(user=user, exam=exam, completed_at__isnull=True).order_by('-attempt_number').first()
+    if attempt and is_expired(attempt, now):
+        # The sweeper has not reached it yet; grade it now
+        submit_attempt(attempt.id, user, now=now)
+        attempt = None
+    
+    if attempt:
+        paper = get_exam_paper(exam.id)
+        for question in paper:
+            question['answer'] = attempt.answers.get(question['field'])
+        return render(request, 'student/exam.html', {
+            'course': course,
+            'exam': exam,
+            'attempt': attempt,
+            'paper': paper,
+            'remaining_seconds': remaining_seconds(attempt, now),
+            'autosave_interval': EXAM_AUTOSAVE_INTERVAL_SECONDS,
+            'autosave_jitter': EXAM_AUTOSAVE_JITTER_SECONDS,
+        })
+    
+    summary = ExamSummary.objects.filter(user=user, exam=exam).select_related('last_attempt').first()
+    enrollment = CourseEnrollment.objects.filter(user=user, course=course).first()
+    can_start = (
+        exam.is_active
+        and enrollment is not None
+        and not (summary and summary.passed)
+        and not (summary and exam.max_attempts and summary.attempts_used >= exam.max_attempts)
+        and enrollment.is_exam_available()
+    )
+    return render(request, 'student/exam.html', {
+        'course': course,
+        'exam': exam,
+        'summary': summary,
+        'last_attempt': summary.last_attempt if summary else None,
+        'question_count': len(get_exam_answer_key(exam.id)),
+        'can_start': can_start,
+    })
+
+
+@require_http_methods(["POST"])
+@login_required
+def student_exam_start(request, course_slug):
+    """Start (or resume) an attempt; the deadline is set here, on the server"""
+    course = get_object_or_404(Course, slug=course_slug)
+    exam = get_object_or_404(Exam, course=course)
+    
+    enrollment = CourseEnrollment.objects.filter(user=request.user, course=course).first()
+    if not enrollment or not enrollment.is_exam_available():
+        messages.error(request, 'The exam is not available to you yet.')
+        return redirect('student_course_progress', course_slug=course_slug)
+    if not len(get_exam_answer_key(exam.id)):
+        messages.error(request, 'This exam has no questions yet.')
+        return redirect('student_exam', course_slug=course_slug)
+    
+    try:
+        start_attempt(request.user, exam)
+    except ExamError as e:
+        messages.error(request, str(e))
+    return redirect('student_exam', course_slug=course_slug)
+
+
+@require_http_methods(["POST"])
+@login_required
+def exam_autosave(request, attempt_id):
+    """Merge a batch of changed answers into an open attempt (one UPDATE)"""
+    try:
+        data = json.loads(request.body)
+        saved = save_answers(attempt_id, request.user, data.get('answers') or {})
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+    except ExamError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    if not saved:
+        # Submitted, expired or not this user's attempt: the page reloads to show the result
+        return JsonResponse({'success': False, 'error': 'This attempt is closed'}, status=409)
+    return JsonResponse({'success': True})
+
+
+@require_http_methods(["POST"])
+@login_required
+def exam_submit(request, attempt_id):
+    """Submit an attempt with its final answers and grade it"""
+    try:
+        attempt = submit_attempt(attempt_id, request.user, answers=request.POST)
+    except ExamError as e:
+        messages.error(request, str(e))
+        return redirect('student_dashboard')
+    return redirect('student_exam', course_slug=attempt.exam.course.slug)
+
+
 @staff_member_required
 @require_http_methods(["POST"])
 def train_lesson_chatbot(request, lesson_id):
@@ -30,19 +30,27 @@ CSRF_TRUSTED_ORIGINS = [
     'https://edmarincourse-production.up.railway.app',
 ]
 
+# Reverse proxies in front of the app (Railway's edge: 1). Each appends the
+# address it received the request from to X-Forwarded-For, so the client is
+# the entry that many places from the end; 0 trusts REMOTE_ADDR only.
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '1'))
+
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'channels',
     'myApp'
 ]
 
 MIDDLEWARE = [
+    'myApp.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +60,23 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-view latency/query metrics (see /dashboard/perf/)
+PERF_MONITORING = os.getenv('PERF_MONITORING', 'True').lower() not in ('false', '0', 'no')
+# Requests running more queries than this are logged as warnings
+PERF_QUERY_BUDGET = int(os.getenv('PERF_QUERY_BUDGET', '50'))
+
+# AI quiz generation backend: 'openai', or 'fake' for offline deterministic questions
+QUIZ_GENERATION_BACKEND = os.getenv('QUIZ_GENERATION_BACKEND', 'openai')
+
+# Certificate PDF storage: 'local' (MEDIA_ROOT, served by view_certificate) or 'cloudinary'
+CERTIFICATE_STORAGE = os.getenv(
+    'CERTIFICATE_STORAGE', 'cloudinary' if os.getenv('CLOUDINARY_CLOUD_NAME') else 'local'
+)
+
+# Background PDF lesson imports: processes extracting text and images, threads for uploads and AI calls
+PDF_IMPORT_WORKERS = int(os.getenv('PDF_IMPORT_WORKERS', '2'))
+PDF_IMPORT_IO_WORKERS = int(os.getenv('PDF_IMPORT_IO_WORKERS', '8'))
+
 ROOT_URLCONF = 'myProject.urls'
 
 TEMPLATES = [
@@ -71,6 +96,49 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myProject.wsgi.application'
+ASGI_APPLICATION = 'myProject.asgi.application'
+
+
+# Channels (live staff activity stream)
+# Redis when REDIS_URL is set (required with more than one server process),
+# otherwise an in-process layer that is fine for local development.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+                'capacity': 1000,
+                'expiry': 10,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+
+# Cache (compiled quiz and exam answer keys, exam papers, analytics frames)
+# Invalidation has to reach every server process, so Redis is required with
+# more than one; the per-process memory cache is for local development only.
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
 
 
 # Database
@@ -18,6 +18,9 @@ urlpatterns = [
     # Student Dashboard (Client-facing)
     path('my-dashboard/', views.student_dashboard, name='student_dashboard'),
     path('my-dashboard/course/<slug:course_slug>/', views.student_course_progress, name='student_course_progress'),
+    path('my-dashboard/course/<slug:course_slug>/exam/', views.student_exam, name='student_exam'),
+    path('my-dashboard/course/<slug:course_slug>/exam/start/', views.student_exam_start, name='student_exam_start'),
+    path('my-dashboard/exam-attempts/<int:attempt_id>/submit/', views.exam_submit, name='exam_submit'),
     path('my-certifications/', views.student_certifications, name='student_certifications'),
     path('certificate/<slug:course_slug>/', views.view_certificate, name='view_certificate'),
     
@@ -34,6 +37,7 @@ urlpatterns = [
     path('dashboard/lessons/', dashboard_views.dashboard_lessons, name='dashboard_lessons'),
     path('dashboard/lessons/add/', dashboard_views.dashboard_add_lesson, name='dashboard_add_lesson'),
     path('dashboard/lessons/upload-quiz/', dashboard_views.dashboard_upload_quiz, name='dashboard_upload_quiz'),
+    path('dashboard/lessons/import-quizzes/', dashboard_views.dashboard_import_quizzes, name='dashboard_import_quizzes'),
     path('dashboard/lessons/<int:lesson_id>/edit/', dashboard_views.dashboard_edit_lesson, name='dashboard_edit_lesson'),
     path('dashboard/lessons/<int:lesson_id>/delete/', dashboard_views.dashboard_delete_lesson, name='dashboard_delete_lesson'),
     path('dashboard/lessons/<int:lesson_id>/quiz/', dashboard_views.dashboard_lesson_quiz, name='dashboard_lesson_quiz'),
@@ -42,10 +46,20 @@ urlpatterns = [
     
     # Student Progress Monitoring
     path('dashboard/students/', dashboard_views.dashboard_students, name='dashboard_students'),
+    path('dashboard/activity/', dashboard_views.dashboard_activity_feed, name='dashboard_activity_feed'),
+    path('dashboard/activity/stream/', dashboard_views.dashboard_activity_stream, name='dashboard_activity_stream'),
     path('dashboard/students/progress/', dashboard_views.dashboard_student_progress, name='dashboard_student_progress'),
     path('dashboard/students/<int:user_id>/', dashboard_views.dashboard_student_detail, name='dashboard_student_detail'),
     path('dashboard/students/<int:user_id>/<slug:course_slug>/', dashboard_views.dashboard_student_detail, name='dashboard_student_detail_course'),
     path('dashboard/courses/<slug:course_slug>/progress/', dashboard_views.dashboard_course_progress, name='dashboard_course_progress'),
+    path('dashboard/courses/<slug:course_slug>/funnel/', dashboard_views.dashboard_course_funnel, name='dashboard_course_funnel'),
+    
+    # Performance
+    path('dashboard/perf/', dashboard_views.dashboard_perf, name='dashboard_perf'),
+    
+    # Data Exports
+    path('dashboard/exports/', dashboard_views.dashboard_exports, name='dashboard_exports'),
+    path('dashboard/exports/<slug:export_name>/', dashboard_views.dashboard_export, name='dashboard_export'),
     
     # Bundle Management
     path('dashboard/bundles/', dashboard_views.dashboard_bundles, name='dashboard_bundles'),
@@ -66,6 +80,7 @@ urlpatterns = [
     path('creator/courses/<slug:course_slug>/lessons/', views.course_lessons, name='course_lessons'),
     path('creator/courses/<slug:course_slug>/add-lesson/', views.add_lesson, name='add_lesson'),
     path('creator/courses/<slug:course_slug>/upload-pdf/', views.upload_pdf_lessons, name='upload_pdf_lessons'),
+    path('creator/courses/<slug:course_slug>/upload-pdf/status/', views.pdf_import_status, name='pdf_import_status'),
     path('creator/courses/<slug:course_slug>/clear-lessons/', views.clear_course_lessons, name='clear_course_lessons'),
     path('creator/courses/<slug:course_slug>/lessons/<int:lesson_id>/generate/', views.generate_lesson_ai, name='generate_lesson_ai'),
     path('creator/verify-vimeo/', views.verify_vimeo_url, name='verify_vimeo_url'),
@@ -83,6 +98,13 @@ urlpatterns = [
     path('api/lessons/<int:lesson_id>/progress/', views.update_video_progress, name='update_video_progress'),
     path('api/lessons/<int:lesson_id>/complete/', views.complete_lesson, name='complete_lesson'),
     
+    # Exam answer autosave
+    path('api/exam-attempts/<int:attempt_id>/answers/', views.exam_autosave, name='exam_autosave'),
+    
+    # Public certificate verification
+    path('verify/<str:certificate_id>/', views.verify_certificate, name='verify_certificate'),
+    path('api/verify/', views.verify_certificates_bulk, name='verify_certificates_bulk'),
+    
     # Favorite course endpoint
     path('api/courses/<int:course_id>/favorite/', views.toggle_favorite_course, name='toggle_favorite_course'),
     
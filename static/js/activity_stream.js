@@ -0,0 +1,161 @@
+// Live staff activity stream
+// Connects to the WebSocket consumer and falls back to Server-Sent Events,
+// then to polling the JSON feed where the server cannot stream (WSGI).
+// Usage: <div data-activity-stream data-sse-url="..." data-feed-url="..." data-max-items="50">...</div>
+
+(function() {
+    const WS_PATH = '/ws/dashboard/activity/';
+    const MAX_RECONNECT_DELAY = 30000;
+    const POLL_INTERVAL = 15000;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    const ICONS = {
+        lesson_completed: ['fa-check-circle', 'bg-green-500/20 text-green-400'],
+        exam_attempt: ['fa-clipboard-check', 'bg-blue-soft/20 text-blue-soft'],
+        quiz_attempt: ['fa-question-circle', 'bg-purple-500/20 text-purple-400'],
+        certification_issued: ['fa-certificate', 'bg-yellow-500/20 text-yellow-400'],
+    };
+
+    function describe(event) {
+        const lesson = event.lesson ? escapeHtml(event.lesson.title) : '';
+        const course = escapeHtml(event.course.name);
+        const outcome = event.data && event.data.passed
+            ? '<span class="text-green-400">passed</span>'
+            : '<span class="text-red-400">attempted</span>';
+        switch (event.type) {
+            case 'lesson_completed':
+                return `completed <span class="text-teal-soft">${lesson}</span>`;
+            case 'exam_attempt':
+                return `${outcome} exam for <span class="text-teal-soft">${course}</span>`;
+            case 'quiz_attempt':
+                return `${outcome} the quiz for <span class="text-teal-soft">${lesson}</span>`;
+            case 'certification_issued':
+                return `earned certification for <span class="text-yellow-400">${course}</span>`;
+            default:
+                return `updated progress in <span class="text-teal-soft">${lesson || course}</span>`;
+        }
+    }
+
+    function renderEvent(event) {
+        const [icon, colours] = ICONS[event.type] || ['fa-chart-line', 'bg-teal-soft/20 text-teal-soft'];
+        const item = document.createElement('div');
+        item.className = 'flex items-start gap-3 p-3 bg-[#ffffff]/40 rounded-lg';
+        item.dataset.activityId = event.id;
+        item.innerHTML = `
+            <div class="w-8 h-8 rounded-lg flex items-center justify-center flex-shrink-0 ${colours}">
+                <i class="fas ${icon} text-xs"></i>
+            </div>
+            <div class="flex-1 min-w-0">
+                <div class="text-sm mb-1">
+                    <span class="font-semibold text-gray-700">${escapeHtml(event.user.name)}</span>
+                    ${describe(event)}
+                </div>
+                <div class="text-xs text-gray-700"><i class="fas fa-clock mr-1"></i>just now</div>
+            </div>`;
+        return item;
+    }
+
+    function ActivityStream(container) {
+        this.container = container;
+        this.list = container.querySelector('[data-activity-list]') || container;
+        this.sseUrl = container.dataset.sseUrl;
+        this.feedUrl = container.dataset.feedUrl;
+        this.maxItems = parseInt(container.dataset.maxItems || '50', 10);
+        this.reconnectDelay = 1000;
+        this.useSse = !('WebSocket' in window);
+    }
+
+    ActivityStream.prototype.handleBatch = function(batch) {
+        const empty = this.container.querySelector('[data-activity-empty]');
+        if (empty && batch.events.length) {
+            empty.remove();
+        }
+        // Oldest first, so the newest ends up on top
+        batch.events.forEach(event => {
+            if (!this.list.querySelector(`[data-activity-id="${event.id}"]`)) {
+                this.list.prepend(renderEvent(event));
+            }
+        });
+        while (this.list.children.length > this.maxItems) {
+            this.list.lastElementChild.remove();
+        }
+        if (batch.dropped) {
+            console.log(`Activity stream: ${batch.dropped} event(s) skipped, refresh to see all`);
+        }
+    };
+
+    ActivityStream.prototype.connect = function() {
+        if (this.useSse) {
+            this.connectSse();
+        } else {
+            this.connectWebSocket();
+        }
+    };
+
+    ActivityStream.prototype.connectWebSocket = function() {
+        const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+        const socket = new WebSocket(scheme + window.location.host + WS_PATH);
+        let opened = false;
+
+        socket.onopen = () => {
+            opened = true;
+            this.reconnectDelay = 1000;
+        };
+        socket.onmessage = message => this.handleBatch(JSON.parse(message.data));
+        socket.onclose = () => {
+            if (!opened && this.sseUrl) {
+                // Never connected (e.g. WSGI-only deployment or proxy without upgrade)
+                this.useSse = true;
+            }
+            this.scheduleReconnect();
+        };
+    };
+
+    ActivityStream.prototype.connectSse = function() {
+        if (!this.sseUrl || !('EventSource' in window)) {
+            return;
+        }
+        // EventSource reconnects on its own using the server's retry hint, but
+        // gives up when the server answers 204 because it cannot stream
+        const source = new EventSource(this.sseUrl);
+        source.onmessage = message => this.handleBatch(JSON.parse(message.data));
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                this.poll();
+            }
+        };
+    };
+
+    ActivityStream.prototype.poll = function() {
+        if (!this.feedUrl) {
+            return;
+        }
+        const url = this.feedUrl + (this.feedUrl.includes('?') ? '&' : '?') + 'limit=' + this.maxItems;
+        fetch(url, {credentials: 'same-origin'})
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // The feed is newest first; batches are oldest first
+                    this.handleBatch({events: data.events.slice().reverse()});
+                }
+            })
+            .catch(() => {})
+            .finally(() => setTimeout(() => this.poll(), POLL_INTERVAL));
+    };
+
+    ActivityStream.prototype.scheduleReconnect = function() {
+        setTimeout(() => this.connect(), this.reconnectDelay);
+        this.reconnectDelay = Math.min(this.reconnectDelay * 2, MAX_RECONNECT_DELAY);
+    };
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('[data-activity-stream]').forEach(container => {
+            new ActivityStream(container).connect();
+        });
+    });
+})();